@@ -0,0 +1,182 @@
+"""Audit log (`logs` table) writer.
+
+AUDIT_MODE=buffered (default): `record()` keeps the row on the session and,
+once that session commits, appends it to an in-process buffer. A background
+thread bulk-inserts the buffer when it reaches AUDIT_BATCH_SIZE rows or every
+AUDIT_FLUSH_INTERVAL seconds, so product writes no longer pay for a second
+transaction. `stop()` (called on app shutdown) flushes whatever is left.
+Rows are inserted AUDIT_BATCH_SIZE at a time. While the database refuses
+them they stay queued and are retried every AUDIT_FLUSH_INTERVAL seconds,
+up to AUDIT_MAX_PENDING rows; past that the oldest are dropped (logged and
+counted in `stats()["dropped"]`) so an outage cannot grow memory without
+bound.
+
+AUDIT_MODE=durable: `record()` adds the Log row to the caller's session, so
+it is committed in the same transaction as the product change.
+"""
+import logging
+import threading
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+BUFFERED = "buffered"
+DURABLE = "durable"
+
+
+class AuditWriter:
+    def __init__(self, batch_size: int, interval: float, max_pending: int):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_pending = max_pending
+        self._buffer: List[dict] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            thread, self._stopping = self._thread, True
+            self._cond.notify()
+        if thread is not None:
+            thread.join()
+        self._thread = None
+        self.flush()
+
+    def enqueue(self, row: dict):
+        with self._cond:
+            self._buffer.append(row)
+            self._trim()
+            # esik bir kez asildiginda uyandir; basarisiz yazimdan sonra her satirda tekrar denenmesin
+            if len(self._buffer) == self.batch_size:
+                self._cond.notify()
+        if self._thread is None:
+            self.start()
+
+    def _trim(self) -> int:
+        # _cond tutulurken cagrilir: sinirin ustundeki en eski satirlar atilir
+        excess = len(self._buffer) - self.max_pending
+        if not self.max_pending or excess <= 0:
+            return 0
+        del self._buffer[:excess]
+        self.dropped += excess
+        return excess
+
+    def flush(self) -> bool:
+        """Insert the buffer batch by batch; False if a batch failed (it stays queued for the next try)."""
+        from app.database import engine
+
+        while True:
+            with self._cond:
+                rows = self._buffer[:self.batch_size]
+                del self._buffer[:len(rows)]
+            if not rows:
+                return True
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(models.Log), rows)
+            except Exception:
+                with self._cond:
+                    self._buffer[:0] = rows
+                    dropped = self._trim()
+                    pending = len(self._buffer)
+                    self.failures += 1
+                logger.exception("audit log flush failed, %d rows kept for retry, %d dropped (AUDIT_MAX_PENDING)",
+                                 pending, dropped)
+                return False
+            self.written += len(rows)
+            self.batches += 1
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._cond:
+                # veritabani hata verdiyse dolu buffer'la bile bir aralik beklenir
+                if not self._stopping and (failed or len(self._buffer) < self.batch_size):
+                    self._cond.wait(self.interval)
+                stopping = self._stopping
+            failed = not self.flush()
+            if stopping:
+                return
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = len(self._buffer)
+        return {"mode": settings.audit_mode, "pending": pending, "written": self.written, "batches": self.batches,
+                "failures": self.failures, "dropped": self.dropped}
+
+
+writer = AuditWriter(settings.audit_batch_size, settings.audit_flush_interval, settings.audit_max_pending)
+
+
+def record(db: Session, user_id: int, action: str, entity: str, entity_id: Optional[int] = None):
+    """Record an audit entry for a change made through `db`.
+
+    Either way the entry only exists if the caller's transaction commits:
+    durable mode adds the Log row to it, buffered mode hands the row to the
+    background writer once `db.commit()` succeeds.
+    """
+    if settings.audit_mode == DURABLE:
+        db.add(models.Log(user_id=user_id, action=action, entity=entity, entity_id=entity_id))
+        return
+    db.info.setdefault("audit_rows", []).append({
+        "user_id": user_id,
+        "action": action,
+        "entity": entity,
+        "entity_id": entity_id,
+        "timestamp": datetime.utcnow(),
+    })
+
+
+def record_many(db: Session, user_id: int, action: str, entity: str, entity_ids: Iterable[int]):
+    """`record()` for a batch of entities, written with a single executemany."""
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "action": action, "entity": entity, "entity_id": entity_id, "timestamp": now}
+        for entity_id in entity_ids
+    ]
+    if not rows:
+        return
+    if settings.audit_mode == DURABLE:
+        db.execute(insert(models.Log), rows)
+        return
+    db.info.setdefault("audit_rows", []).extend(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _enqueue_committed(session: Session):
+    for row in session.info.pop("audit_rows", ()):
+        writer.enqueue(row)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("audit_rows", None)
+
+
+def start():
+    if settings.audit_mode == BUFFERED:
+        writer.start()
+
+
+def stop():
+    writer.stop()
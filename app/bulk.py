@@ -0,0 +1,164 @@
+"""Bulk product import and stock adjustment.
+
+Rows are handled in chunks of BULK_CHUNK_SIZE, one transaction per chunk.
+A bad row is reported back with its index and never aborts the batch.
+"""
+import codecs
+import csv
+import json
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app import audit, cache, counters, events, low_stock, models, schemas, stock
+
+Row = Tuple[int, dict]  # (index in upload, raw fields)
+
+
+def describe(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+
+
+def _decode(decoder, data: bytes, final: bool = False) -> str:
+    try:
+        return decoder.decode(data, final)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be UTF-8")
+
+
+async def _lines(request: Request) -> AsyncIterator[str]:
+    # tek artimli decoder: parca sinirinda bolunen cok byte'li karakterler (s, c, g ...) bozulmaz
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += _decode(decoder, chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += _decode(decoder, b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_rows(request: Request) -> AsyncIterator[Row]:
+    """Yield (index, dict) rows from a JSON array, NDJSON or CSV request body.
+
+    NDJSON and CSV bodies are parsed line by line as they arrive. CSV needs
+    a header row; quoted fields may not contain newlines.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/ndjson"):
+        index = 0
+        async for line in _lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as exc:
+                yield index, {"__error__": f"invalid JSON: {exc}"}
+            index += 1
+    elif content_type == "text/csv":
+        header = None
+        index = 0
+        async for line in _lines(request):
+            if not line.strip():
+                continue
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            # bos hucreler opsiyonel alanlarda None olsun
+            yield index, {k: (v if v != "" else None) for k, v in zip(header, values)}
+            index += 1
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body must be a JSON array")
+        for index, row in enumerate(body):
+            yield index, row
+
+
+def _insert(db: Session, rows: List[dict]):
+    # executemany; RETURNING toplu "insertmanyvalues" ile tek seferde gelir
+    result = db.execute(
+        insert(models.Product).returning(
+            models.Product.id, models.Product.owner_id, models.Product.created_at, models.Product.quantity
+        ),
+        rows,
+    )
+    return result.all()
+
+
+def create_products(db: Session, chunk: List[Row], current_user: schemas.TokenData, result: dict):
+    """Validate and insert one chunk of product rows, then commit it."""
+    valid, indexes = [], []
+    for index, raw in chunk:
+        if not isinstance(raw, dict) or "__error__" in raw:
+            error = raw.get("__error__") if isinstance(raw, dict) else "row must be an object"
+            result["errors"].append({"index": index, "error": error})
+            continue
+        try:
+            product = schemas.ProductRequest.model_validate(raw)
+        except ValidationError as exc:
+            result["errors"].append({"index": index, "error": describe(exc)})
+            continue
+        valid.append({**product.model_dump(exclude_unset=True), "owner_id": current_user.user_id})
+        indexes.append(index)
+    if not valid:
+        return
+
+    try:
+        with db.begin_nested():
+            inserted = _insert(db, valid)
+    except SQLAlchemyError:
+        # toplu insert basarisiz: hatali satiri bulmak icin tek tek dene
+        inserted = []
+        for index, row in zip(indexes, valid):
+            try:
+                with db.begin_nested():
+                    inserted += _insert(db, [row])
+            except SQLAlchemyError as exc:
+                result["errors"].append({"index": index, "error": str(exc.orig or exc)})
+
+    counters.products_added(db, inserted)
+    low_stock.products_added(db, current_user.user_id, inserted)
+    if inserted:
+        cache.categories_changed(db, current_user.user_id)
+        events.products_created(db, current_user.user_id, inserted)
+    ids = [row.id for row in inserted]
+    audit.record_many(db, current_user.user_id, "create_product", "product", ids)
+    db.commit()
+    result["ids"].extend(ids)
+
+
+def adjust_stock(db: Session, chunk: List[Row], current_user: schemas.TokenData, result: dict):
+    """Validate and apply one chunk of {id, delta} rows in a single transaction.
+
+    Every item is still its own conditional UPDATE (see app/stock.py) so a
+    failing item changes nothing and the rest of the chunk goes through.
+    """
+    changed = []
+    for index, raw in chunk:
+        try:
+            item = schemas.StockAdjustment.model_validate(raw)
+        except ValidationError as exc:
+            result["errors"].append({"index": index, "error": describe(exc)})
+            continue
+        try:
+            product = stock.adjust(db, item.id, item.delta, current_user)
+        except HTTPException as exc:
+            result["errors"].append({"index": index, "error": exc.detail})
+            continue
+        changed.append((product.id, item.delta))
+    for action, ids in (("increase_stock", [i for i, d in changed if d >= 0]),
+                        ("decrease_stock", [i for i, d in changed if d < 0])):
+        audit.record_many(db, current_user.user_id, action, "product", ids)
+    db.commit()
+    result["ids"].extend(i for i, _ in changed)
@@ -0,0 +1,208 @@
+"""Cross-process broadcast for per-process state, through the database.
+
+With several workers (app/serve.py) every process has its own token cache,
+revocation list, memory cache and event broker. Modules register a channel:
+
+    bus.register("cache", collect=..., apply=...)
+
+`collect(session)` reads what a committing session changed (e.g. the cache
+keys it invalidates) and returns a JSON-able payload or None. The payload is
+written to `bus_messages` by a `before_commit` hook, inside the same
+transaction as the change itself, so other processes hear about exactly the
+writes that committed. `bus.send(channel, payload)` covers changes that are
+not tied to a session (token revocation). The committing process applies
+its own changes through the existing after_commit hooks; every other
+process runs a listener thread (started in the app lifespan) that polls
+every BUS_POLL_INTERVAL seconds and calls `apply(payload)` once per message.
+Messages older than BUS_RETENTION seconds are pruned.
+
+Ids are handed out when the row is inserted, not when it commits. SQLite
+has one writer at a time, so there the two orders agree and the listener
+simply reads `id > last seen`. On a server database (PostgreSQL) two
+transactions can commit in the other order: the lower id becomes visible
+after the higher one was read, and `id > last seen` would skip it for good
+(a lost token revocation or live event). There the listener keeps a floor
+instead: every id at or below it is settled, the rows above it are re-read
+on each poll and the ids already applied are skipped. The floor only moves
+past messages written more than BUS_LOOKBACK seconds ago, so a transaction
+may take that long between writing its messages and committing (workers
+share a host, hence a clock).
+
+BUS_ENABLED is off for a single process (nothing is written, the hooks return
+immediately); `python -m app.serve --workers N` turns it on. On a server
+database prefer CACHE_BACKEND=redis for the cache.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, delete, event, func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_meta = MetaData()
+bus_messages = Table(
+    "bus_messages",
+    _meta,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("origin", String(64), nullable=False),
+    Column("channel", String(50), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", Float, nullable=False),
+)
+
+# channel -> (collect, apply)
+_channels: Dict[str, tuple] = {}
+
+
+def register(channel: str, collect: Optional[Callable[[Session], Any]], apply: Callable[[Any], None]):
+    _channels[channel] = (collect, apply)
+
+
+class Listener:
+    PAGE = 1000
+
+    def __init__(self, poll_interval: float, retention: float, lookback: float):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lookback = lookback
+        self.engine: Optional[Engine] = None
+        self.origin = ""
+        self.last_id = 0  # bu id ve altindakiler kesinlesti
+        self._seen = set()  # last_id'den buyuk, uygulanmis id'ler
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.applied = 0
+
+    def start(self, engine: Engine):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.engine = engine
+        # pid + rastgele: fork edilen her worker farkli bir kaynak olur
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # SQLite'ta id sirasi commit sirasidir: geriye bakmaya gerek yok
+        if engine.dialect.name == "sqlite":
+            self.lookback = 0.0
+        with engine.connect() as conn:
+            self.last_id = conn.execute(
+                select(func.max(bus_messages.c.id)).where(bus_messages.c.created_at <= time.time() - self.lookback)
+            ).scalar() or 0
+        self._seen = set()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bus-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        thread, self._thread = self._thread, None
+        self._stop.set()
+        if thread is not None:
+            thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def poll(self) -> int:
+        """Apply the messages not seen yet; returns how many there were."""
+        settled = time.time() - self.lookback
+        after, new = self.last_id, 0
+        with self.engine.connect() as conn:
+            while True:
+                rows = conn.execute(
+                    select(bus_messages.c.id, bus_messages.c.origin, bus_messages.c.channel, bus_messages.c.payload,
+                           bus_messages.c.created_at)
+                    .where(bus_messages.c.id > after)
+                    .order_by(bus_messages.c.id)
+                    .limit(self.PAGE)
+                ).all()
+                for row in rows:
+                    # bundan eski (daha kucuk id'li) bir mesaj artik commit edilmeyi beklemiyor
+                    if not self.lookback or row.created_at <= settled:
+                        self.last_id = row.id
+                    if row.id in self._seen:
+                        continue
+                    new += 1
+                    self._apply(row)
+                    if self.lookback:
+                        self._seen.add(row.id)
+                if len(rows) < self.PAGE:
+                    break
+                after = rows[-1].id
+        self._seen = {i for i in self._seen if i > self.last_id}
+        return new
+
+    def _apply(self, row):
+        self.received += 1
+        if row.origin == self.origin or row.channel not in _channels:
+            return
+        try:
+            _channels[row.channel][1](json.loads(row.payload))
+            self.applied += 1
+        except Exception:
+            logger.exception("bus: applying %s message %s failed", row.channel, row.id)
+
+    def prune(self):
+        with self.engine.begin() as conn:
+            conn.execute(delete(bus_messages).where(bus_messages.c.created_at < time.time() - self.retention))
+
+    def _run(self):
+        last_prune = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+                if time.monotonic() - last_prune >= self.retention:
+                    self.prune()
+                    last_prune = time.monotonic()
+            except Exception:
+                logger.exception("bus: poll failed")
+
+    def stats(self) -> dict:
+        return {"enabled": settings.bus_enabled, "running": self.running, "origin": self.origin,
+                "last_id": self.last_id, "lookback": self.lookback, "pending": len(self._seen), "received": self.received, "applied": self.applied}
+
+
+listener = Listener(settings.bus_poll_interval, settings.bus_retention, settings.bus_lookback)
+
+
+def _row(channel: str, payload) -> dict:
+    return {"origin": listener.origin, "channel": channel, "payload": json.dumps(payload),
+            "created_at": time.time()}
+
+
+def send(channel: str, payload):
+    """Broadcast `payload` to the other processes right away (not tied to a transaction)."""
+    if settings.bus_enabled and listener.engine is not None:
+        with listener.engine.begin() as conn:
+            conn.execute(insert(bus_messages), [_row(channel, payload)])
+
+
+@event.listens_for(Session, "before_commit")
+def _write_messages(session: Session):
+    # savepoint commit'leri atlanir; mesajlar dis transaction ile bir kez yazilir
+    if not settings.bus_enabled or listener.engine is None or session.in_nested_transaction():
+        return
+    rows = []
+    for channel, (collect, _) in _channels.items():
+        payload = collect(session) if collect is not None else None
+        if payload:
+            rows.append(_row(channel, payload))
+    if rows:
+        session.execute(insert(bus_messages), rows)
+
+
+def start(engine: Engine):
+    if settings.bus_enabled:
+        listener.start(engine)
+
+
+def stop():
+    listener.stop()
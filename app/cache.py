@@ -0,0 +1,271 @@
+"""Read-through cache for hot product reads (/products/categories, /products/{id}).
+
+Entries are the rendered JSON body plus its ETag, so a hit costs no query and
+no serialisation, and a request whose `If-None-Match` matches gets a 304
+without opening a DB connection.
+
+CACHE_BACKEND=memory (default) keeps a per-process TTL/LRU; CACHE_BACKEND=redis
+uses CACHE_URL through the optional `redis` package. Any object with
+`get(key)`, `set(key, value, ex=seconds)` and `delete(*keys)` can stand in for
+the Redis client (`use(RedisCache(fake))`). CACHE_BACKEND=off disables caching.
+
+Keys:
+    categories:all          admins (and any non-"user" role) see every category
+    categories:user:<id>    a "user" only sees categories of their own products
+    product:<id>            product detail; the route has no per-user filter
+
+Write paths call `product_changed` / `categories_changed` / `owner_changed`.
+Like audit rows, the keys are kept on the session and only deleted after the
+transaction commits, so a concurrent read cannot re-cache the old row between
+the invalidation and the commit. A read that loaded the row just before the
+commit can still store it afterwards; CACHE_TTL bounds how long that lasts.
+With several workers the same keys reach the other processes' memory caches
+through app/bus.py.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import bus, models, schemas, serializers
+from app.config import settings
+
+MEMORY = "memory"
+REDIS = "redis"
+OFF = "off"
+
+
+class MemoryCache:
+    """Thread-safe TTL/LRU of bytes values."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, keys: Iterable[str]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"backend": MEMORY, "size": len(self._entries), "maxsize": self.maxsize, "ttl": self.ttl}
+
+
+class RedisCache:
+    """Same interface on top of a Redis(-compatible) client."""
+
+    def __init__(self, client, ttl: int, prefix: str = "aski:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def delete(self, keys: Iterable[str]):
+        keys = [self.prefix + k for k in keys]
+        if keys:
+            self.client.delete(*keys)
+
+    def clear(self):
+        # sadece bu uygulamanin anahtarlari
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def info(self) -> dict:
+        return {"backend": REDIS, "prefix": self.prefix, "ttl": self.ttl}
+
+
+class NullCache:
+    def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    def set(self, key: str, value: bytes):
+        pass
+
+    def delete(self, keys: Iterable[str]):
+        pass
+
+    def clear(self):
+        pass
+
+    def info(self) -> dict:
+        return {"backend": OFF}
+
+
+def _from_settings():
+    if settings.cache_backend == OFF:
+        return NullCache()
+    if settings.cache_backend == REDIS:
+        try:
+            import redis
+        except ImportError:  # optional dependency
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        if not settings.cache_url:
+            raise RuntimeError("CACHE_BACKEND=redis requires CACHE_URL")
+        return RedisCache(redis.Redis.from_url(settings.cache_url), settings.cache_ttl)
+    return MemoryCache(settings.cache_size, settings.cache_ttl)
+
+
+backend = _from_settings()
+_lock = threading.Lock()
+_counts = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+
+def use(new_backend):
+    """Swap the cache backend (e.g. a fake Redis client wrapped in RedisCache)."""
+    global backend
+    backend = new_backend
+
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _counts[name] += n
+
+
+def stats() -> dict:
+    with _lock:
+        counts = dict(_counts)
+    lookups = counts["hits"] + counts["misses"]
+    return {**backend.info(), **counts, "hit_ratio": counts["hits"] / lookups if lookups else 0.0}
+
+
+# ---------- KEYS ----------
+
+def categories_key(current_user: schemas.TokenData) -> str:
+    if current_user.role == "user":
+        return f"categories:user:{current_user.user_id}"
+    return "categories:all"
+
+
+def product_key(product_id: int) -> str:
+    return f"product:{product_id}"
+
+
+# ---------- READ ----------
+
+def _etag(body: bytes) -> str:
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def _matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in header.split(","))
+
+
+def respond(request: Request, key: str, load: Callable[[], object]) -> Response:
+    """Serve `key` from the cache, or call `load()` (JSON-able content) and cache its JSON.
+
+    Answers 304 when the client's If-None-Match matches the entry's ETag.
+    Exceptions from `load()` (e.g. 404) propagate and nothing is cached.
+    """
+    entry = backend.get(key)
+    if entry is None:
+        _count("misses")
+        body = serializers.dumps(load())
+        etag = _etag(body)
+        backend.set(key, etag.encode() + b"\n" + body)
+    else:
+        _count("hits")
+        etag, body = entry.split(b"\n", 1)
+        etag = etag.decode()
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request, etag):
+        _count("not_modified")
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def product_detail(product: models.Product) -> dict:
+    """`ProductResponse` as JSON-ready content for `respond`."""
+    return schemas.ProductResponse.model_validate(product, from_attributes=True).model_dump(mode="json")
+
+
+# ---------- INVALIDATION ----------
+
+def _invalidate(db: Session, keys: Iterable[str]):
+    db.info.setdefault("cache_keys", set()).update(keys)
+
+
+def product_changed(db: Session, product_id: int):
+    """Drop the cached detail of `product_id` once `db` commits."""
+    _invalidate(db, [product_key(product_id)])
+
+
+def categories_changed(db: Session, owner_id: int):
+    """Drop the category lists that can contain `owner_id`'s products once `db` commits."""
+    _invalidate(db, ["categories:all", f"categories:user:{owner_id}"])
+
+
+def owner_changed(db: Session, owner_id: int):
+    """The owner embedded in every product of `owner_id` changed (or is being deleted)."""
+    ids = db.query(models.Product.id).filter(models.Product.owner_id == owner_id).all()
+    _invalidate(db, [product_key(product_id) for product_id, in ids])
+    categories_changed(db, owner_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_committed(session: Session):
+    keys = session.info.pop("cache_keys", None)
+    if keys:
+        backend.delete(keys)
+        _count("invalidations", len(keys))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("cache_keys", None)
+
+
+def _collect_keys(session: Session):
+    # paylasilan (redis) cache'te diger sureclere haber vermeye gerek yok
+    if not isinstance(backend, MemoryCache):
+        return None
+    return sorted(session.info.get("cache_keys", ()))
+
+
+def _delete_remote(keys):
+    backend.delete(keys)
+
+
+bus.register("cache", _collect_keys, _delete_remote)
@@ -0,0 +1,162 @@
+"""Response compression (gzip, and brotli when the `brotli` package is installed).
+
+Pure ASGI middleware like app/metrics.py: no BaseHTTPMiddleware, the body
+is never buffered beyond what the app already sent in one message.
+
+    single-message bodies    compressed whole when at least COMPRESSION_MIN_SIZE
+                             bytes (small JSON is cheaper to send as is);
+                             Content-Length is replaced
+    streamed bodies          compressed message by message with a sync flush,
+                             so a streamed listing keeps arriving as it is
+                             produced; Content-Length is dropped
+
+Only text-like content types are compressed. Left alone: HEAD, 204/304,
+text/event-stream (every event must reach the client at once) and responses
+that already carry a Content-Encoding.
+The encoding follows the request's Accept-Encoding q-values; brotli wins a
+tie. Compressible responses get `Vary: Accept-Encoding`, and a strong ETag
+becomes weak when the body is compressed, since the bytes differ.
+"""
+import zlib
+from typing import Optional
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # opsiyonel: yoksa sadece gzip
+    brotli = None
+
+COMPRESSIBLE = (b"application/json", b"application/x-ndjson", b"application/javascript", b"application/xml",
+                b"text/")
+NOT_COMPRESSIBLE = (b"text/event-stream",)
+
+
+def _q(params: str) -> float:
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """"br", "gzip" or None for an Accept-Encoding header value."""
+    offered = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        offered[name.strip().lower()] = _q(params)
+    wildcard = offered.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in ("br", "gzip") if brotli is not None else ("gzip",):
+        q = offered.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _Gzip:
+    def __init__(self):
+        self._z = zlib.compressobj(settings.compression_level, zlib.DEFLATED, 31)  # 31: gzip header + trailer
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._z.compress(data)
+        return out + self._z.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.brotli_quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._c.process(data)
+        return out + (self._c.finish() if final else self._c.flush())
+
+
+ENCODERS = {"gzip": _Gzip, "br": _Brotli}
+
+
+def _compressible(headers) -> bool:
+    content_type = b""
+    for name, value in headers:
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.lower()
+    return content_type.startswith(COMPRESSIBLE) and not content_type.startswith(NOT_COMPRESSIBLE)
+
+
+def _with_vary(headers: list) -> list:
+    for i, (name, value) in enumerate(headers):
+        if name == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[i] = (name, value + b", Accept-Encoding")
+            return headers
+    headers.append((b"vary", b"Accept-Encoding"))
+    return headers
+
+
+def _encoded(headers: list, encoding: str, length: Optional[int]) -> list:
+    out = []
+    for name, value in headers:
+        if name == b"content-length":
+            continue
+        if name == b"etag" and not value.startswith(b"W/"):
+            value = b"W/" + value
+        out.append((name, value))
+    out.append((b"content-encoding", encoding.encode()))
+    if length is not None:
+        out.append((b"content-length", str(length).encode()))
+    return out
+
+
+class CompressionMiddleware:
+    """Pure ASGI gzip/brotli middleware (see the module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = b",".join(v for k, v in scope["headers"] if k == b"accept-encoding").decode("latin-1")
+        encoding = choose_encoding(accept) if accept else None
+
+        start = None
+        encoder = None
+
+        async def send_wrapper(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                if message["status"] in (204, 304) or not _compressible(headers):
+                    await send(message)
+                    return
+                # karar ilk govde mesajinda: boyut ve akis olup olmadigi o zaman belli
+                start = {**message, "headers": _with_vary(headers)}
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                if encoding is None or (not more and len(body) < settings.compression_min_size):
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                encoder = ENCODERS[encoding]()
+                data = encoder.compress(body, final=not more)
+                headers = _encoded(start["headers"], encoding, None if more else len(data))
+                await send({**start, "headers": headers})
+                await send({**message, "body": data})
+                return
+            await send({**message, "body": encoder.compress(body, final=not more)})
+
+        await self.app(scope, receive, send_wrapper)
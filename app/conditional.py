@@ -0,0 +1,135 @@
+"""Conditional GET (ETag / Last-Modified) for listing endpoints.
+
+Lists cannot be cached by body like /products/{id} (app/cache.py): they
+depend on filters, paging and on many rows. Instead every owner has a
+version in `catalog_versions` that a `before_commit` hook bumps, inside the
+writing transaction, for each owner the transaction changed products of
+(taken from the queued live events, app/events.py) or that was marked with
+`changed(db, owner_id)` (profile or low-stock threshold changes). A listing
+validator is then one cheap read that does not grow with the data:
+
+    a "user", or an admin filtering by owner_id   that owner's row (PK lookup)
+    everything else                               sum(version), max(changed_at)
+                                                  over one row per owner
+
+and the weak ETag hashes it with the path, the query string and the caller.
+Routes check it before running their query:
+
+    validators = conditional.validators(request, db, current_user)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+
+Any committed change in the scope changes the ETag, including deletes and
+changes outside a category/search filter (conservative, never stale).
+Last-Modified is the scope's latest change; it is only sent once that change
+is a full second old, because the HTTP date cannot tell apart two writes in
+the same second.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+
+from app import events, models, schemas
+from app.database import upsert
+
+
+def changed(db: Session, owner_id: int):
+    """Mark `owner_id`'s listings as changed when `db` commits (product writes are picked up on their own)."""
+    db.info.setdefault("catalog_owners", set()).add(owner_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_versions(session: Session):
+    # savepoint commit'leri atlanir; surum dis transaction'da bir kez artar
+    if session.in_nested_transaction():
+        return
+    owners = events.changed_owners(session) | session.info.pop("catalog_owners", set())
+    if not owners:
+        return
+    Version = models.CatalogVersion
+    now = datetime.utcnow()
+    # sirali: esyazan transaction'lar satirlari ayni sirada kilitler
+    for owner_id in sorted(owners):
+        upsert(session, Version, {"owner_id": owner_id, "version": 1, "changed_at": now}, ("owner_id",),
+               {"version": Version.version + 1, "changed_at": now})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("catalog_owners", None)
+
+
+def _scope_version(db: Session, owner_id: Optional[int]):
+    Version = models.CatalogVersion
+    if owner_id is not None:
+        row = db.query(Version.version, Version.changed_at).filter(Version.owner_id == owner_id).first()
+        return (f"owner:{owner_id}:{row.version}", row.changed_at) if row else (f"owner:{owner_id}:0", None)
+    total, changed_at = db.query(func.coalesce(func.sum(Version.version), 0), func.max(Version.changed_at)).one()
+    return f"all:{total}", changed_at
+
+
+def _http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+class Validators:
+    def __init__(self, request: Request, etag: str, last_modified: Optional[datetime]):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = self._fresh(request)
+
+    def _fresh(self, request: Request) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            # If-None-Match varsa If-Modified-Since yok sayilir (RFC 9110)
+            tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+            return "*" in tags or self.etag.removeprefix("W/") in tags
+        if_modified_since = request.headers.get("if-modified-since")
+        if not if_modified_since or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return self.last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+
+    @property
+    def headers(self) -> dict:
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache"}
+        if self.last_modified is not None:
+            headers["Last-Modified"] = _http_date(self.last_modified)
+        return headers
+
+    def not_modified(self) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers)
+
+
+def validators(request: Request, db: Session, current_user: schemas.TokenData, owner_id: Optional[int] = None,
+               everything: bool = False, extra: Iterable[str] = ()) -> Validators:
+    """Validators for a listing of `current_user`'s scope (see the module docstring).
+
+    everything=True: the response covers every owner whatever the caller's role
+    (e.g. /stats "all" totals). `extra` adds anything else the body depends on.
+    """
+    if everything:
+        owner_id = None
+    elif current_user.role == "user":
+        owner_id = current_user.user_id
+    version, changed_at = _scope_version(db, owner_id)
+    key = "|".join([
+        request.url.path, str(sorted(request.query_params.multi_items())),
+        f"{current_user.role}:{current_user.user_id}", version, *extra,
+    ])
+    etag = 'W/"%s"' % hashlib.sha1(key.encode()).hexdigest()
+    # ayni saniyedeki ikinci bir yazim Last-Modified'i degistirmez; o saniye bitene kadar sadece ETag
+    if changed_at is not None and datetime.utcnow() - changed_at < timedelta(seconds=1):
+        changed_at = None
+    return Validators(request, etag, changed_at)
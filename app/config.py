@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 from dotenv import load_dotenv
@@ -9,6 +11,71 @@ class Settings(BaseSettings):
     secret_key: str = Field(..., alias="SECRET_KEY")
     algorithm: str = Field(..., alias="ALGORITHM")
     access_token_expire_minutes: int = Field(..., alias="ACCESS_TOKEN_EXPIRE_MINUTES")
+    low_stock_threshold: int = Field(10, alias="LOW_STOCK_THRESHOLD")
+    low_stock_cache_ttl: float = Field(60.0, alias="LOW_STOCK_CACHE_TTL")
+    # DB baglanti havuzu ve sync route'lari calistiran thread havuzu
+    # engine profili: dev (SQL echo), prod, test; bkz. app/database.py
+    db_profile: Literal["dev", "prod", "test"] = Field("prod", alias="DB_PROFILE")
+    db_pool_size: int = Field(20, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(20, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(30, alias="DB_POOL_TIMEOUT")
+    threadpool_size: int = Field(40, alias="THREADPOOL_SIZE")
+    # SQLite baglanti pragmalari (busy_timeout ms, cache_size KiB, mmap_size byte)
+    sqlite_busy_timeout: int = Field(15000, alias="SQLITE_BUSY_TIMEOUT")
+    sqlite_cache_size: int = Field(65536, alias="SQLITE_CACHE_SIZE")
+    sqlite_mmap_size: int = Field(268435456, alias="SQLITE_MMAP_SIZE")
+    # bcrypt: maliyet faktoru ve ayri hash havuzu
+    bcrypt_rounds: int = Field(12, alias="BCRYPT_ROUNDS")
+    password_workers: int = Field(4, alias="PASSWORD_WORKERS")
+    password_queue_limit: int = Field(32, alias="PASSWORD_QUEUE_LIMIT")
+    # dogrulanmis JWT cache'i
+    token_cache_size: int = Field(10000, alias="TOKEN_CACHE_SIZE")
+    token_cache_ttl: int = Field(300, alias="TOKEN_CACHE_TTL")
+    # audit log: "buffered" (arka planda toplu yazim) ya da "durable" (ayni transaction)
+    audit_mode: Literal["buffered", "durable"] = Field("buffered", alias="AUDIT_MODE")
+    audit_batch_size: int = Field(500, alias="AUDIT_BATCH_SIZE")
+    audit_flush_interval: float = Field(1.0, alias="AUDIT_FLUSH_INTERVAL")
+    audit_max_pending: int = Field(100_000, alias="AUDIT_MAX_PENDING")
+    bulk_chunk_size: int = Field(1000, alias="BULK_CHUNK_SIZE")
+    # GET /products/export: sunucu tarafi cursor'dan her seferde okunan / gonderilen satir sayisi
+    export_chunk_size: int = Field(1000, alias="EXPORT_CHUNK_SIZE")
+    # buyuk listeler icin response_model dogrulamasini atlayan hizli JSON
+    fast_json: bool = Field(False, alias="FAST_JSON")
+    # kategori / urun detayi cache'i (bkz. app/cache.py)
+    cache_backend: Literal["memory", "redis", "off"] = Field("memory", alias="CACHE_BACKEND")
+    cache_url: Optional[str] = Field(None, alias="CACHE_URL")
+    cache_size: int = Field(10000, alias="CACHE_SIZE")
+    cache_ttl: int = Field(60, alias="CACHE_TTL")
+    # istek kabul kontrolu (bkz. app/ratelimit.py): cagiran basina token kovasi (saniyede token, kova boyu),
+    # paylasilan kovalar icin SQLite dosyasi, process basina ayni anda islenen istek siniri (0 = sinirsiz)
+    rate_limit_backend: Literal["memory", "sqlite", "off"] = Field("memory", alias="RATE_LIMIT_BACKEND")
+    rate_limit_rate: float = Field(20.0, alias="RATE_LIMIT_RATE")
+    rate_limit_burst: float = Field(100.0, alias="RATE_LIMIT_BURST")
+    rate_limit_path: Optional[str] = Field(None, alias="RATE_LIMIT_PATH")
+    rate_limit_max_callers: int = Field(100000, alias="RATE_LIMIT_MAX_CALLERS")
+    max_in_flight: int = Field(200, alias="MAX_IN_FLIGHT")
+    # yanit sikistirma (bkz. app/compression.py): esik byte, gzip seviyesi (1-9), brotli kalitesi (0-11)
+    compression_enabled: bool = Field(True, alias="COMPRESSION_ENABLED")
+    compression_min_size: int = Field(1024, alias="COMPRESSION_MIN_SIZE")
+    compression_level: int = Field(6, alias="COMPRESSION_LEVEL")
+    brotli_quality: int = Field(4, alias="BROTLI_QUALITY")
+    # istek/SQL metrikleri (/metrics), Server-Timing header'i ve yavas istek logu (0 = kapali)
+    metrics_enabled: bool = Field(True, alias="METRICS_ENABLED")
+    server_timing: bool = Field(False, alias="SERVER_TIMING")
+    slow_request_ms: int = Field(500, alias="SLOW_REQUEST_MS")
+    # canli degisiklik akisi (/events): abone kuyrugu, yeniden baglanma gecmisi, keepalive saniyesi,
+    # URL'deki stream token'in omru (saniye)
+    events_queue_size: int = Field(256, alias="EVENTS_QUEUE_SIZE")
+    events_history: int = Field(1000, alias="EVENTS_HISTORY")
+    events_keepalive: float = Field(15.0, alias="EVENTS_KEEPALIVE")
+    events_token_ttl: int = Field(60, alias="EVENTS_TOKEN_TTL")
+    # coklu worker (bkz. app/serve.py): worker sayisi, acilista sema kurulumu, surecler arasi bus
+    web_concurrency: int = Field(1, alias="WEB_CONCURRENCY")
+    schema_setup: bool = Field(True, alias="SCHEMA_SETUP")
+    bus_enabled: bool = Field(False, alias="BUS_ENABLED")
+    bus_poll_interval: float = Field(0.2, alias="BUS_POLL_INTERVAL")
+    bus_retention: float = Field(60.0, alias="BUS_RETENTION")
+    bus_lookback: float = Field(10.0, alias="BUS_LOOKBACK")
 
     class Config:
         extra = "forbid"
@@ -0,0 +1,227 @@
+"""Materialized inventory counters.
+
+`product_counters` holds, per owner and per creation day, how many products
+exist and how many of them are below `settings.low_stock_threshold`. The
+product write paths update it in the same transaction as the product row, so
+/stats and /stats/daily read O(owners x days) rows instead of scanning
+`products`.
+
+Rebuild or check the table against `products` with:
+
+    python -m app.counters verify
+    python -m app.counters rebuild
+"""
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app import models
+from app.database import upsert
+from app.config import settings
+from app.stats_engine import day_key, today_start
+
+LOW_STOCK_THRESHOLD = settings.low_stock_threshold
+
+
+def _is_low(quantity: int) -> int:
+    return 1 if quantity is not None and quantity < LOW_STOCK_THRESHOLD else 0
+
+
+def _bump(db: Session, owner_id: int, day: date, products: int, low_stock: int):
+    if not products and not low_stock:
+        return
+    Counter = models.ProductCounter
+    upsert(
+        db, Counter,
+        {"owner_id": owner_id, "day": day, "products": products, "low_stock": low_stock},
+        ("owner_id", "day"),
+        {"products": Counter.products + products, "low_stock": Counter.low_stock + low_stock},
+    )
+
+
+def _product_day(product: models.Product) -> date:
+    # created_at comes from a server default; it is loaded lazily after flush
+    return product.created_at.date() if product.created_at else today_start().date()
+
+
+def product_added(db: Session, product: models.Product):
+    """Count a new product. Call after `db.flush()` so created_at is available."""
+    _bump(db, product.owner_id, _product_day(product), 1, _is_low(product.quantity))
+
+
+def products_added(db: Session, products):
+    """Count many new products (rows with owner_id, created_at and quantity) with one bump per owner/day."""
+    totals: Dict[Tuple[int, date], List[int]] = {}
+    for product in products:
+        entry = totals.setdefault((product.owner_id, _product_day(product)), [0, 0])
+        entry[0] += 1
+        entry[1] += _is_low(product.quantity)
+    for (owner_id, day), (added, low) in totals.items():
+        _bump(db, owner_id, day, added, low)
+
+
+def product_removed(db: Session, product: models.Product):
+    _bump(db, product.owner_id, _product_day(product), -1, -_is_low(product.quantity))
+
+
+def quantity_changed(db: Session, product: models.Product, old_quantity: int):
+    _bump(db, product.owner_id, _product_day(product), 0, _is_low(product.quantity) - _is_low(old_quantity))
+
+
+def owner_removed(db: Session, owner_id: int):
+    db.query(models.ProductCounter).filter(models.ProductCounter.owner_id == owner_id).delete(synchronize_session=False)
+
+
+# ---------- READS ----------
+
+def compute_stats(db: Session, user_id: int, threshold: int) -> dict:
+    """Totals, low stock and added today (all vs. mine), answered from the counters.
+
+    Low stock is only materialized for the configured threshold; any other
+    threshold falls back to a single count over `products`.
+    """
+    Counter = models.ProductCounter
+    mine = Counter.owner_id == user_id
+    today = Counter.day == today_start().date()
+
+    row = db.query(
+        func.sum(Counter.products),
+        func.sum(case((mine, Counter.products), else_=0)),
+        func.sum(Counter.low_stock),
+        func.sum(case((mine, Counter.low_stock), else_=0)),
+        func.sum(case((today, Counter.products), else_=0)),
+        func.sum(case((mine & today, Counter.products), else_=0)),
+    ).one()
+    total_all, total_mine, low_all, low_mine, today_all, today_mine = (int(v or 0) for v in row)
+
+    if threshold != LOW_STOCK_THRESHOLD:
+        Product = models.Product
+        low = Product.quantity < threshold
+        low_all, low_mine = db.query(
+            func.count(case((low, 1))),
+            func.count(case((low & (Product.owner_id == user_id), 1))),
+        ).one()
+
+    return {
+        "totals": {"all": total_all, "mine": total_mine},
+        "low_stock": {"all": low_all or 0, "mine": low_mine or 0, "threshold": threshold},
+        "added_today": {"all": today_all, "mine": today_mine},
+    }
+
+
+def compute_daily(db: Session, user_id: int, days: int) -> List[dict]:
+    Counter = models.ProductCounter
+    first_day = today_start().date() - timedelta(days=days - 1)
+
+    rows = (
+        db.query(
+            Counter.day,
+            func.sum(Counter.products),
+            func.sum(case((Counter.owner_id == user_id, Counter.products), else_=0)),
+        )
+        .filter(Counter.day >= first_day)
+        .group_by(Counter.day)
+        .all()
+    )
+    counts = {day_key(day): (int(count_all or 0), int(count_mine or 0)) for day, count_all, count_mine in rows}
+
+    out = []
+    for i in range(days):
+        day = (first_day + timedelta(days=i)).isoformat()
+        count_all, count_mine = counts.get(day, (0, 0))
+        out.append({"date": day, "count_all": count_all, "count_mine": count_mine})
+    return out
+
+
+# ---------- REBUILD / VERIFY ----------
+
+CounterKey = Tuple[int, str]
+
+
+def _expected(db: Session) -> Dict[CounterKey, Tuple[int, int]]:
+    Product = models.Product
+    day_col = func.date(Product.created_at)
+    rows = (
+        db.query(
+            Product.owner_id,
+            day_col,
+            func.count(Product.id),
+            func.count(case((Product.quantity < LOW_STOCK_THRESHOLD, 1))),
+        )
+        .group_by(Product.owner_id, day_col)
+        .all()
+    )
+    return {(owner_id, day_key(day)): (products, low) for owner_id, day, products, low in rows}
+
+
+def _stored(db: Session) -> Dict[CounterKey, Tuple[int, int]]:
+    Counter = models.ProductCounter
+    rows = db.query(Counter.owner_id, Counter.day, Counter.products, Counter.low_stock).all()
+    return {
+        (owner_id, day_key(day)): (products, low)
+        for owner_id, day, products, low in rows
+        if products or low
+    }
+
+
+def verify(db: Session) -> List[dict]:
+    """Return every (owner, day) whose stored counters differ from `products`."""
+    expected, stored = _expected(db), _stored(db)
+    drift = []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, (0, 0)), stored.get(key, (0, 0))
+        if want != have:
+            drift.append({
+                "owner_id": key[0],
+                "day": key[1],
+                "expected": {"products": want[0], "low_stock": want[1]},
+                "stored": {"products": have[0], "low_stock": have[1]},
+            })
+    return drift
+
+
+def rebuild(db: Session) -> int:
+    """Recompute every counter from `products`. Returns the number of rows written."""
+    expected = _expected(db)
+    db.query(models.ProductCounter).delete(synchronize_session=False)
+    db.add_all(
+        models.ProductCounter(owner_id=owner_id, day=date.fromisoformat(day), products=products, low_stock=low)
+        for (owner_id, day), (products, low) in expected.items()
+    )
+    db.commit()
+    return len(expected)
+
+
+def ensure_built(db: Session):
+    """Populate the counters once for databases that predate them."""
+    if db.query(models.ProductCounter).first() is None and db.query(models.Product.id).first() is not None:
+        rebuild(db)
+
+
+def main(argv: List[str]) -> int:
+    from app.database import SessionLocal
+
+    command = argv[0] if argv else "verify"
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"rebuilt {rebuild(db)} counter rows")
+            return 0
+        if command == "verify":
+            drift = verify(db)
+            for d in drift:
+                print(f"owner={d['owner_id']} day={d['day']} expected={d['expected']} stored={d['stored']}")
+            print("counters OK" if not drift else f"{len(drift)} drifted counter rows")
+            return 1 if drift else 0
+        print("usage: python -m app.counters [verify|rebuild]")
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,20 +1,195 @@
-from sqlalchemy import create_engine
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+import anyio
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.concurrency import iterate_in_threadpool
 from app.config import settings
+from app import metrics
 
 SQLALCHEMY_DATABASE_URL = settings.database_url
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False},echo=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# DB_PROFILE: dev loglar her SQL'i (echo), prod/test loglamaz. SQLite icin
+# pragmalar her yeni baglantida uygulanir; WAL sayesinde okuyucular yaziciyi
+# bloklamaz, busy_timeout ile yazicilar "database is locked" yerine sirada bekler.
+PROFILES = {
+    "dev": {
+        "echo": True,
+        "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL"},
+    },
+    "prod": {
+        "echo": False,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "pragmas": {"journal_mode": "WAL", "synchronous": "NORMAL", "temp_store": "MEMORY"},
+    },
+    "test": {
+        "echo": False,
+        "pragmas": {"journal_mode": "WAL", "synchronous": "OFF", "temp_store": "MEMORY"},
+    },
+}
+
+
+def _is_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _pool_args(url: str) -> dict:
+    """Pool sizing from settings.
+
+    In-memory SQLite gets StaticPool: one connection shared by every thread.
+    The default (SingletonThreadPool) opens one per thread, and each of those
+    is a separate, empty database, while routes run on threadpool workers.
+    """
+    if _is_memory(make_url(url)):
+        return {"poolclass": StaticPool}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
+
+def sqlite_pragmas(profile: str, url) -> dict:
+    """Connect-time PRAGMAs for `profile`; journal and mmap settings are skipped for in-memory databases."""
+    pragmas = {
+        "busy_timeout": settings.sqlite_busy_timeout,
+        "cache_size": -settings.sqlite_cache_size,  # negatif deger = KiB
+        **PROFILES[profile]["pragmas"],
+    }
+    if profile != "test" and settings.sqlite_mmap_size:
+        pragmas["mmap_size"] = settings.sqlite_mmap_size
+    if _is_memory(url):
+        pragmas.pop("journal_mode", None)
+        pragmas.pop("mmap_size", None)
+    return pragmas
+
+
+def make_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = settings.db_profile) -> Engine:
+    """Engine for `url` configured by the named profile (dev/prod/test)."""
+    if profile not in PROFILES:
+        raise ValueError(f"unknown DB_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+    options = PROFILES[profile]
+    u = make_url(url)
+    kwargs = {"echo": options["echo"], **_pool_args(url)}
+
+    if u.get_backend_name() != "sqlite":
+        kwargs.update({k: options[k] for k in ("pool_pre_ping", "pool_recycle") if k in options})
+        return create_engine(url, **kwargs)
+
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+    pragmas = sqlite_pragmas(profile, u)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+# INSERT ... ON CONFLICT DO UPDATE destekleyen dialect'ler
+_UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def upsert(db: Session, model, values: dict, key: tuple, set_: dict):
+    """Insert `values`, or apply `set_` to the row already holding the same `key` columns.
+
+    One INSERT ... ON CONFLICT DO UPDATE statement, so two transactions that
+    write the first row for a key at the same time both succeed instead of
+    one failing with IntegrityError (UPDATE, then INSERT if nothing matched).
+    `set_` may refer to the existing row's columns (`Model.count + 1`).
+    """
+    dialect_insert = _UPSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        # diger backend'ler: eski yol (esyazimda yaris var)
+        where = [getattr(model, k) == values[k] for k in key]
+        if not db.query(model).filter(*where).update(set_, synchronize_session=False):
+            db.execute(insert(model).values(**values))
+        return
+    stmt = dialect_insert(model).values(**values)
+    db.execute(stmt.on_conflict_do_update(index_elements=list(key), set_=set_))
+
+
+_engine: Optional[Engine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    """The application engine, created (and instrumented) on first use rather than at import."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = make_engine()
+                metrics.instrument(engine)
+                _engine = engine
+    return _engine
+
+
+def __getattr__(name: str):
+    # `from app.database import engine` eskisi gibi calisir, engine o an olusur
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class LazySession(Session):
+    """Session that binds itself to `get_engine()` when it first needs a connection."""
+
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+
+# expire_on_commit=False: route'lar commit'ten sonra donen nesneyi tekrar
+# SELECT etmeden serialize edebilsin (gerekenler zaten db.refresh yapiyor)
+SessionLocal = sessionmaker(class_=LazySession, autocommit=False, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+_db_slots = None
+
+def _session_slots() -> anyio.CapacityLimiter:
+    global _db_slots
+    if _db_slots is None:
+        _db_slots = anyio.CapacityLimiter(settings.db_pool_size + settings.db_max_overflow)
+    return _db_slots
+
+async def get_db():
+    # Sync route'lar (ve response serialisation) thread havuzunda calisir. Oturum
+    # sayisini havuz boyutuyla sinirliyoruz; bekleyen istekler event loop'ta
+    # bekler, hicbir thread baglanti icin bloklanmaz (pool deadlock olmaz).
+    async with _session_slots():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+async def with_session_slot(body: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Stream a sync `body` that opens its own session (exports) while holding a `get_db` slot.
+
+    Such a body keeps a pool connection until its last chunk; without a slot
+    enough concurrent exports would take every connection and the normal
+    routes would time out waiting for one.
+    """
+    async with _session_slots():
+        try:
+            async for chunk in iterate_in_threadpool(body):
+                yield chunk
+        finally:
+            # istemci koptuysa da oturum (ve cursor) hemen kapansin
+            await anyio.to_thread.run_sync(body.close)
 
 # This function is used to get a database session for dependency injection in FastAPI routes.
 
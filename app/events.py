@@ -0,0 +1,282 @@
+"""Live product change feed (Server-Sent Events).
+
+Write paths describe what they changed with `product_event` / `products_created`
+/ `owner_removed`. Like cache invalidations and audit rows, the events wait on
+the session and are only published after the transaction commits, so a client
+never sees a change that was rolled back.
+
+    GET /events                 text/event-stream, scoped like the listings:
+                                a "user" gets events for their own products,
+                                admins get everything
+    POST /events/token          {"stream_token", "expires_in"}: for browsers
+
+A browser EventSource cannot send an Authorization header, so it passes
+`?stream_token=` in the URL instead. URLs end up in access logs, proxy logs
+and browser history, which is why that is never the access token: a stream
+token is only accepted by GET /events/ (it is not a bearer token anywhere
+else) and expires after EVENTS_TOKEN_TTL seconds, which only matters at
+connect time, so a client fetches a fresh one before each (re)connect. The
+app's own access log masks the value (oauth2.RedactTokens); logs in front
+of the app (reverse proxy) still see it for that short window.
+
+Event types (`event:` field, JSON `data:`):
+
+    product.created / product.updated / product.stock / product.deleted
+        {"product": {id, name, description, quantity, category, owner_id}, "old_quantity": ...}
+    products.created            a bulk insert: {"owner_id", "ids", "count"}
+    products.deleted            every product of a deleted user: {"owner_id"}
+    low_stock.entered / low_stock.cleared
+        quantity crossed the owner's low-stock threshold (see app/low_stock.py)
+    resync                      events were lost; refetch the full state
+
+Publishing happens on the request's worker thread; the event is encoded there
+and handed to the event loop with one `call_soon_threadsafe`, where it is
+fanned out to the subscribers of its owner plus the admin subscribers. Each
+subscriber has a bounded queue (EVENTS_QUEUE_SIZE). A consumer that falls that
+far behind (slow network: the socket write blocks, its queue fills up) has its
+backlog dropped and replaced by a single `resync`, so one slow client costs
+bounded memory and never slows the others down.
+
+With several workers, events committed in one process reach the subscribers
+of the others through app/bus.py (within BUS_POLL_INTERVAL).
+
+Event ids are "<epoch>-<seq>". The last EVENTS_HISTORY events are kept, so a
+browser that reconnects with `Last-Event-ID` gets what it missed; if the id is
+too old or comes from another process (restart, other worker) it gets `resync`.
+"""
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import anyio
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import bus, low_stock, models, schemas, serializers
+from app.config import settings
+
+PRODUCT_FIELDS = ("id", "name", "description", "quantity", "category", "owner_id")
+RETRY_MS = 3000
+KEEPALIVE = b": keepalive\n\n"
+
+
+def _frame(event_id: str, kind: str, data: bytes) -> bytes:
+    return b"id: %s\nevent: %s\ndata: %s\n\n" % (event_id.encode(), kind.encode(), data)
+
+
+class Subscriber:
+    __slots__ = ("user_id", "sees_all", "queue", "overflows")
+
+    def __init__(self, current_user: schemas.TokenData, queue_size: int):
+        self.user_id = current_user.user_id
+        self.sees_all = current_user.role != "user"
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflows = 0
+
+    def offer(self, frame: bytes, resync: bytes) -> bool:
+        try:
+            self.queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            # yavas tuketici: birikmis olaylari at, yerine tek bir "resync" koy
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(resync)
+            self.overflows += 1
+            return False
+
+
+class Broker:
+    """In-process pub/sub. Subscribe/unsubscribe/dispatch run on the event loop;
+    `publish` may be called from any thread."""
+
+    def __init__(self, queue_size: int, history: int):
+        self.queue_size = queue_size
+        self.epoch = str(int(time.time() * 1000))
+        self._seq = itertools.count(1)
+        self._last = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_owner: Dict[int, Set[Subscriber]] = {}
+        self._all: Set[Subscriber] = set()
+        # (seq, owner_id, kind, data)
+        self._history: Deque[Tuple[int, int, str, bytes]] = deque(maxlen=history)
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    # ---------- loop thread ----------
+
+    def subscribe(self, current_user: schemas.TokenData, last_event_id: Optional[str] = None) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(current_user, self.queue_size)
+        if last_event_id:
+            self._replay(subscriber, last_event_id)
+        if subscriber.sees_all:
+            self._all.add(subscriber)
+        else:
+            self._by_owner.setdefault(subscriber.user_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._all.discard(subscriber)
+        owned = self._by_owner.get(subscriber.user_id)
+        if owned is not None:
+            owned.discard(subscriber)
+            if not owned:
+                del self._by_owner[subscriber.user_id]
+
+    def _replay(self, subscriber: Subscriber, last_event_id: str):
+        epoch, _, seq = last_event_id.partition("-")
+        oldest = self._history[0][0] if self._history else self._last + 1
+        if epoch != self.epoch or not seq.isdigit() or not oldest - 1 <= int(seq) <= self._last:
+            subscriber.offer(self._resync(), b"")
+            return
+        for event_seq, owner_id, kind, data in self._history:
+            if event_seq > int(seq) and (subscriber.sees_all or owner_id == subscriber.user_id):
+                if not subscriber.offer(_frame(f"{self.epoch}-{event_seq}", kind, data), self._resync()):
+                    return
+
+    def _resync(self) -> bytes:
+        return _frame(f"{self.epoch}-{self._last}", "resync", b"{}")
+
+    def _dispatch(self, events: List[Tuple[int, str, bytes]]):
+        for owner_id, kind, data in events:
+            seq = self._last = next(self._seq)
+            self._history.append((seq, owner_id, kind, data))
+            self.published += 1
+            targets = self._by_owner.get(owner_id, ())
+            if not targets and not self._all:
+                continue
+            frame = _frame(f"{self.epoch}-{seq}", kind, data)
+            resync = _frame(f"{self.epoch}-{seq}", "resync", b"{}")
+            for subscriber in itertools.chain(targets, self._all):
+                if subscriber.offer(frame, resync):
+                    self.delivered += 1
+                else:
+                    self.overflows += 1
+
+    # ---------- any thread ----------
+
+    def publish(self, events: List[Tuple[int, str, bytes]]):
+        loop = self._loop
+        if loop is None:
+            # henuz kimse baglanmadi
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, events)
+        except RuntimeError:
+            # loop kapanmis (test istemcisi / kapanis)
+            self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._all) + sum(len(s) for s in self._by_owner.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "overflows": self.overflows,
+            "history": len(self._history),
+        }
+
+
+broker = Broker(settings.events_queue_size, settings.events_history)
+
+
+async def stream(subscriber: Subscriber, keepalive: Optional[float] = None):
+    """SSE body for one subscriber; unsubscribes when the client goes away."""
+    keepalive = settings.events_keepalive if keepalive is None else keepalive
+    queue = subscriber.queue
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        while True:
+            frame = None
+            # wait_for yerine cancel scope: get() gorev icinde beklenir, iptal yutulmaz
+            with anyio.move_on_after(keepalive):
+                frame = await queue.get()
+            if frame is None:
+                yield KEEPALIVE
+                continue
+            if queue.empty():
+                yield frame
+                continue
+            # birikenleri tek yazimda gonder
+            frames = [frame]
+            while not queue.empty():
+                frames.append(queue.get_nowait())
+            yield b"".join(frames)
+    finally:
+        broker.unsubscribe(subscriber)
+
+
+# ---------- WRITE PATHS ----------
+
+def _emit(db: Session, owner_id: int, kind: str, content: dict):
+    db.info.setdefault("events", []).append((owner_id, kind, serializers.dumps(content)))
+
+
+def _product(product: models.Product) -> dict:
+    return {field: getattr(product, field) for field in PRODUCT_FIELDS}
+
+
+def product_event(db: Session, kind: str, product: models.Product, old_quantity: Optional[int] = None):
+    """Queue a `product.<kind>` event (created/updated/stock/deleted) for after the commit.
+
+    `old_quantity` is the quantity before the change (None for a new product);
+    crossing the owner's low-stock threshold either way also queues an alert.
+    """
+    data = _product(product)
+    _emit(db, product.owner_id, f"product.{kind}", {"product": data, "old_quantity": old_quantity})
+    if kind == "deleted":
+        return
+    threshold = low_stock.write_threshold(db, product.owner_id)
+    was_low = old_quantity is not None and old_quantity < threshold
+    is_low = product.quantity is not None and product.quantity < threshold
+    if was_low != is_low:
+        _emit(db, product.owner_id, "low_stock.entered" if is_low else "low_stock.cleared",
+              {"product": data, "threshold": threshold})
+
+
+def products_created(db: Session, owner_id: int, rows: Iterable):
+    """One event for a bulk insert (rows with `.id` and `.quantity`), plus its low-stock ids."""
+    rows = list(rows)
+    if not rows:
+        return
+    ids = [row.id for row in rows]
+    _emit(db, owner_id, "products.created", {"owner_id": owner_id, "ids": ids, "count": len(ids)})
+    threshold = low_stock.write_threshold(db, owner_id)
+    low = [row.id for row in rows if row.quantity is not None and row.quantity < threshold]
+    if low:
+        _emit(db, owner_id, "low_stock.entered", {"ids": low, "threshold": threshold})
+
+
+def owner_removed(db: Session, owner_id: int):
+    _emit(db, owner_id, "products.deleted", {"owner_id": owner_id})
+
+
+def changed_owners(session: Session) -> Set[int]:
+    """Owners whose products the events queued on `session` are about."""
+    return {owner_id for owner_id, _, _ in session.info.get("events", ())}
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    events = session.info.pop("events", None)
+    if events:
+        broker.publish(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("events", None)
+
+
+def _collect_events(session: Session):
+    return [[owner_id, kind, data.decode()] for owner_id, kind, data in session.info.get("events", ())]
+
+
+def _publish_remote(events):
+    broker.publish([(owner_id, kind, data.encode()) for owner_id, kind, data in events])
+
+
+bus.register("events", _collect_events, _publish_remote)
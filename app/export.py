@@ -0,0 +1,97 @@
+"""Streaming product export (GET /products/export).
+
+Rows come from a server-side cursor as plain tuples (`queries.product_rows`),
+EXPORT_CHUNK_SIZE at a time through `yield_per`, and are encoded and sent
+one chunk at a time, so memory stays flat whatever the catalog size: no ORM
+objects, no list of all rows, no full response body. The export has its own
+session because the body is produced after the route has returned; the
+route streams it through `database.with_session_slot`, so it counts against
+the same session limit as `get_db`.
+
+    csv      header + one line per product; the product columns use the
+             names POST /products/bulk reads, so an export can be re-imported.
+             excel=true adds a UTF-8 BOM and defuses cells Excel would run
+             as formulas (leading = + - @).
+    ndjson   one `ProductResponse`-shaped JSON object per line.
+
+Compression is left to CompressionMiddleware (app/compression.py), which
+compresses the stream chunk by chunk as it is produced.
+Rows are in id order; the cursor holds one read transaction open until the
+last row is sent.
+"""
+import csv
+import io
+from typing import Iterator, Optional
+
+from app import models, schemas, serializers
+from app import search as search_index
+from app.config import settings
+from app.database import SessionLocal
+from app.queries import product_rows
+
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+CSV_COLUMNS = serializers.PRODUCT_FIELDS + ("owner_username",)
+_OWNER_USERNAME = len(serializers.PRODUCT_FIELDS) + serializers.OWNER_FIELDS.index("username")
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+
+
+def stream_rows(current_user: schemas.TokenData, search: Optional[str] = "",
+                category: Optional[str] = None) -> Iterator[tuple]:
+    """Yield `product_rows` tuples visible to `current_user` (same scoping as GET /products/), in id order."""
+    db = SessionLocal()
+    try:
+        query = product_rows(db)
+        if current_user.role == "user":
+            query = query.filter(models.Product.owner_id == current_user.user_id)
+        if category:
+            query = query.filter(models.Product.category == category)
+        if search:
+            query = search_index.apply(query, search, by_id=True)
+        else:
+            query = query.order_by(models.Product.id)
+        yield from query.execution_options(stream_results=True, yield_per=settings.export_chunk_size)
+    finally:
+        db.close()
+
+
+def _chunked(rows: Iterator[tuple]) -> Iterator[list]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= settings.export_chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _excel_safe(value):
+    # "=HYPERLINK(...)" gibi hucreler Excel'de formul olarak calismasin
+    if isinstance(value, str) and value.startswith(_FORMULA_START):
+        return "'" + value
+    return value
+
+
+def csv_body(rows: Iterator[tuple], excel: bool = False) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_COLUMNS)
+    n = len(serializers.PRODUCT_FIELDS)
+    head = "\ufeff" if excel else ""  # BOM: Excel UTF-8 oldugunu anlasin
+    for chunk in _chunked(rows):
+        for row in chunk:
+            values = [*row[:n], row[_OWNER_USERNAME]]
+            writer.writerow([_excel_safe(v) for v in values] if excel else values)
+        yield (head + buf.getvalue()).encode()
+        head = ""
+        buf.seek(0)
+        buf.truncate()
+    if head or buf.tell():
+        # bos export: sadece baslik satiri
+        yield (head + buf.getvalue()).encode()
+
+
+def ndjson_body(rows: Iterator[tuple]) -> Iterator[bytes]:
+    for chunk in _chunked(rows):
+        yield b"".join(serializers.dumps(item) + b"\n" for item in serializers.product_dicts(chunk))
+
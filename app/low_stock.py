@@ -0,0 +1,320 @@
+"""Low-stock watchlist and queries.
+
+Every owner has a low-stock threshold: `users.low_stock_threshold`, or
+LOW_STOCK_THRESHOLD when it is not set. `low_stock_items` (the watchlist)
+holds exactly the products whose quantity is below their owner's threshold,
+with owner and quantity copied in and indexed as (owner_id, quantity,
+product_id), so "what is low for this owner / for everyone" and its count
+read a small table instead of `products`. The product write paths keep it in
+sync in their own transaction:
+
+    product_saved(db, product, old_quantity)    create, update, stock change
+    products_added(db, owner_id, rows)          bulk insert
+    product_removed(db, product_id)
+    owner_removed(db, owner_id)
+    set_threshold(db, owner_id, threshold)      re-derives that owner's rows
+
+Only a change that moves a product across its threshold, or changes the
+quantity of a product already on the list, writes to the watchlist; stock
+changes on healthy products cost nothing extra.
+
+Write paths read the owner's threshold inside their own transaction (once per
+transaction, `write_threshold`), so the watchlist never follows a stale value.
+Reads use a per-process cache (`threshold_for`): an entry is dropped when a
+threshold change commits (in the other workers too, through app/bus.py), is
+not stored by a read that raced such a change, and lives at most
+LOW_STOCK_CACHE_TTL seconds anyway.
+
+An explicit `threshold` is answered from `products` through the
+(owner_id, quantity) and (quantity) indexes instead. Both modes, the stats,
+the counters and the live `low_stock.*` events use one comparison, "low" is
+`quantity < threshold`, so ?threshold=10 and an owner threshold of 10 select
+the same products. (The original /low_stock used `quantity <= threshold`
+with a default of 5.) Both orders are (quantity, id), keyset-paginated.
+
+    python -m app.low_stock verify     compare the watchlist with products
+    python -m app.low_stock rebuild    recompute it
+"""
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, func, insert, literal, select, tuple_
+from sqlalchemy.orm import Query, Session
+
+from app import bus, models, pagination, queries, schemas
+from app.database import upsert
+from app.config import settings
+
+DEFAULT_THRESHOLD = settings.low_stock_threshold
+WATCHLIST = "watchlist"
+
+_thresholds: Dict[int, tuple] = {}  # owner_id -> (threshold, expires_at)
+_lock = threading.Lock()
+# her _forget'ta artar: okuma suresince degistiyse okunan deger cache'e yazilmaz
+_generation = 0
+
+
+# ---------- THRESHOLDS ----------
+
+def _read_threshold(db: Session, owner_id: int) -> int:
+    custom = db.query(models.User.low_stock_threshold).filter(models.User.id == owner_id).scalar()
+    return DEFAULT_THRESHOLD if custom is None else custom
+
+
+def threshold_for(db: Session, owner_id: int) -> int:
+    """The owner's effective threshold (cached per process, for reads)."""
+    entry = _thresholds.get(owner_id)
+    if entry is not None and entry[1] > time.monotonic():
+        return entry[0]
+    generation = _generation
+    threshold = _read_threshold(db, owner_id)
+    with _lock:
+        if generation == _generation:
+            _thresholds[owner_id] = (threshold, time.monotonic() + settings.low_stock_cache_ttl)
+    return threshold
+
+
+def write_threshold(db: Session, owner_id: int) -> int:
+    """The owner's threshold as `db`'s transaction sees it; read once per transaction, never cached."""
+    seen = db.info.setdefault("low_stock_thresholds", {})
+    if owner_id not in seen:
+        seen[owner_id] = _read_threshold(db, owner_id)
+    return seen[owner_id]
+
+
+def _forget(owner_ids: Iterable[int]):
+    global _generation
+    with _lock:
+        _generation += 1
+        for owner_id in owner_ids:
+            _thresholds.pop(owner_id, None)
+
+
+def set_threshold(db: Session, owner_id: int, threshold: Optional[int]):
+    """Set (None: reset to LOW_STOCK_THRESHOLD) the owner's threshold and rebuild their watchlist rows."""
+    db.query(models.User).filter(models.User.id == owner_id).update(
+        {models.User.low_stock_threshold: threshold}, synchronize_session=False
+    )
+    Item, Product = models.LowStockItem, models.Product
+    db.query(Item).filter(Item.owner_id == owner_id).delete(synchronize_session=False)
+    effective = DEFAULT_THRESHOLD if threshold is None else threshold
+    db.info.setdefault("low_stock_thresholds", {})[owner_id] = effective
+    db.execute(insert(Item).from_select(
+        ["product_id", "owner_id", "quantity"],
+        select(Product.id, Product.owner_id, Product.quantity)
+        .where(Product.owner_id == owner_id, Product.quantity < effective),
+    ))
+    db.info.setdefault("low_stock_owners", set()).add(owner_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_committed(session: Session):
+    session.info.pop("low_stock_thresholds", None)
+    owners = session.info.pop("low_stock_owners", None)
+    if owners:
+        _forget(owners)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("low_stock_thresholds", None)
+    session.info.pop("low_stock_owners", None)
+
+
+bus.register("low_stock", lambda session: sorted(session.info.get("low_stock_owners", ())), _forget)
+
+
+# ---------- WRITE PATHS ----------
+
+def _put(db: Session, product_id: int, owner_id: int, quantity: int):
+    upsert(db, models.LowStockItem, {"product_id": product_id, "owner_id": owner_id, "quantity": quantity},
+           ("product_id",), {"quantity": quantity})
+
+
+def product_saved(db: Session, product: models.Product, old_quantity: Optional[int] = None):
+    """Keep `product` on / off the watchlist; `old_quantity` is None for a new product."""
+    threshold = write_threshold(db, product.owner_id)
+    was_low = old_quantity is not None and old_quantity < threshold
+    is_low = product.quantity < threshold
+    if is_low and not (was_low and old_quantity == product.quantity):
+        _put(db, product.id, product.owner_id, product.quantity)
+    elif was_low and not is_low:
+        product_removed(db, product.id)
+
+
+def products_added(db: Session, owner_id: int, rows):
+    """Bulk-inserted rows (with `.id` and `.quantity`) of one owner."""
+    threshold = write_threshold(db, owner_id)
+    low = [{"product_id": r.id, "owner_id": owner_id, "quantity": r.quantity} for r in rows if r.quantity < threshold]
+    if low:
+        db.execute(insert(models.LowStockItem), low)
+
+
+def product_removed(db: Session, product_id: int):
+    Item = models.LowStockItem
+    db.query(Item).filter(Item.product_id == product_id).delete(synchronize_session=False)
+
+
+def owner_removed(db: Session, owner_id: int):
+    Item = models.LowStockItem
+    db.query(Item).filter(Item.owner_id == owner_id).delete(synchronize_session=False)
+
+
+# ---------- QUERIES ----------
+
+def _owner_scope(current_user: schemas.TokenData, owner_id: Optional[int]) -> Optional[int]:
+    # "user" rolu sadece kendi urunlerini gorur; admin istege bagli owner_id ile filtreler
+    return current_user.user_id if current_user.role == "user" else owner_id
+
+
+def mode(threshold: Optional[int]) -> str:
+    return WATCHLIST if threshold is None else f"lt:{threshold}"
+
+
+def products(db: Session, current_user: schemas.TokenData, threshold: Optional[int] = None,
+             owner_id: Optional[int] = None, fast: bool = False) -> Query:
+    """Low-stock products visible to `current_user`, ordered by (quantity, id).
+
+    threshold=None reads the watchlist (each owner's own threshold); otherwise
+    `quantity < threshold` over products.
+    """
+    owner_id = _owner_scope(current_user, owner_id)
+    Product = models.Product
+    query = queries.product_rows(db) if fast else queries.products(db)
+    if threshold is None:
+        Item = models.LowStockItem
+        query = query.join(Item, Item.product_id == Product.id)
+        if owner_id is not None:
+            query = query.filter(Item.owner_id == owner_id)
+        return query.order_by(Item.quantity, Item.product_id)
+    query = query.filter(Product.quantity < threshold)
+    if owner_id is not None:
+        query = query.filter(Product.owner_id == owner_id)
+    return query.order_by(Product.quantity, Product.id)
+
+
+def after(query: Query, threshold: Optional[int], quantity: int, last_id: int) -> Query:
+    """Continue `products(...)` strictly after the (quantity, id) of the previous page's last row."""
+    if threshold is None:
+        key = tuple_(models.LowStockItem.quantity, models.LowStockItem.product_id)
+    else:
+        key = tuple_(models.Product.quantity, models.Product.id)
+    return query.filter(key > tuple_(literal(quantity), literal(last_id)))
+
+
+def page(query: Query, threshold: Optional[int], page_size: int, cursor: Optional[str]):
+    """(rows, next_cursor) for one keyset page of `products(...)`."""
+    if cursor:
+        pivot = pagination.decode_cursor(cursor, "quantity", mode(threshold), models.Product.quantity)
+        if pivot["value"] is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = after(query, threshold, pivot["value"], pivot["id"])
+    rows = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = pagination.encode_cursor("quantity", mode(threshold), rows[-1].quantity, rows[-1].id)
+    return rows, next_cursor
+
+
+def count(db: Session, current_user: schemas.TokenData, threshold: Optional[int] = None,
+          owner_id: Optional[int] = None) -> int:
+    """Count only: index-only over the watchlist or the (owner_id, quantity) / (quantity) index."""
+    owner_id = _owner_scope(current_user, owner_id)
+    if threshold is None:
+        Item = models.LowStockItem
+        query = db.query(func.count()).select_from(Item)
+        if owner_id is not None:
+            query = query.filter(Item.owner_id == owner_id)
+        return query.scalar()
+    Product = models.Product
+    query = db.query(func.count()).select_from(Product).filter(Product.quantity < threshold)
+    if owner_id is not None:
+        query = query.filter(Product.owner_id == owner_id)
+    return query.scalar()
+
+
+def reported_threshold(db: Session, current_user: schemas.TokenData, threshold: Optional[int],
+                       owner_id: Optional[int]) -> Optional[int]:
+    """The threshold a response applied: explicit, the single owner's own, or None (per owner)."""
+    if threshold is not None:
+        return threshold
+    owner_id = _owner_scope(current_user, owner_id)
+    return threshold_for(db, owner_id) if owner_id is not None else None
+
+
+# ---------- REBUILD / VERIFY ----------
+
+def _expected(db: Session) -> Dict[int, tuple]:
+    Product, User = models.Product, models.User
+    threshold = func.coalesce(User.low_stock_threshold, DEFAULT_THRESHOLD)
+    rows = (
+        db.query(Product.id, Product.owner_id, Product.quantity)
+        .join(User, User.id == Product.owner_id)
+        .filter(Product.quantity < threshold)
+        .all()
+    )
+    return {product_id: (owner_id, quantity) for product_id, owner_id, quantity in rows}
+
+
+def _stored(db: Session) -> Dict[int, tuple]:
+    Item = models.LowStockItem
+    rows = db.query(Item.product_id, Item.owner_id, Item.quantity).all()
+    return {product_id: (owner_id, quantity) for product_id, owner_id, quantity in rows}
+
+
+def verify(db: Session) -> List[dict]:
+    """Every product whose watchlist entry is missing, extra or out of date."""
+    expected, stored = _expected(db), _stored(db)
+    return [
+        {"product_id": pid, "expected": expected.get(pid), "stored": stored.get(pid)}
+        for pid in sorted(set(expected) | set(stored))
+        if expected.get(pid) != stored.get(pid)
+    ]
+
+
+def rebuild(db: Session) -> int:
+    """Recompute the watchlist from products and owner thresholds. Returns its size."""
+    expected = _expected(db)
+    db.query(models.LowStockItem).delete(synchronize_session=False)
+    if expected:
+        db.execute(insert(models.LowStockItem), [
+            {"product_id": pid, "owner_id": owner_id, "quantity": quantity}
+            for pid, (owner_id, quantity) in expected.items()
+        ])
+    db.commit()
+    return len(expected)
+
+
+def ensure_built(db: Session):
+    """Populate the watchlist once for databases filled without the write paths (migration, seeding)."""
+    if db.query(models.LowStockItem.product_id).first() is None and db.query(models.Product.id).first() is not None:
+        rebuild(db)
+
+
+def main(argv: List[str]) -> int:
+    from app.database import SessionLocal
+
+    command = argv[0] if argv else "verify"
+    db = SessionLocal()
+    try:
+        if command == "rebuild":
+            print(f"rebuilt watchlist with {rebuild(db)} products")
+            return 0
+        if command == "verify":
+            drift = verify(db)
+            for d in drift[:50]:
+                print(f"product={d['product_id']} expected={d['expected']} stored={d['stored']}")
+            print("watchlist OK" if not drift else f"{len(drift)} drifted watchlist rows")
+            return 1 if drift else 0
+        print("usage: python -m app.low_stock [verify|rebuild]")
+        return 2
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
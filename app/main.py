@@ -1,16 +1,38 @@
-from fastapi import FastAPI
-from . import models
-from app.database import engine
-from routers import products,auth,user,logs,stats
+from contextlib import asynccontextmanager
+from functools import partial
+
+import anyio.to_thread
+from fastapi import FastAPI, HTTPException, status
+from . import audit, bus, compression, metrics, oauth2, ratelimit, startup
+from app.config import settings
+from app.database import get_engine
+from routers import products,auth,user,logs,stats,events
 from fastapi.middleware.cors import CORSMiddleware
 
 
 
 
 
-models.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # DB kullanan route'lar sync "def"; FastAPI onlari bu thread havuzunda calistirir
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    # /events/?stream_token=... access log'a yazilmasin
+    oauth2.redact_access_log()
+    # sema kurulumu ve crypto backend'leri import'ta degil burada, process basina bir kez
+    await anyio.to_thread.run_sync(partial(startup.run, background=True))
+    audit.start()
+    bus.start(get_engine())
+    yield
+    bus.stop()
+    audit.stop()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# ilk eklenen en icte: sikistirma suresi de metriklere girer
+app.add_middleware(compression.CompressionMiddleware)
+# reddedilen istekler (429/503) de metriklerde gorunur
+app.add_middleware(ratelimit.AdmissionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],  # GÜVENLİK: "*" yerine frontend URL'ini yaz! Örn: ["http://localhost:3000"]
@@ -27,9 +49,17 @@ app.include_router(auth.router)
 app.include_router(user.router)
 app.include_router(logs.router)
 app.include_router(stats.router)
+app.include_router(events.router)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to my API!"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    return metrics.metrics_response()
+
+
@@ -0,0 +1,258 @@
+"""Request latency and SQL instrumentation, exposed in Prometheus text format.
+
+`MetricsMiddleware` times every request and labels it with the matched route
+template (`/products/{product_id}`, never the raw path, so label cardinality
+stays bounded). Engine hooks installed by `instrument(engine)` add each SQL
+statement's duration and row count to the request that issued it; the
+request is found through a contextvar, which FastAPI copies into the
+threadpool running sync routes. SQL issued outside a request (the audit
+writer, startup) is counted under route "<background>".
+
+Per request the hot path is two `perf_counter()` calls per statement, a list
+append, and one locked dict update when the response finishes.
+
+    GET /metrics            Prometheus exposition (METRICS_ENABLED)
+    Server-Timing header    SERVER_TIMING=true: app;dur=..., db;dur=...;desc="N queries"
+    slow request log        requests over SLOW_REQUEST_MS are logged with their statements
+                            (not event streams, which stay open by design)
+
+Rows: DML uses the cursor rowcount. SQLite reports -1 for SELECT, so on SQLite
+returned rows are counted with a connection row_factory; server backends
+report SELECT row counts through the cursor.
+"""
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import event
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BACKGROUND = "<background>"
+UNMATCHED = "<unmatched>"
+MAX_LOGGED_STATEMENTS = 50
+
+
+class RequestStats:
+    __slots__ = ("statements", "sql_seconds", "rows", "queries")
+
+    def __init__(self):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.queries: List[Tuple[float, str]] = []
+
+
+_current: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("request_stats", default=None)
+
+
+class Registry:
+    """Counters and latency histograms keyed by (method, route)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # (method, route) -> [bucket counts..., +Inf count, sum, sql statements, sql seconds, rows]
+        self._routes: Dict[Tuple[str, str], list] = {}
+        self._status: Dict[Tuple[str, str, int], int] = {}
+
+    def _entry(self, key):
+        entry = self._routes.get(key)
+        if entry is None:
+            entry = self._routes[key] = [0] * (len(self.buckets) + 1) + [0.0, 0, 0.0, 0]
+        return entry
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        n = len(self.buckets)
+        with self._lock:
+            entry = self._entry((method, route))
+            entry[bisect_left(self.buckets, seconds)] += 1
+            entry[n + 1] += seconds
+            entry[n + 2] += stats.statements
+            entry[n + 3] += stats.sql_seconds
+            entry[n + 4] += stats.rows
+            key = (method, route, status)
+            self._status[key] = self._status.get(key, 0) + 1
+
+    def observe_sql(self, seconds: float, rows: int):
+        """SQL issued outside of any request."""
+        n = len(self.buckets)
+        with self._lock:
+            entry = self._entry(("", BACKGROUND))
+            entry[n + 2] += 1
+            entry[n + 3] += seconds
+            entry[n + 4] += rows
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+            self._status.clear()
+
+    def render(self) -> str:
+        n = len(self.buckets)
+        with self._lock:
+            routes = {k: list(v) for k, v in self._routes.items()}
+            statuses = dict(self._status)
+
+        out = [
+            "# HELP http_requests_total Requests by method, route and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, code), count in sorted(statuses.items()):
+            out.append(f'http_requests_total{{method="{method}",route="{_escape(route)}",status="{code}"}} {count}')
+
+        out += [
+            "# HELP http_request_duration_seconds Request latency by method and route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), entry in sorted(routes.items()):
+            if route == BACKGROUND:
+                continue
+            labels = f'method="{method}",route="{_escape(route)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                out.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += entry[n]
+            out.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative}')
+            out.append(f"http_request_duration_seconds_sum{{{labels}}} {entry[n + 1]:.6f}")
+            out.append(f"http_request_duration_seconds_count{{{labels}}} {cumulative}")
+
+        for name, offset, kind, help_text in (
+            ("db_statements_total", 2, "d", "SQL statements executed, by the route that issued them."),
+            ("db_statement_seconds_total", 3, ".6f", "Time spent executing SQL, by route."),
+            ("db_rows_total", 4, "d", "Rows returned or affected by SQL, by route."),
+        ):
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for (method, route), entry in sorted(routes.items()):
+                out.append(f'{name}{{method="{method}",route="{_escape(route)}"}} {entry[n + offset]:{kind}}')
+        return "\n".join(out) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+registry = Registry()
+
+
+# ---------- ENGINE HOOKS ----------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    rows = cursor.rowcount if cursor.rowcount > 0 else 0
+    stats = _current.get()
+    if stats is None:
+        registry.observe_sql(elapsed, rows)
+        return
+    stats.statements += 1
+    stats.sql_seconds += elapsed
+    stats.rows += rows
+    if settings.slow_request_ms and len(stats.queries) < MAX_LOGGED_STATEMENTS:
+        stats.queries.append((elapsed, statement))
+
+
+def _count_row(cursor, row):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += 1
+    return row
+
+
+def _sqlite_row_counter(dbapi_connection, connection_record):
+    dbapi_connection.row_factory = _count_row
+
+
+def instrument(engine):
+    """Attach the SQL hooks to `engine` (idempotent)."""
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_row_counter)
+
+
+def uninstrument(engine):
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+    if event.contains(engine, "connect", _sqlite_row_counter):
+        event.remove(engine, "connect", _sqlite_row_counter)
+
+
+# ---------- MIDDLEWARE ----------
+
+def _server_timing(total: float, stats: RequestStats) -> bytes:
+    return (
+        f'app;dur={total * 1000:.1f}, db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries"'
+    ).encode()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+        event_stream = False
+
+        async def send_wrapper(message):
+            nonlocal status_code, event_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                event_stream = any(k == b"content-type" and v.startswith(b"text/event-stream")
+                                   for k, v in message.get("headers", ()))
+                if settings.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", _server_timing(time.perf_counter() - started, stats)))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", UNMATCHED)
+            registry.observe(scope["method"], route, status_code, elapsed, stats)
+            # SSE baglantilari dogasi geregi uzun surer
+            if settings.slow_request_ms and elapsed * 1000 >= settings.slow_request_ms and not event_stream:
+                _log_slow(scope, status_code, elapsed, stats)
+
+
+def _log_slow(scope, status_code: int, elapsed: float, stats: RequestStats):
+    lines = [
+        f"slow request {scope['method']} {scope['path']} -> {status_code} in {elapsed * 1000:.1f} ms, "
+        f"{stats.statements} queries ({stats.sql_seconds * 1000:.1f} ms), {stats.rows} rows"
+    ]
+    for seconds, statement in stats.queries:
+        lines.append(f"  {seconds * 1000:8.2f} ms  {' '.join(statement.split())}")
+    if stats.statements > len(stats.queries):
+        lines.append(f"  ... {stats.statements - len(stats.queries)} more")
+    logger.warning("\n".join(lines))
+
+
+def metrics_response() -> Response:
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
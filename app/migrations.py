@@ -0,0 +1,133 @@
+"""Versioned schema migrations.
+
+Each migration is a function run inside one transaction; the ids of applied
+migrations are recorded in `schema_migrations`, so every step runs once per
+database. Steps only add things (tables, indexes, the search index) and check
+for existing objects first, which lets databases created by the old bare
+`create_all` startup be brought up to date in place.
+
+    python -m app.migrations upgrade     apply pending migrations
+    python -m app.migrations status      list applied / pending migrations
+
+Adding a migration: append `("NNNN_name", function)` to MIGRATIONS. Never
+edit or reorder one that has shipped.
+"""
+import sys
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+
+from app import bus, models, search
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("id", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _create_indexes(conn: Connection, table, names: List[str]):
+    indexes = {index.name: index for index in table.indexes}
+    for name in names:
+        indexes[name].create(bind=conn, checkfirst=True)
+
+
+def _base_tables(conn: Connection):
+    # yeni veritabaninda tum tablolar index'leriyle olusur; eski veritabaninda
+    # sadece eksik tablolar eklenir, sonraki adimlar eksik index'leri tamamlar
+    models.Base.metadata.create_all(bind=conn)
+
+
+def _log_indexes(conn: Connection):
+    _create_indexes(conn, models.Log.__table__, [
+        "ix_logs_timestamp_id", "ix_logs_user_timestamp", "ix_logs_action_timestamp", "ix_logs_entity_timestamp",
+    ])
+
+
+def _product_search(conn: Connection):
+    search.setup(conn)
+
+
+def _product_owner_indexes(conn: Connection):
+    _create_indexes(conn, models.Product.__table__, [
+        "ix_products_owner_id", "ix_products_owner_created", "ix_products_owner_updated", "ix_products_owner_category",
+        "ix_products_owner_quantity", "ix_products_owner_name",
+        "ix_products_created_at", "ix_products_updated_at", "ix_products_quantity", "ix_products_category_created",
+    ])
+
+
+def _bus_messages(conn: Connection):
+    bus.bus_messages.create(bind=conn, checkfirst=True)
+
+
+def _low_stock_watchlist(conn: Connection):
+    if "low_stock_threshold" not in {c["name"] for c in inspect(conn).get_columns("users")}:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN low_stock_threshold INTEGER")
+    models.LowStockItem.__table__.create(bind=conn, checkfirst=True)
+    # mevcut urunler: baslangicta low_stock.ensure_built doldurur
+
+
+def _catalog_versions(conn: Connection):
+    # satiri olmayan sahip surum 0 sayilir; ilk yazimda satir olusur
+    models.CatalogVersion.__table__.create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS: List[Tuple[str, Callable[[Connection], None]]] = [
+    ("0001_base_tables", _base_tables),
+    ("0002_log_indexes", _log_indexes),
+    ("0003_product_search", _product_search),
+    ("0004_product_owner_indexes", _product_owner_indexes),
+    ("0005_bus_messages", _bus_messages),
+    ("0006_low_stock_watchlist", _low_stock_watchlist),
+    ("0007_catalog_versions", _catalog_versions),
+]
+
+
+def applied(engine: Engine) -> List[str]:
+    _meta.create_all(bind=engine)
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(select(schema_migrations.c.id).order_by(schema_migrations.c.id))]
+
+
+def pending(engine: Engine) -> List[str]:
+    done = set(applied(engine))
+    return [name for name, _ in MIGRATIONS if name not in done]
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Apply every pending migration in order; returns the ids that ran."""
+    todo = set(pending(engine))
+    ran = []
+    for name, migrate in MIGRATIONS:
+        if name not in todo:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(id=name, applied_at=datetime.utcnow()))
+        ran.append(name)
+    return ran
+
+
+def main(argv: List[str]) -> int:
+    from app.database import engine
+
+    command = argv[0] if argv else "status"
+    if command == "upgrade":
+        ran = upgrade(engine)
+        print("\n".join(f"applied {name}" for name in ran) or "already up to date")
+        return 0
+    if command == "status":
+        done = set(applied(engine))
+        for name, _ in MIGRATIONS:
+            print(f"{'applied' if name in done else 'pending'}  {name}")
+        return 0
+    print("usage: python -m app.migrations [upgrade|status]")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
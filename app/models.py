@@ -1,6 +1,6 @@
 from sqlalchemy.orm import relationship
 from app.database import  Base
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from datetime import datetime
 
@@ -18,6 +18,22 @@ class Product(Base):
 
     owner = relationship("User", back_populates="products")
 
+    # "user" rolu her sorguda owner_id ile filtreler; ardindan gelen filtre ya da
+    # siralama kolonu icin bilesik index. Admin listeleri (owner filtresi yok)
+    # icin siralama kolonlarinin tek basina index'leri.
+    __table_args__ = (
+        Index("ix_products_owner_id", "owner_id"),  # owner_id + ORDER BY id
+        Index("ix_products_owner_created", "owner_id", "created_at"),
+        Index("ix_products_owner_updated", "owner_id", "updated_at"),
+        Index("ix_products_owner_category", "owner_id", "category"),
+        Index("ix_products_owner_quantity", "owner_id", "quantity"),
+        Index("ix_products_owner_name", "owner_id", "name"),
+        Index("ix_products_created_at", "created_at"),
+        Index("ix_products_updated_at", "updated_at"),
+        Index("ix_products_quantity", "quantity"),
+        Index("ix_products_category_created", "category", "created_at"),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -29,6 +45,8 @@ class User(Base):
     fullname = Column(String(100), nullable=True)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     role = Column(String(50), nullable=False, default="user")
+    # bos ise LOW_STOCK_THRESHOLD; bkz. app/low_stock.py
+    low_stock_threshold = Column(Integer, nullable=True)
 
     products = relationship("Product", back_populates="owner", cascade="all, delete-orphan")
 
@@ -43,3 +61,46 @@ class Log(Base):
     timestamp = Column(DateTime, server_default=func.now(), nullable=False)
 
     user = relationship("User")
+
+    # /logs filtreleri ve (timestamp, id) keyset sayfalama icin
+    __table_args__ = (
+        Index("ix_logs_timestamp_id", "timestamp", "id"),
+        Index("ix_logs_user_timestamp", "user_id", "timestamp"),
+        Index("ix_logs_action_timestamp", "action", "timestamp"),
+        Index("ix_logs_entity_timestamp", "entity", "entity_id", "timestamp"),
+    )
+
+
+class ProductCounter(Base):
+    """Per-owner, per-creation-day product counters kept in sync by the product write paths."""
+    __tablename__ = "product_counters"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    products = Column(Integer, nullable=False, default=0)
+    low_stock = Column(Integer, nullable=False, default=0)
+
+
+class LowStockItem(Base):
+    """Watchlist: products below their owner's low-stock threshold, kept in sync by the product write paths."""
+    __tablename__ = "low_stock_items"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+    # (quantity, product_id) sirasiyla sayfalama: sahip bazinda ve tum sahipler icin
+    __table_args__ = (
+        Index("ix_low_stock_owner_quantity", "owner_id", "quantity", "product_id"),
+        Index("ix_low_stock_quantity", "quantity", "product_id"),
+    )
+
+
+class CatalogVersion(Base):
+    """Per-owner change counter for conditional GETs (app/conditional.py), bumped by every committed product write."""
+    __tablename__ = "catalog_versions"
+
+    # FK yok: silinen sahibin satiri kalir, boylece toplam surum geri gitmez
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    changed_at = Column(DateTime, nullable=False)
@@ -1,11 +1,19 @@
-from jose import jwt, JWTError
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
 from datetime import datetime,timedelta
-from app import schemas
+from app import bus, schemas
 from fastapi import Depends,HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+# EventSource header gonderemez: /events icin kisa omurlu ?stream_token= (bkz. create_stream_token)
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 
 
@@ -13,26 +21,168 @@ SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+
+class TokenCache:
+    """Bounded LRU of verified tokens -> TokenData.
+
+    Keys are SHA-256 digests of the raw token. An entry lives at most `ttl`
+    seconds and never past the token's own `exp`. `get` returns the token's
+    `iat` too, so the caller can check it against revocations made after the
+    entry was stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, user_id, iat, TokenData)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3], entry[2]
+
+    def put(self, key: str, token_data: schemas.TokenData, exp: float, iat: float):
+        if self.maxsize <= 0:
+            return
+        expires_at = min(exp, time.time() + self.ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, token_data.user_id, iat, token_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict_user(self, user_id: int):
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[1] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache(settings.token_cache_size, settings.token_cache_ttl)
+
+# user_id -> time of revocation; tokens issued before it are rejected
+_revoked_before = {}
+_revoked_lock = threading.Lock()
+
+
+def _revoked(user_id, iat: float) -> bool:
+    return iat < _revoked_before.get(user_id, 0)
+
+
+def _revoke(user_id: int, at: float):
+    # en uzun token omrunden eski iptaller gereksiz: o zamandan once verilen her token'in suresi doldu
+    horizon = time.time() - max(ACCESS_TOKEN_EXPIRE_MINUTES * 60, settings.events_token_ttl)
+    with _revoked_lock:
+        for old in [u for u, t in _revoked_before.items() if t < horizon]:
+            del _revoked_before[old]
+        _revoked_before[user_id] = max(at, _revoked_before.get(user_id, 0))
+    token_cache.evict_user(user_id)
+
+
+def revoke_user(user_id: int):
+    """Invalidate every token already issued to `user_id` (deleted user, role/password change)."""
+    at = time.time()
+    _revoke(user_id, at)
+    # diger worker'lar da bu kullanicinin token'larini reddetsin
+    bus.send("revoke", {"user_id": user_id, "at": at})
+
+
+bus.register("revoke", None, lambda payload: _revoke(payload["user_id"], payload["at"]))
+
+
+def _jose():
+    # python-jose (cryptography backend'iyle) ilk kullanimda yuklenir; bkz. app/startup.py
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+
+def warm_up():
+    """Load python-jose and its crypto backend now instead of on the first request."""
+    jwt, _ = _jose()
+    jwt.decode(jwt.encode({"warm_up": True}, SECRET_KEY, algorithm=ALGORITHM), SECRET_KEY, algorithms=[ALGORITHM])
+
+
 def create_token(data: dict):
     to_encode = data.copy()
 
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": time.time()})
 
+    jwt, _ = _jose()
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
     return encoded_jwt
 
-def verify_token(token:str ,credentials_exception):
+
+STREAM_SCOPE = "events"
+
+
+def create_stream_token(current_user: schemas.TokenData) -> str:
+    """A token that only opens GET /events/ and expires after EVENTS_TOKEN_TTL seconds.
+
+    EventSource cannot send headers, so the token goes in the URL, where
+    access logs and proxies can see it; it must not be the full access token.
+    """
+    jwt, _ = _jose()
+    now = time.time()
+    return jwt.encode(
+        {"user_id": current_user.user_id, "role": current_user.role, "scope": STREAM_SCOPE,
+         "iat": now, "exp": now + settings.events_token_ttl},
+        SECRET_KEY, algorithm=ALGORITHM,
+    )
+
+
+def verify_token(token:str ,credentials_exception, scope: Optional[str] = None):
+  # scope'lu token (stream) normal istekte, normal token scope'lu yerde gecmez
+  key = TokenCache.key(token if scope is None else f"{scope}:{token}")
+  cached = token_cache.get(key)
+  # cache'e yazim revoke_user'in evict'inden hemen sonra gelmis olabilir: iptal her okumada kontrol edilir
+  if cached is not None:
+      if _revoked(cached[0].user_id, cached[1]):
+          raise credentials_exception
+      return cached[0]
+  jwt, JWTError = _jose()
   try:
 
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     user_id:str = payload.get("user_id")
     role:str = payload.get("role")
 
-    if user_id is None:
+    if user_id is None or payload.get("scope") != scope:
+        raise credentials_exception
+    if _revoked(user_id, payload.get("iat", 0)):
         raise credentials_exception
     token_data = schemas.TokenData(user_id=user_id,role =role)
+    token_cache.put(key, token_data, payload.get("exp", 0), payload.get("iat", 0))
     return token_data
   except JWTError:
       raise credentials_exception
@@ -43,4 +193,35 @@ def get_current_user(token:str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"}
     )
-    return verify_token(token, credentials_exception)
\ No newline at end of file
+    return verify_token(token, credentials_exception)
+
+
+def get_stream_user(stream_token: Optional[str] = None, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    """Like `get_current_user`, but a browser EventSource may send a `?stream_token=` instead of the header."""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+    if token:
+        return verify_token(token, credentials_exception)
+    if stream_token:
+        return verify_token(stream_token, credentials_exception, scope=STREAM_SCOPE)
+    raise credentials_exception
+
+
+class RedactTokens(logging.Filter):
+    """Masks token query parameters in access log lines (uvicorn's `%s` args)."""
+
+    PATTERN = re.compile(r"(\b(?:stream_|access_)?token=)[^&\s]*")
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple):
+            record.args = tuple(self.PATTERN.sub(r"\1***", a) if isinstance(a, str) else a for a in record.args)
+        return True
+
+
+def redact_access_log():
+    logger = logging.getLogger("uvicorn.access")
+    if not any(isinstance(f, RedactTokens) for f in logger.filters):
+        logger.addFilter(RedactTokens())
@@ -0,0 +1,88 @@
+"""Opaque keyset cursors for /products/paged and /logs/paged.
+
+A cursor remembers the sort key, the direction and the last row seen as a
+(sort value, id) pair. The next page continues strictly after that row, so a
+deep page costs the same as the first one instead of an ever-growing OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import DateTime, Integer, String, literal, select, tuple_
+from sqlalchemy.sql import func
+
+
+
+def encode_cursor(sort_by: str, sort_dir: str, value: Any, last_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort_by, "d": sort_dir, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _sort_value(value: Any, col):
+    """The cursor's JSON value as `col`'s Python type; ValueError if it is not one."""
+    if value is None:
+        return None
+    if isinstance(col.type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(col.type, Integer) and _is_int(value):
+        return value
+    if isinstance(col.type, String) and isinstance(value, str):
+        return value
+    raise ValueError(f"{value!r} is not a {col.type}")
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_dir: str, col) -> dict:
+    """{"value", "id"} of the row the cursor points after, `value` already of `col`'s type.
+
+    A cursor comes back from the client, so anything that does not decode to
+    the shape `encode_cursor` writes is a 400, never a 500.
+    """
+    invalid = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(data, dict) or not _is_int(data.get("id")):
+            raise invalid
+        value = _sort_value(data.get("v"), col)
+    except (ValueError, TypeError):
+        raise invalid
+    if data.get("s") != sort_by or data.get("d") != sort_dir:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor does not match sort_by/sort_dir")
+    return {"value": value, "id": data["id"]}
+
+
+def after_cursor(query, col, sort_dir: str, value: Any, last_id: int):
+    """Filter `query` to rows strictly after (value, last_id) in (col, id) order.
+
+    `value` is of `col`'s Python type (see `decode_cursor`).
+
+    The pivot value is re-read from the cursor row inside the statement so the
+    comparison uses the stored representation (SQLite keeps server-default and
+    ORM-written timestamps in different text formats). The encoded value is
+    only used if that row has been deleted since.
+
+    The condition is a row-value comparison, `(col, id) > (pivot, last_id)`:
+    unlike the equivalent `col > pivot OR (col = pivot AND id > last_id)` it is
+    a range the planner can seek to in the (col) / (owner_id, col) index, so
+    a deep page does not scan every row before it.
+    """
+    model = col.class_
+    cursor_row = model.__table__.alias("cursor_row")
+    pivot = func.coalesce(
+        select(cursor_row.c[col.key]).where(cursor_row.c.id == last_id).scalar_subquery(),
+        literal(value, type_=col.type),
+    )
+    key, after = tuple_(col, model.id), tuple_(pivot, literal(last_id))
+    return query.filter(key > after if sort_dir == "asc" else key < after)
+
+
+def cursor_for(item, sort_by: str, sort_dir: str) -> str:
+    """Cursor pointing just after `item` (a Product or Log row) sorted by `sort_by`."""
+    return encode_cursor(sort_by, sort_dir, getattr(item, sort_by), item.id)
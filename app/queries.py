@@ -0,0 +1,28 @@
+"""Query shapes for routes that return products.
+
+`ProductResponse` embeds the owner, so every product-returning query loads
+`Product.owner` in the same statement (many-to-one -> LEFT OUTER JOIN users)
+instead of one lazy `SELECT users` per product during serialisation.
+"""
+from sqlalchemy.orm import Query, Session, joinedload
+
+from app import models
+from app.serializers import OWNER_FIELDS, PRODUCT_FIELDS
+
+PRODUCT_WITH_OWNER = (joinedload(models.Product.owner),)
+
+
+def products(db: Session) -> Query:
+    """`db.query(Product)` with the owner eagerly loaded."""
+    return db.query(models.Product).options(*PRODUCT_WITH_OWNER)
+
+
+def product_rows(db: Session) -> Query:
+    """Products joined with their owner as flat column tuples, for `serializers.product_dicts`.
+
+    Product columns keep their names (so filters, sorting and cursors work as
+    on `products()`); owner columns are labelled `owner__<field>`.
+    """
+    columns = [getattr(models.Product, f).label(f) for f in PRODUCT_FIELDS]
+    columns += [getattr(models.User, f).label(f"owner__{f}") for f in OWNER_FIELDS]
+    return db.query(*columns).join(models.User, models.Product.owner)
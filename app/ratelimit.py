@@ -0,0 +1,292 @@
+"""Admission control: per-caller token buckets and a cap on requests in flight.
+
+Both checks run in a pure ASGI middleware before routing, so a rejected
+request costs no database connection, no thread and no bcrypt.
+
+Rate limit. Every caller has a bucket of RATE_LIMIT_BURST tokens refilled at
+RATE_LIMIT_RATE tokens per second. The caller is "user:<id>" for a valid
+bearer token (header, or `?stream_token=` on /events), otherwise "ip:<client address>"
+(login, sign-up, missing or bad tokens). A request takes COSTS[(method,
+path)] tokens, 1 for routes not listed, so the expensive endpoints drain the
+bucket faster. When the bucket does not hold enough the request is answered
+429 with Retry-After (seconds until it will) and takes nothing.
+
+    RATE_LIMIT_BACKEND=memory   per-process buckets (default); with N workers
+                                a caller gets up to N times the rate
+    RATE_LIMIT_BACKEND=sqlite   buckets in one SQLite file (RATE_LIMIT_PATH)
+                                shared by every worker on the host, one
+                                UPSERT per request
+    RATE_LIMIT_BACKEND=off
+
+In-flight cap. At most MAX_IN_FLIGHT requests (per process, 0 = no cap) are
+handled at once; past that new requests get 503 with Retry-After at once
+instead of queueing for the thread pool behind everyone else. /events
+streams are long-lived and mostly idle, so they are rate limited when they
+connect but do not hold a slot. "/" and /metrics are exempt from both.
+"""
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from app import oauth2, serializers
+from app.config import settings
+
+MEMORY = "memory"
+SQLITE = "sqlite"
+OFF = "off"
+
+# (method, path) -> tokens per request; digerleri 1. Yollar sondaki "/" olmadan (bkz. _route)
+COSTS = {
+    ("POST", "/auth/login"): 10,           # bcrypt
+    ("POST", "/users/register"): 10,       # bcrypt
+    ("GET", "/products"): 5,               # the whole (own) catalog
+    ("GET", "/products/export"): 20,
+    ("POST", "/products/bulk"): 20,
+    ("PATCH", "/products/stock/bulk"): 20,
+    ("GET", "/stats"): 3,
+    ("GET", "/stats/daily"): 3,
+    ("GET", "/logs/export"): 20,
+}
+EXEMPT = {"", "/metrics"}
+# the SSE feed is served at /events/ (router prefix + "/")
+LONG_LIVED = {"/events"}
+
+
+class MemoryBuckets:
+    """Per-process token buckets, least recently used callers dropped past `maxsize`."""
+
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated)
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float) -> float:
+        """Take `cost` tokens; 0.0 if allowed, else seconds until the bucket holds `cost`."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < cost:
+                return (cost - tokens) / self.rate
+            self._buckets[key] = (tokens - cost, now)
+            self._buckets.move_to_end(key)
+            # atilan (en uzun sure bosta) cagiranin kovasi zaten dolmus olur
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return 0.0
+
+    def info(self) -> dict:
+        with self._lock:
+            return {"backend": MEMORY, "rate": self.rate, "burst": self.burst, "callers": len(self._buckets),
+                    "maxsize": self.maxsize}
+
+
+class SQLiteBuckets:
+    """Token buckets in a SQLite file shared by the worker processes of one host."""
+
+    # kilit beklemesi event loop'u durdurur: kisa tut, asilirsa istegi gecir
+    BUSY_TIMEOUT = 0.05
+    PRUNE_EVERY = 1000
+
+    TAKE = """
+        INSERT INTO rate_buckets (key, tokens, updated) VALUES (:key, :burst - :cost, :now)
+        ON CONFLICT (key) DO UPDATE
+            SET tokens = min(:burst, tokens + max(:now - updated, 0) * :rate) - :cost, updated = :now
+            WHERE min(:burst, tokens + max(:now - updated, 0) * :rate) >= :cost
+        RETURNING tokens
+    """
+
+    def __init__(self, path: str, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.errors = 0
+        self._takes = 0
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # kovalar kaybolursa sadece limitler sifirlanir
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, cost: float) -> float:
+        now = time.time()
+        params = {"key": key, "cost": cost, "now": now, "rate": self.rate, "burst": self.burst}
+        try:
+            conn = self._connection()
+            if conn.execute(self.TAKE, params).fetchall():
+                self._takes += 1
+                if self._takes % self.PRUNE_EVERY == 0:
+                    # bu kadar bosta kalan kova doludur; satirin olmamasiyla ayni
+                    conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - self.burst / self.rate,))
+                return 0.0
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return 0.0
+        if row is None:
+            return 0.0
+        tokens = min(self.burst, row[0] + max(now - row[1], 0) * self.rate)
+        return max(cost - tokens, 0.0) / self.rate
+
+    def info(self) -> dict:
+        return {"backend": SQLITE, "rate": self.rate, "burst": self.burst, "path": self.path, "errors": self.errors}
+
+
+class NullBuckets:
+    def take(self, key: str, cost: float) -> float:
+        return 0.0
+
+    def info(self) -> dict:
+        return {"backend": OFF}
+
+
+def _default_path() -> str:
+    # ayni DATABASE_URL'i kullanan worker'lar ayni dosyayi bulur
+    digest = hashlib.sha1(settings.database_url.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"ratelimit-{digest}.db")
+
+
+def _from_settings():
+    if settings.rate_limit_backend == OFF:
+        return NullBuckets()
+    if settings.rate_limit_backend == SQLITE:
+        return SQLiteBuckets(settings.rate_limit_path or _default_path(), settings.rate_limit_rate,
+                             settings.rate_limit_burst)
+    return MemoryBuckets(settings.rate_limit_rate, settings.rate_limit_burst, settings.rate_limit_max_callers)
+
+
+backend = None
+_backend_lock = threading.Lock()
+_counts = {"allowed": 0, "limited": 0, "shed": 0}
+_in_flight = 0
+_peak_in_flight = 0
+
+
+def _backend():
+    # SQLite dosyasi import'ta degil ilk istekte acilir (bkz. app/startup.py)
+    global backend
+    if backend is None:
+        with _backend_lock:
+            if backend is None:
+                backend = _from_settings()
+    return backend
+
+
+def use(new_backend):
+    """Swap the bucket backend (e.g. a MemoryBuckets with other limits)."""
+    global backend
+    backend = new_backend
+
+
+def stats() -> dict:
+    return {
+        **_backend().info(),
+        "max_in_flight": settings.max_in_flight,
+        "in_flight": _in_flight,
+        "peak_in_flight": _peak_in_flight,
+        **_counts,
+    }
+
+
+class _InvalidToken(Exception):
+    pass
+
+
+def caller(scope) -> str:
+    """"user:<id>" for a valid bearer token, else "ip:<client address>"."""
+    token, scope_name = None, None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                token = credentials.strip()
+            break
+    if token is None and scope.get("query_string"):
+        token = (parse_qs(scope["query_string"].decode("latin-1")).get("stream_token") or [None])[0]
+        scope_name = oauth2.STREAM_SCOPE
+    if token:
+        try:
+            # dogrulanmis token'lar oauth2.token_cache'te; route tekrar cozmez
+            return f"user:{oauth2.verify_token(token, _InvalidToken(), scope=scope_name).user_id}"
+        except _InvalidToken:
+            pass
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _route(path: str) -> str:
+    # "/events/" ile "/events", "/products/" ile "/products" ayni route
+    return path.rstrip("/")
+
+
+def cost(method: str, path: str) -> float:
+    # kovadan buyuk bir maliyet hic gecemezdi
+    return min(COSTS.get((method, _route(path)), 1), settings.rate_limit_burst)
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float):
+    body = serializers.dumps({"detail": detail})
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """Pure ASGI rate limiter and in-flight cap (see the module docstring)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global _in_flight, _peak_in_flight
+        path = _route(scope.get("path", ""))
+        if scope["type"] != "http" or path in EXEMPT or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        wait = _backend().take(caller(scope), cost(scope["method"], path))
+        if wait > 0:
+            _counts["limited"] += 1
+            await _reject(send, 429, "Too many requests", wait)
+            return
+
+        if path in LONG_LIVED or not settings.max_in_flight:
+            _counts["allowed"] += 1
+            await self.app(scope, receive, send)
+            return
+        # sayac sadece event loop'ta degisir, kilit gerekmez
+        if _in_flight >= settings.max_in_flight:
+            _counts["shed"] += 1
+            await _reject(send, 503, "Server is busy, please try again", 1)
+            return
+        _counts["allowed"] += 1
+        _in_flight += 1
+        _peak_in_flight = max(_peak_in_flight, _in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight -= 1
@@ -41,6 +41,7 @@ class AdminUpdateUser(BaseModel):
     username: Optional[str] = None
     password: Optional[str] = None
     role: Optional[str] = None
+    low_stock_threshold: Optional[int] = Field(None, ge=0, description="null resets it to LOW_STOCK_THRESHOLD")
 
     class Config:
         from_attributes = True
@@ -72,11 +73,30 @@ class IncreaseDecreaseStock(BaseModel):
     amount: int = Field(..., ge=0, description="Amount to increase the stock by")
 
 
+class StockAdjustment(BaseModel):
+    id: int
+    delta: int = Field(..., description="Positive to add stock, negative to remove it")
+
+class BulkRowError(BaseModel):
+    index: int  # 0-based position in the uploaded list/file
+    error: str
+
+class BulkResult(BaseModel):
+    succeeded: int
+    failed: int
+    ids: List[int] = []
+    errors: List[BulkRowError] = []
+
+
 class Token(BaseModel):
 
     access_token:str
     token_type:str = "bearer"
 
+class StreamToken(BaseModel):
+    stream_token: str
+    expires_in: int
+
 class TokenData(BaseModel):
     user_id: Optional[int] = None
     role: Optional[str] = None
@@ -97,11 +117,32 @@ class LogResponse(BaseModel):
 
 
 
+class PagedLogsResponse(BaseModel):
+    items: List[LogResponse]
+    next_cursor: Optional[str] = None
+
 class PagedProductsResponse(BaseModel):
     items: List[ProductResponse]
-    total: int
+    total: Optional[int] = None  # cursor modunda with_total=true degilse None
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+
+class PagedLowStockResponse(BaseModel):
+    items: List[ProductResponse]
+    threshold: Optional[int] = None  # None: her sahibin kendi esigi (watchlist)
+    next_cursor: Optional[str] = None
+
+class LowStockCount(BaseModel):
+    count: int
+    threshold: Optional[int] = None
+
+class LowStockThreshold(BaseModel):
+    threshold: Optional[int] = Field(None, ge=0, description="null resets it to LOW_STOCK_THRESHOLD")
+
+class LowStockThresholdResponse(BaseModel):
+    threshold: int
+    custom: bool
 
 class StatsSection(BaseModel):
     all: int
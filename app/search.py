@@ -0,0 +1,106 @@
+"""Indexed product search over name, description and category.
+
+SQLite uses an FTS5 external-content table kept in sync by triggers, so every
+insert/update/delete on `products` (ORM or bulk) updates the index in the same
+transaction. PostgreSQL uses a GIN index over a `to_tsvector` expression. Any
+other backend falls back to the old `name LIKE '%term%'` filter.
+
+Search terms are split into words and each word is matched as a prefix, so
+"blu wid" finds "Blue widget".
+"""
+import re
+from typing import List
+
+from sqlalchemy import column, literal_column, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+from sqlalchemy.sql import func
+
+from app import models
+
+FTS_TABLE = "products_fts"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"))
+
+_SQLITE_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, category,
+        content='products', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description, category ON products BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description, category)
+        VALUES ('delete', old.id, old.name, old.description, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description, new.category);
+    END""",
+]
+
+# the query must repeat the indexed expression for PostgreSQL to use the GIN index
+_PG_DOCUMENT = (
+    "to_tsvector('simple', coalesce({t}name, '') || ' ' || coalesce({t}description, '')"
+    " || ' ' || coalesce({t}category, ''))"
+)
+_PG_DDL = [f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin ({_PG_DOCUMENT.format(t='')})"]
+
+
+def setup(bind):
+    """Create the search index if missing and fill it from `products`.
+
+    `bind` is an Engine (own transaction) or a Connection (caller's transaction).
+    """
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return setup(conn)
+    conn, dialect = bind, bind.dialect.name
+    if dialect == "sqlite":
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        for ddl in _SQLITE_DDL:
+            conn.execute(text(ddl))
+        if not exists:
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    elif dialect == "postgresql":
+        for ddl in _PG_DDL:
+            conn.execute(text(ddl))
+
+
+def terms(search: str) -> List[str]:
+    return _WORD.findall(search or "")
+
+
+def apply(query: Query, search: str, ranked: bool = False, by_id: bool = False) -> Query:
+    """Filter a `models.Product` query by `search`, optionally ordered by relevance or by product id."""
+    words = terms(search)
+    dialect = query.session.get_bind().dialect.name
+    if not words or dialect not in ("sqlite", "postgresql"):
+        query = query.filter(models.Product.name.contains(search))
+        return query.order_by(models.Product.id) if by_id else query
+
+    if dialect == "sqlite":
+        match = " ".join('"%s"*' % w.replace('"', '""') for w in words)
+        query = query.join(_fts, _fts.c.rowid == models.Product.id).filter(
+            literal_column(FTS_TABLE).op("MATCH")(match)
+        )
+        if by_id:
+            # FTS5 eslesmeleri zaten rowid sirasiyla verir; products.id ile siralamak temp B-tree ister
+            return query.order_by(_fts.c.rowid)
+        # bm25 sirasi: daha kucuk rank = daha alakali
+        return query.order_by(_fts.c.rank) if ranked else query
+
+    document = literal_column(_PG_DOCUMENT.format(t="products."))
+    tsquery = func.to_tsquery("simple", " & ".join(f"{w}:*" for w in words))
+    query = query.filter(document.op("@@")(tsquery))
+    if by_id:
+        return query.order_by(models.Product.id)
+    return query.order_by(func.ts_rank(document, tsquery).desc()) if ranked else query
@@ -0,0 +1,56 @@
+"""Fast-path JSON for large product and log listings (FAST_JSON=true).
+
+Rows are selected as plain column tuples, turned into dicts and encoded with
+orjson (stdlib json if orjson is not installed). This skips building ORM
+objects and re-validating trusted DB data through `response_model`, including
+the `EmailStr` check on every embedded owner. The JSON shape is identical to
+`ProductResponse` / `LogResponse`.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+PRODUCT_FIELDS = ("id", "name", "description", "quantity", "category", "created_at", "updated_at", "owner_id")
+OWNER_FIELDS = ("id", "username", "email", "created_at", "role")
+LOG_FIELDS = ("id", "user_id", "action", "entity", "entity_id", "timestamp")
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def product_dicts(rows: Iterable[tuple]) -> List[dict]:
+    """Rows from `queries.product_rows` -> `ProductResponse`-shaped dicts."""
+    n = len(PRODUCT_FIELDS)
+    out = []
+    for row in rows:
+        item = dict(zip(PRODUCT_FIELDS, row[:n]))
+        item["owner"] = dict(zip(OWNER_FIELDS, row[n:]))
+        out.append(item)
+    return out
+
+
+def log_dicts(rows: Iterable[tuple]) -> List[dict]:
+    return [dict(zip(LOG_FIELDS, row)) for row in rows]
@@ -0,0 +1,152 @@
+"""Multi-worker entry point.
+
+    python -m app.serve [--workers N] [--host 127.0.0.1] [--port 8000]
+
+The master process imports app.main and runs app/startup.py once
+(preload), so schema setup (migrations, counter rebuild) and the crypto
+warm-up happen exactly once, before any worker exists. It then binds the
+listening socket and forks N workers; each runs its own uvicorn server and
+event loop on the shared socket and the kernel spreads connections between
+them. A worker that dies is restarted; SIGTERM/SIGINT stop them all
+gracefully. N defaults to WEB_CONCURRENCY.
+
+Every worker has its own token cache, memory cache and event broker; with
+more than one worker BUS_ENABLED is switched on so they stay coherent
+(app/bus.py), and the rate limiter's token buckets move from memory to a
+SQLite file shared by the workers (RATE_LIMIT_BACKEND=sqlite, see
+app/ratelimit.py). /metrics, /products/cache and /events/stats describe the
+worker that answered the request; so does the in-flight cap (MAX_IN_FLIGHT).
+
+Under gunicorn or `uvicorn --workers N` every worker runs the startup in
+its own lifespan; apply the schema first and switch that step off:
+
+    python -m app.migrations upgrade
+    SCHEMA_SETUP=false BUS_ENABLED=true RATE_LIMIT_BACKEND=sqlite gunicorn app.main:app -w 4 -k uvicorn.workers.UvicornWorker
+"""
+import argparse
+import logging
+import logging.config
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# bu sureden once olen worker hemen yeniden baslatilmaz (crash dongusu)
+MIN_UPTIME = 1.0
+
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str):
+    # master'in isleyicileri birakilir; uvicorn kendi SIGTERM/SIGINT isleyicilerini kurar
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level, lifespan="on"))
+    server.run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.stopping = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.app, self.sock, self.log_level)
+            except BaseException:
+                logger.exception("worker %s crashed", os.getpid())
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+        logger.info("started worker %s", pid)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("worker %s exited with status %s, restarting", pid, status)
+            if time.monotonic() - started < MIN_UPTIME:
+                time.sleep(MIN_UPTIME)
+            self.spawn()
+        self.sock.close()
+        return 0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    logging.config.dictConfig(uvicorn.config.LOGGING_CONFIG)
+    logger.setLevel(args.log_level.upper())
+
+    if args.workers > 1:
+        if not hasattr(os, "fork"):
+            parser.error("--workers > 1 needs os.fork (use gunicorn or a single worker on this platform)")
+        settings.bus_enabled = True
+        # worker basina ayri kova cagirana N kat hak verirdi; kovalar ortak SQLite dosyasinda
+        if settings.rate_limit_backend == "memory":
+            settings.rate_limit_backend = "sqlite"
+
+    from app.main import app
+
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level)
+        return 0
+    # preload: sema kurulumu ve warm-up burada, worker'lar fork edilmeden once bir kez
+    from app import startup
+    from app.database import get_engine
+
+    startup.run()
+    # worker'lar master'in acik baglantilarini miras almasin (bellek ici SQLite'ta dispose semayi silerdi,
+    # o yuzden burada, sadece fork'tan once)
+    get_engine().dispose()
+    sock = bind(args.host, args.port)
+    logger.info("listening on http://%s:%s with %s workers", args.host, args.port, args.workers)
+    return Master(app, sock, args.workers, args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
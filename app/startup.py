@@ -0,0 +1,74 @@
+"""One-time process startup, kept out of import.
+
+Importing app.main only builds the FastAPI app and its routes: no database
+connection, no engine, no crypto backend. The work that used to happen at
+import runs once per process from `run()`, which the app lifespan calls
+before serving the first request:
+
+    setup_database()   pending migrations, then the stats counters and the
+                       low-stock watchlist if empty (skipped when
+                       SCHEMA_SETUP=false)
+    warm_up()          passlib's bcrypt backend and python-jose, so the
+                       first login / first token check does not pay for them
+                       (on a background thread when started from the lifespan)
+
+app/serve.py calls `run()` in the master before forking, so the workers
+inherit a finished startup and their lifespan returns immediately. Tests and
+tools that import app modules get none of this unless they ask for it.
+"""
+import logging
+import threading
+import time
+
+from app import counters, low_stock, migrations, oauth2, utils
+from app.config import settings
+from app.database import SessionLocal, get_engine
+
+logger = logging.getLogger("uvicorn.error")
+
+_done = False
+_lock = threading.Lock()
+# adim sureleri (ms), acilista log'a da yazilir
+timings = {}
+
+
+def setup_database():
+    """One-time schema setup: pending migrations, then the stats counters and low-stock watchlist if empty."""
+    engine = get_engine()
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        counters.ensure_built(db)
+        low_stock.ensure_built(db)
+
+
+def warm_up():
+    utils.pwd_context()
+    oauth2.warm_up()
+
+
+def _timed(name: str, step):
+    started = time.perf_counter()
+    step()
+    timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("startup: %s took %g ms", name, timings[name])
+
+
+def run(background: bool = False):
+    """Run the startup steps once per process; later calls return immediately.
+
+    background=True returns as soon as the schema is ready and warms the
+    crypto backends on a thread, so the server starts answering sooner; a
+    login that arrives first waits for the loader lock instead of loading
+    them twice. Do not use it before forking (app/serve.py).
+    """
+    global _done
+    with _lock:
+        if _done:
+            return
+        if settings.schema_setup:
+            _timed("schema", setup_database)
+        _done = True
+    if background:
+        threading.Thread(target=_timed, args=("crypto", warm_up), name="warm-up", daemon=True).start()
+    else:
+        _timed("crypto", warm_up)
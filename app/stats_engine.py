@@ -0,0 +1,12 @@
+from datetime import date, datetime
+
+
+def today_start() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def day_key(value) -> str:
+    # SQLite returns DATE() as 'YYYY-MM-DD', other backends return a date object
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
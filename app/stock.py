@@ -0,0 +1,53 @@
+"""Atomic stock adjustments.
+
+A stock change is a single conditional UPDATE:
+
+    UPDATE products SET quantity = quantity + :delta, updated_at = ...
+    WHERE id = :id [AND owner_id = :user] [AND quantity >= :amount]
+    RETURNING ...
+
+so concurrent decrements can neither lose updates nor oversell. Only when no
+row matched is the product read again, to tell 404 / 403 / 400 apart.
+"""
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import cache, counters, events, low_stock, models, schemas
+
+
+def _failure(db: Session, product_id: int, current_user: schemas.TokenData) -> HTTPException:
+    product = db.query(models.Product.owner_id).filter(models.Product.id == product_id).first()
+    if product is None:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+    if product.owner_id != current_user.user_id and current_user.role != "admin":
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this product")
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient stock to decrease")
+
+
+def adjust(db: Session, product_id: int, delta: int, current_user: schemas.TokenData) -> models.Product:
+    """Add `delta` (may be negative) to a product's quantity without going below zero.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    Product = models.Product
+    stmt = update(Product).where(Product.id == product_id).values(quantity=Product.quantity + delta)
+    if current_user.role != "admin":
+        stmt = stmt.where(Product.owner_id == current_user.user_id)
+    if delta < 0:
+        stmt = stmt.where(Product.quantity >= -delta)
+
+    if db.get_bind().dialect.update_returning:
+        product = db.scalars(stmt.returning(Product), execution_options={"synchronize_session": False}).first()
+    else:
+        # RETURNING yoksa: UPDATE + PK ile tek SELECT
+        matched = db.execute(stmt, execution_options={"synchronize_session": False}).rowcount
+        product = db.get(Product, product_id, populate_existing=True) if matched else None
+    if product is None:
+        raise _failure(db, product_id, current_user)
+
+    counters.quantity_changed(db, product, product.quantity - delta)
+    low_stock.product_saved(db, product, product.quantity - delta)
+    cache.product_changed(db, product.id)
+    events.product_event(db, "stock", product, product.quantity - delta)
+    return product
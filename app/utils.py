@@ -1,11 +1,120 @@
-from passlib.context import CryptContext
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+_pwd_context = None
+_context_lock = threading.Lock()
+
+
+def pwd_context():
+    """The bcrypt CryptContext; passlib and its bcrypt backend load on first use (or in startup.warm_up)."""
+    global _pwd_context
+    if _pwd_context is None:
+        with _context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                # min == max == default: a hash made with any other cost "needs
+                # update" and is rehashed on the next successful login
+                context = CryptContext(
+                    schemes=["bcrypt"],
+                    deprecated="auto",
+                    bcrypt__default_rounds=settings.bcrypt_rounds,
+                    bcrypt__min_rounds=settings.bcrypt_rounds,
+                    bcrypt__max_rounds=settings.bcrypt_rounds,
+                )
+                # backend secimi ve passlib'in bcrypt self-test'leri burada, bir kez
+                context.handler("bcrypt").get_backend()
+                _pwd_context = context
+    return _pwd_context
+
+
+class PasswordPool:
+    """Bounded worker pool for bcrypt work.
+
+    At most `workers` hashes run at once and at most `queue_limit` more may
+    wait; anything beyond that is rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._busy = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._work_total = 0.0
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server is busy, please try again",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            with self._lock:
+                self._busy += 1
+                waited = started - submitted
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._work_total += time.perf_counter() - started
+
+        try:
+            return self._executor.submit(task).result()
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._completed or 1
+            return {
+                "workers": self.workers,
+                "busy": self._busy,
+                "queued": max(self._pending - self._busy, 0),
+                "queue_limit": self.queue_limit,
+                "utilisation": self._busy / self.workers,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": self._wait_total / done * 1000,
+                "max_wait_ms": self._wait_max * 1000,
+                "avg_work_ms": self._work_total / done * 1000,
+            }
+
+
+password_pool = PasswordPool(settings.password_workers, settings.password_queue_limit)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
+    return password_pool.run(pwd_context().hash, password)
 
 def verify(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password."""
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return password_pool.run(pwd_context().verify, plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; also return a new hash if the stored one uses an outdated cost."""
+    return password_pool.run(pwd_context().verify_and_update, plain_password, hashed_password)
@@ -0,0 +1,175 @@
+"""Cost of the rate limiter, and what it buys a well-behaved user next to an abusive one.
+
+    python -m benchmarks.admission_bench [--products 20000] [--seconds 10] [--abusers 20]
+
+1. `take()` per call for the memory and SQLite bucket backends (the SQLite
+   one is what several workers share).
+2. Requests are driven straight into the ASGI app. --abusers concurrent
+   loops, all with one user's token, hit /products/ (cost 5) as fast as they
+   can, while another user polls /products/paged every 50 ms. This runs once
+   with the limiter off and once per backend. For each run it reports the
+   polite user's latency percentiles and how many abusive requests were served
+   or rejected. The burst is lowered so the abuser runs into the limit within
+   the first second.
+3. A check, not a measurement: with MAX_IN_FLIGHT=2, three streams held
+   open on /events/ (the path the dashboard's EventSource uses) must not
+   take slots from other requests. The run fails (exit 1) if they do.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="admission_bench_"), "bench.db")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+
+from benchmarks.common import seed  # noqa: E402
+from app import oauth2, ratelimit, schemas, startup  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+RATE, BURST = 10.0, 20.0
+
+
+def backends() -> dict:
+    path = os.path.join(tempfile.mkdtemp(prefix="admission_bench_"), "buckets.db")
+    return {
+        "off": ratelimit.NullBuckets(),
+        "memory": ratelimit.MemoryBuckets(RATE, BURST, 100_000),
+        "sqlite": ratelimit.SQLiteBuckets(path, RATE, BURST),
+    }
+
+
+def take_cost(buckets, n: int = 20_000) -> float:
+    keys = [f"user:{i}" for i in range(1000)]
+    started = time.perf_counter()
+    for i in range(n):
+        buckets.take(keys[i % len(keys)], 0.001)
+    return (time.perf_counter() - started) / n
+
+
+async def request(url: str, token: str) -> int:
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+async def scenario(seconds: float, abusers: int, abuser: str, polite: str) -> dict:
+    deadline = time.perf_counter() + seconds
+    counts = {}
+    latencies = []
+
+    async def abuse():
+        while time.perf_counter() < deadline:
+            code = await request("/products/", abuser)
+            counts[code] = counts.get(code, 0) + 1
+            if code == 429:
+                await asyncio.sleep(0)  # bir sonraki denemeden once loop'u birak
+
+    async def poll():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            code = await request("/products/paged?page_size=20", polite)
+            if code != 200:
+                raise RuntimeError(f"polite user got {code}")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(poll(), *[abuse() for _ in range(abusers)])
+    latencies.sort()
+    return {
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "max": latencies[-1],
+        "polls": len(latencies),
+        "served": counts.get(200, 0),
+        "rejected": counts.get(429, 0),
+    }
+
+
+async def long_lived_exempt(streams: int = 3, cap: int = 2) -> bool:
+    """Hold `streams` requests open on /events/ behind the middleware; others must still get through."""
+    release = asyncio.Event()
+
+    async def endpoint(scope, receive, send):
+        if scope["path"].startswith("/events"):
+            await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = ratelimit.AdmissionMiddleware(endpoint)
+    stream_token = oauth2.create_stream_token(schemas.TokenData(user_id=2, role="user"))
+
+    async def call(path: str, query: str = "") -> int:
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+                 "headers": [], "client": ("127.0.0.1", 1)}
+        status = []
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status.append(message["status"])
+
+        await middleware(scope, None, send)
+        return status[0]
+
+    ratelimit.use(ratelimit.NullBuckets())
+    settings.max_in_flight = cap
+    held = [asyncio.create_task(call("/events/", f"stream_token={stream_token}")) for _ in range(streams)]
+    await asyncio.sleep(0.01)
+    codes = [await call("/users/me") for _ in range(cap + 1)]
+    release.set()
+    await asyncio.gather(*held)
+    ok = codes == [200] * len(codes)
+    print(f"\n{streams} open /events/ streams, MAX_IN_FLIGHT={cap}: other requests -> {codes}  "
+          f"{'ok' if ok else 'BLOCKED'}")
+    return ok
+
+
+async def main(args) -> int:
+    startup.setup_database()
+    print(f"seeding {args.products} products...", file=sys.stderr)
+    seed(engine, args.products)
+
+    print(f"{'backend':<8} {'take() us':>10}")
+    for name, buckets in backends().items():
+        print(f"{name:<8} {statistics.median(take_cost(buckets) for _ in range(3)) * 1e6:>10.2f}")
+
+    abuser = oauth2.create_token({"user_id": 2, "role": "user"})
+    polite = oauth2.create_token({"user_id": 3, "role": "user"})
+    await request("/products/paged?page_size=20", polite)  # warm-up
+    print(f"\n{args.abusers} abusive loops on /products/ for {args.seconds:g}s, rate {RATE:g}/s burst {BURST:g}")
+    print(f"{'backend':<8} {'polite p50 ms':>14} {'p95 ms':>8} {'max ms':>8} {'polls':>6} "
+          f"{'abuser 200':>11} {'abuser 429':>11}")
+    for name, buckets in backends().items():
+        ratelimit.use(buckets)
+        r = await scenario(args.seconds, args.abusers, abuser, polite)
+        print(f"{name:<8} {r['p50'] * 1000:>14.1f} {r['p95'] * 1000:>8.1f} {r['max'] * 1000:>8.1f} {r['polls']:>6} "
+              f"{r['served']:>11} {r['rejected']:>11}")
+    return 0 if await long_lived_exempt() else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=20000, help="products to seed (20 owners)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each scenario run")
+    parser.add_argument("--abusers", type=int, default=20, help="concurrent abusive loops")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,74 @@
+"""Write throughput of create/increase/decrease with each audit-log strategy.
+
+    python -m benchmarks.audit_bench [operations]     (default: 2000)
+
+"two commits" replays the previous route code (product commit, refresh, then
+a second commit for the Log row). The other modes call the real route
+functions with AUDIT_MODE set accordingly.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_engine, seed
+from app import audit, models, schemas
+from app.config import settings
+from routers import products
+
+USER = schemas.TokenData(user_id=2, role="user")
+
+
+def legacy_ops(db, n):
+    for i in range(n):
+        p = models.Product(name=f"bench {i}", quantity=10, category="bench", owner_id=USER.user_id)
+        db.add(p)
+        db.commit()
+        db.refresh(p)
+        db.add(models.Log(user_id=USER.user_id, action="create_product", entity="product", entity_id=p.id))
+        db.commit()
+        for action, delta in (("increase_stock", 5), ("decrease_stock", -3)):
+            p.quantity += delta
+            db.commit()
+            db.refresh(p)
+            db.add(models.Log(user_id=USER.user_id, action=action, entity="product", entity_id=p.id))
+            db.commit()
+
+
+def route_ops(db, n):
+    amount = schemas.IncreaseDecreaseStock(amount=3)
+    for i in range(n):
+        p = products.create_product(
+            schemas.ProductRequest(name=f"bench {i}", quantity=10, category="bench"), db=db, current_user=USER
+        )
+        products.increase_stock(p.id, amount, db=db, current_user=USER)
+        products.decrease_stock(p.id, amount, db=db, current_user=USER)
+
+
+def run(label, fn, n, mode=None):
+    path = os.path.join(tempfile.mkdtemp(prefix="audit_bench_"), "bench.db")
+    engine, Session = make_engine(f"sqlite:///{path}")
+    seed(engine, 1000)
+    # the writer flushes through app.database.engine; point it at this database
+    import app.database
+    app.database.engine = engine
+    if mode:
+        settings.audit_mode = mode
+        audit.start()
+    db = Session()
+    started = time.perf_counter()
+    fn(db, n)
+    if mode:
+        audit.stop()
+    elapsed = time.perf_counter() - started
+    logs = db.query(models.Log).count()
+    db.close()
+    engine.dispose()
+    print(f"{label:<22} {3 * n / elapsed:9.1f} ops/s   ({logs} log rows)")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    run("two commits (before)", legacy_ops, n)
+    run("durable", route_ops, n, audit.DURABLE)
+    run("buffered", route_ops, n, audit.BUFFERED)
@@ -0,0 +1,37 @@
+"""Per-request auth overhead of get_current_user with and without the token cache.
+
+    python -m benchmarks.auth_bench [iterations]     (default: 20000)
+"""
+import sys
+import time
+
+import benchmarks.common  # noqa: F401  (sets the settings env vars)
+from app import oauth2
+
+
+def per_call_us(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main(iterations: int):
+    token = oauth2.create_token({"user_id": 1, "role": "user"})
+
+    def uncached():
+        oauth2.token_cache.clear()
+        return oauth2.get_current_user(token)
+
+    def cached():
+        return oauth2.get_current_user(token)
+
+    cold = per_call_us(uncached, iterations)
+    oauth2.token_cache = oauth2.TokenCache(maxsize=10_000, ttl=300)
+    warm = per_call_us(cached, iterations)
+    print(f"verify every request: {cold:8.2f} us/request")
+    print(f"token cache         : {warm:8.2f} us/request  ({cold / warm:.1f}x)  {oauth2.token_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
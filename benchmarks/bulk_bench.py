@@ -0,0 +1,61 @@
+"""Rows/sec of POST /products/bulk versus one POST /products/ per row.
+
+    python -m benchmarks.bulk_bench [rows]     (default: 5000)
+"""
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bulk_bench_"), "bench.db")
+
+import benchmarks.common  # noqa: F401,E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import models, oauth2, startup  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+
+
+def main(rows: int):
+    logging.disable(logging.CRITICAL)  # app engine echoes SQL
+    from app.main import app
+
+    startup.setup_database()
+    with SessionLocal() as db:
+        db.add(models.User(id=1, username="bench", email="bench@example.com", password="x"))
+        db.commit()
+    headers = {"Authorization": "Bearer " + oauth2.create_token({"user_id": 1, "role": "user"})}
+    payload = [{"name": f"item {i}", "quantity": i % 50, "category": "bench", "description": "x"} for i in range(rows)]
+
+    with TestClient(app) as client:
+        single = payload[: max(rows // 10, 1)]
+        started = time.perf_counter()
+        for row in single:
+            client.post("/products/", json=row, headers=headers)
+        single_rate = len(single) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        r = client.post("/products/bulk", json=payload, headers=headers)
+        json_rate = rows / (time.perf_counter() - started)
+        assert r.json()["succeeded"] == rows, r.text
+
+        body = "\n".join(json.dumps(row) for row in payload)
+        started = time.perf_counter()
+        client.post("/products/bulk", content=body, headers={**headers, "Content-Type": "application/x-ndjson"})
+        ndjson_rate = rows / (time.perf_counter() - started)
+
+        adjustments = [{"id": i, "delta": 1 if i % 2 else -1} for i in range(1, rows + 1)]
+        started = time.perf_counter()
+        client.patch("/products/stock/bulk", json=adjustments, headers=headers)
+        stock_rate = rows / (time.perf_counter() - started)
+
+    print(f"POST /products/ (per row) {single_rate:9.1f} rows/s")
+    print(f"POST /products/bulk json  {json_rate:9.1f} rows/s")
+    print(f"POST /products/bulk ndjson{ndjson_rate:9.1f} rows/s")
+    print(f"PATCH /products/stock/bulk{stock_rate:9.1f} rows/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
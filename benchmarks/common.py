@@ -0,0 +1,109 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite database so they need no running
+server. Run them from the repository root, e.g. ``python -m benchmarks.stats_bench``.
+"""
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# app.config requires these; benchmarks never touch the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+# benchmarks drive one caller as fast as they can; measure the app, not the rate limiter
+os.environ.setdefault("RATE_LIMIT_BACKEND", "off")
+
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+
+CATEGORIES = ["electronics", "food", "books", "tools", "toys", "garden", "office", "sports"]
+ADJECTIVES = ["red", "blue", "steel", "wooden", "compact", "heavy", "smart", "classic", "mini", "pro",
+              "organic", "wireless", "vintage", "eco", "deluxe", "basic"]
+NOUNS = ["widget", "gadget", "hammer", "lamp", "chair", "cable", "battery", "notebook", "kettle", "drill",
+         "sensor", "router", "blanket", "bottle", "charger", "speaker", "helmet", "puzzle", "shovel", "printer"]
+
+
+def make_engine(url: str = "sqlite://"):
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(bind=engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def seed(engine, products: int, users: int = 20, days: int = 30, chunk: int = 50_000, seed_value: int = 42,
+         password: str = "x"):
+    """Insert `users` users and `products` products spread over the last `days` days.
+
+    `password` is stored as-is; pass a real hash when the benchmark logs in.
+    """
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com",
+             "password": password, "role": "admin" if i == 1 else "user"}
+            for i in range(1, users + 1)
+        ])
+        for start in range(0, products, chunk):
+            conn.execute(insert(models.Product), [
+                {
+                    "name": f"{rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)} {n}",
+                    "description": f"{rnd.choice(ADJECTIVES)} {rnd.choice(NOUNS)} for everyday use",
+                    "quantity": rnd.randint(0, 200),
+                    "category": rnd.choice(CATEGORIES),
+                    "created_at": now - timedelta(seconds=rnd.randint(0, days * 86400)),
+                    "updated_at": now,
+                    "owner_id": rnd.randint(1, users),
+                }
+                for n in range(start, min(start + chunk, products))
+            ])
+
+
+def seed_logs(engine, logs: int, users: int = 20, days: int = 30, chunk: int = 50_000, seed_value: int = 42):
+    """Insert `logs` audit rows for existing products, spread over the last `days` days."""
+    rnd = random.Random(seed_value)
+    now = datetime.utcnow()
+    actions = ["create_product", "update_product", "increase_stock", "decrease_stock", "delete_product"]
+    with engine.begin() as conn:
+        max_id = conn.execute(select(func.max(models.Product.id))).scalar() or 1
+        for start in range(0, logs, chunk):
+            conn.execute(insert(models.Log), [
+                {
+                    "user_id": rnd.randint(1, users),
+                    "action": rnd.choice(actions),
+                    "entity": "product",
+                    "entity_id": rnd.randint(1, max_id),
+                    "timestamp": now - timedelta(seconds=rnd.randint(0, days * 86400)),
+                }
+                for _ in range(start, min(start + chunk, logs))
+            ])
+
+
+@contextmanager
+def count_queries(engine):
+    """Count statements sent to `engine` inside the block; yields a one-item list."""
+    counter = [0]
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _before)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _before)
+
+
+def timeit(fn, repeat: int = 5):
+    """Run `fn` `repeat` times and return (best_ms, last_result)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000, result
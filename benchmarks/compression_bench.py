@@ -0,0 +1,125 @@
+"""Bytes on the wire and latency of the listing endpoints with compression and conditional GET.
+
+    python -m benchmarks.compression_bench [--products 5000] [--requests 30] [--mbps 10]
+
+Requests are driven straight into the ASGI app (no HTTP client) against a
+seeded SQLite file, as a "user" (their own products) and as an admin.
+
+The first table sends every route with `Accept-Encoding: identity`, `gzip`
+and `br` (if the brotli package is installed) and reports the body size and
+the median server time; "at N Mbit/s" adds the time to transfer the body on
+a link of --mbps, which is where compression pays for its CPU.
+
+The second table repeats each request with the ETag of the previous answer
+in If-None-Match: the 304 skips the query and the serialisation, so its
+server time is the cost of the validator lookup alone.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="compression_bench_"), "bench.db")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+
+from benchmarks.common import seed  # noqa: E402
+from app import compression, oauth2, startup  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+ROUTES = [
+    "/products/",
+    "/products/paged?page_size=100",
+    "/products/low_stock",
+    "/products/low_stock/count",
+    "/stats/",
+    "/stats/daily?days=30",
+]
+
+
+async def request(url: str, headers) -> dict:
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    out = {"status": None, "headers": {}, "bytes": 0}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+            out["headers"] = {k.decode(): v.decode() for k, v in message.get("headers", ())}
+        elif message["type"] == "http.response.body":
+            out["bytes"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    if out["status"] not in (200, 304):
+        raise RuntimeError(f"{url} -> {out['status']}")
+    return out
+
+
+async def timed(url: str, headers, n: int):
+    """(median seconds, last response)"""
+    samples, last = [], None
+    for _ in range(n):
+        started = time.perf_counter()
+        last = await request(url, headers)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), last
+
+
+async def main(args) -> int:
+    startup.setup_database()
+    print(f"seeding {args.products} products...", file=sys.stderr)
+    seed(engine, args.products)
+    startup.setup_database()  # seeding bypasses the write paths: build the counters and the watchlist now
+    encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+    callers = {
+        "user": oauth2.create_token({"user_id": 2, "role": "user"}),
+        "admin": oauth2.create_token({"user_id": 1, "role": "admin"}),
+    }
+    wire = lambda size: size * 8 / (args.mbps * 1e6)  # noqa: E731
+
+    print(f"\n{'route':<32} {'caller':<6} {'sent as':<9} {'bytes':>9} {'ratio':>6} {'server ms':>10} "
+          f"{f'at {args.mbps:g} Mbit/s':>16}")
+    for caller, token in callers.items():
+        auth = (b"authorization", f"Bearer {token}".encode())
+        for url in ROUTES:
+            identity = None
+            for encoding in encodings:
+                headers = [auth, (b"accept-encoding", encoding.encode())]
+                await timed(url, headers, 2)  # warm-up
+                seconds, response = await timed(url, headers, args.requests)
+                identity = identity or response["bytes"]
+                sent = response["headers"].get("content-encoding", "identity")
+                print(f"{url:<32} {caller:<6} {sent:<9} {response['bytes']:>9} "
+                      f"{response['bytes'] / identity:>6.2f} {seconds * 1000:>10.2f} "
+                      f"{(seconds + wire(response['bytes'])) * 1000:>13.2f} ms")
+
+    print(f"\n{'route':<32} {'caller':<6} {'200 ms':>8} {'304 ms':>8} {'saved':>7}   (gzip, server time)")
+    for caller, token in callers.items():
+        auth = (b"authorization", f"Bearer {token}".encode())
+        for url in ROUTES:
+            headers = [auth, (b"accept-encoding", b"gzip")]
+            full, response = await timed(url, headers, args.requests)
+            etag = response["headers"]["etag"]
+            cached, response = await timed(url, headers + [(b"if-none-match", etag.encode())], args.requests)
+            if response["status"] != 304:
+                raise RuntimeError(f"{url}: If-None-Match {etag} -> {response['status']}")
+            print(f"{url:<32} {caller:<6} {full * 1000:>8.2f} {cached * 1000:>8.2f} {1 - cached / full:>7.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--products", type=int, default=5000, help="products to seed (20 owners)")
+    parser.add_argument("--requests", type=int, default=30, help="requests per measurement (median)")
+    parser.add_argument("--mbps", type=float, default=10.0, help="link speed for the transfer estimate")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,111 @@
+"""Mixed read/write throughput of the DB_PROFILE engine settings on SQLite.
+
+    python -m benchmarks.engine_bench [threads] [seconds] [write_pct]     (default: 16 5 20)
+
+Each worker opens a session per operation, like a request would: reads list
+20 products with their owners and fetch one by id, writes bump a product's
+quantity and insert a Log row in one transaction. "before" is the previous
+engine (rollback journal, driver default 5s lock timeout; echo left off so
+only the journal settings are compared). "dev" logs every statement to
+/dev/null to show what echo alone costs.
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.common import seed
+from app import models, queries
+from app.database import make_engine
+
+PRODUCTS = 5000
+
+
+def legacy_engine(url):
+    return create_engine(url, connect_args={"check_same_thread": False}, pool_size=20, max_overflow=20)
+
+
+def operation(Session, rnd, write_pct):
+    db = Session()
+    try:
+        if rnd.randrange(100) < write_pct:
+            product_id = rnd.randint(1, PRODUCTS)
+            db.execute(
+                update(models.Product)
+                .where(models.Product.id == product_id)
+                .values(quantity=models.Product.quantity + 1)
+            )
+            db.add(models.Log(user_id=1, action="increase_stock", entity="product", entity_id=product_id))
+            db.commit()
+            return "write"
+        queries.products(db).limit(20).all()
+        db.get(models.Product, rnd.randint(1, PRODUCTS))
+        return "read"
+    finally:
+        db.close()
+
+
+def run(label, engine, threads, seconds, write_pct):
+    models.Base.metadata.create_all(bind=engine)
+    seed(engine, PRODUCTS)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+    done, errors = Counter(), Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(n):
+        rnd = random.Random(n)
+        local, failed = Counter(), Counter()
+        while time.perf_counter() < deadline:
+            try:
+                local[operation(Session, rnd, write_pct)] += 1
+            except OperationalError as exc:
+                failed[str(exc.orig)] += 1
+        with lock:
+            done.update(local)
+            errors.update(failed)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+
+    total = sum(done.values())
+    print(f"{label:<8} {total / elapsed:9.1f} ops/s   reads {done['read'] / elapsed:8.1f}/s"
+          f"   writes {done['write'] / elapsed:7.1f}/s   errors {sum(errors.values())}")
+    for message, count in errors.most_common(3):
+        print(f"           {count} x {message}")
+
+
+def main(argv):
+    threads = int(argv[0]) if len(argv) > 0 else 16
+    seconds = float(argv[1]) if len(argv) > 1 else 5
+    write_pct = int(argv[2]) if len(argv) > 2 else 20
+    print(f"{threads} threads, {seconds:g}s each, {write_pct}% writes")
+
+    def url(name):
+        return "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="engine_bench_"), f"{name}.db")
+
+    run("before", legacy_engine(url("before")), threads, seconds, write_pct)
+    for profile in ("dev", "prod", "test"):
+        engine = make_engine(url(profile), profile)
+        if engine.echo:
+            for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+                handler.setStream(open(os.devnull, "w"))
+        run(profile, engine, threads, seconds, write_pct)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
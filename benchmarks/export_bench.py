@@ -0,0 +1,147 @@
+"""Memory use of GET /products/export on a large catalog.
+
+    python -m benchmarks.export_bench [--rows 1000000] [--formats csv,ndjson,csv+gzip] [--max-growth-mb 20]
+
+Seeds --rows products into a temporary SQLite file and drives the export
+straight into the ASGI app (no HTTP client), counting and discarding the
+body as it arrives. The process's anonymous resident memory (RssAnon, so
+SQLite's memory-mapped file pages do not count) is sampled at every 10% of
+the rows. An export has constant memory when the growth from the 10% mark
+to the end stays small; the run fails (exit 1) if it exceeds
+--max-growth-mb for any format.
+
+For contrast, the same user's products are also fetched through the
+in-memory GET /products/ listing, whose memory grows with the row count.
+SQLITE_CACHE_SIZE is lowered to 8 MiB (unless set) so the bounded SQLite
+page cache filling up does not hide the trend.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="export_bench_"), "bench.db")
+os.environ.setdefault("SQLITE_CACHE_SIZE", "8192")
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+
+from benchmarks.common import seed  # noqa: E402
+from app import oauth2, startup  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def rss_anon() -> int:
+    """Anonymous resident memory in bytes (Linux), else the peak RSS."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def fetch(url: str, token: str, gzip: bool, expected_rows: int) -> dict:
+    """Run one GET through the app; sample memory at every 10% of `expected_rows` (by newline count).
+
+    gzip bodies are decompressed here only to count lines.
+    """
+    headers = [(b"authorization", f"Bearer {token}".encode()),
+               (b"accept-encoding", b"gzip" if gzip else b"identity")]
+    path, _, query = url.partition("?")
+    scope = {"type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+             "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": query.encode(), "root_path": "", "headers": headers,
+             "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+    state = {"status": None, "asked": False, "bytes": 0, "lines": 0, "samples": [], "next": 0.1, "peak": 0}
+    inflate = zlib.decompressobj(31) if gzip else None
+    start_rss = rss_anon()
+    started = time.perf_counter()
+    finished = asyncio.Event()
+
+    async def receive():
+        if not state["asked"]:
+            state["asked"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            state["bytes"] += len(body)
+            state["lines"] += (inflate.decompress(body) if inflate else body).count(b"\n")
+            progress = state["lines"] / max(expected_rows, 1)
+            rss = rss_anon()
+            state["peak"] = max(state["peak"], rss)
+            while progress >= state["next"] and state["next"] <= 1.0:
+                state["samples"].append(rss - start_rss)
+                state["next"] += 0.1
+
+    await app(scope, receive, send)
+    finished.set()
+    if state["status"] != 200:
+        raise RuntimeError(f"{url} -> {state['status']}")
+    return {
+        "seconds": time.perf_counter() - started,
+        "bytes": state["bytes"],
+        "lines": state["lines"],
+        "samples": state["samples"],
+        "peak": state["peak"] - start_rss,
+    }
+
+
+def report(label: str, rows: int, result: dict, max_growth: float = None) -> bool:
+    samples = result["samples"]
+    growth = (samples[-1] - samples[0]) / MB if len(samples) > 1 else None
+    ok = max_growth is None or growth is None or growth <= max_growth
+    verdict = "" if max_growth is None else ("ok" if ok else "GROWS")
+    curve = " ".join(f"{s / MB:.0f}" for s in samples)
+    print(f"{label:<26} {rows:>9} {result['bytes'] / MB:>9.1f} {rows / result['seconds']:>9.0f} "
+          f"{result['peak'] / MB:>8.1f} {'-' if growth is None else f'{growth:+.1f}':>9} {verdict:>6}  {curve}")
+    return ok
+
+
+async def main(args) -> int:
+    startup.setup_database()
+    print(f"seeding {args.rows} products...", file=sys.stderr)
+    started = time.perf_counter()
+    seed(engine, args.rows, users=args.users, chunk=50_000)
+    print(f"seeded in {time.perf_counter() - started:.0f}s", file=sys.stderr)
+    admin = oauth2.create_token({"user_id": 1, "role": "admin"})
+    user = oauth2.create_token({"user_id": 2, "role": "user"})
+    with engine.connect() as conn:
+        user_rows = conn.exec_driver_sql("SELECT count(*) FROM products WHERE owner_id = 2").scalar()
+
+    await fetch("/products/export?format=csv&category=none", admin, False, 1)  # warm-up (imports, first connect)
+    print(f"\n{'request':<26} {'rows':>9} {'MB sent':>9} {'rows/s':>9} {'peak MB':>8} {'10%->end':>9} {'':>6}  "
+          f"MB above start at 10%, 20%, ...")
+    ok = True
+    for fmt in args.formats.split(","):
+        name, _, compression = fmt.partition("+")
+        result = await fetch(f"/products/export?format={name}", admin, compression == "gzip", args.rows)
+        ok &= report(f"export {fmt} (admin)", args.rows, result, args.max_growth_mb)
+
+    report("export ndjson (user 2)", user_rows, await fetch("/products/export?format=ndjson", user, False, user_rows),
+           args.max_growth_mb)
+    report("GET /products/ (user 2)", user_rows, await fetch("/products/", user, False, user_rows))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="products to seed")
+    parser.add_argument("--users", type=int, default=20, help="owners (user 1 is admin)")
+    parser.add_argument("--formats", default="csv,ndjson,csv+gzip", help="comma separated, format[+gzip]")
+    parser.add_argument("--max-growth-mb", type=float, default=20.0, help="allowed growth from 10%% to 100%%")
+    sys.exit(asyncio.run(main(parser.parse_args())))
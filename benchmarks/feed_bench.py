@@ -0,0 +1,154 @@
+"""Fan-out of the live change feed (/events) to thousands of subscribers.
+
+    python -m benchmarks.feed_bench [--clients 1000,5000] [--events 2000] [--rate 500]
+                                    [--admins 0.05] [--owners 100] [--slow 0.01]
+
+Runs the real broker and SSE body generator (`app.events.stream`) in one
+event loop, with no sockets: every simulated client is a task reading its
+stream the way the server would write it to the network. Each client is an
+admin (sees every event) with probability --admins, otherwise a user owning
+one of --owners. A publisher thread, standing in for the worker threads that
+commit product writes, publishes --events stock events at --rate per second
+to random owners. A fraction --slow of the clients sleep --slow-delay after
+every read, like a client on a bad link; they should end up with `resync`
+events instead of an unbounded backlog, and must not delay the others.
+
+Reported per client count: deliveries (frames written to client streams),
+deliveries/s, publish-to-read latency of the fast clients (p50/p99/max),
+resyncs sent to slow clients and the largest total backlog seen.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="feed_bench_"), "bench.db"))
+
+from app import events, schemas, serializers  # noqa: E402
+from app.config import settings  # noqa: E402
+
+
+class Client:
+    __slots__ = ("slow", "frames", "resyncs", "latencies")
+
+    def __init__(self, slow: bool):
+        self.slow = slow
+        self.frames = 0
+        self.resyncs = 0
+        self.latencies = []
+
+
+async def consume(client: Client, subscriber, published: dict, slow_delay: float):
+    async for chunk in events.stream(subscriber, keepalive=3600):
+        now = time.perf_counter()
+        if not chunk.startswith(b"id: "):
+            continue
+        frames = chunk.count(b"\n\n")
+        client.frames += frames
+        client.resyncs += chunk.count(b"event: resync")
+        if not client.slow:
+            # ilk frame'in gecikmesi: ayni okumadaki en eski olay
+            seq = int(chunk[4:chunk.index(b"\n")].split(b"-")[1])
+            client.latencies.append(now - published[seq])
+        if client.slow:
+            await asyncio.sleep(slow_delay)
+
+
+def publisher(broker, args, published: dict, rng: random.Random):
+    interval = 1.0 / args.rate if args.rate else 0.0
+    started = time.perf_counter()
+    for i in range(args.events):
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        owner = rng.randrange(args.owners) + 2
+        data = serializers.dumps({"product": {"id": i, "quantity": rng.randrange(100), "owner_id": owner}})
+        # broker sira numarasini loop'ta verir; yayin sirasi ayni oldugu icin i + 1 olur
+        published[i + 1] = time.perf_counter()
+        broker.publish([(owner, "product.stock", data)])
+
+
+async def run(clients: int, args) -> dict:
+    rng = random.Random(args.seed)
+    broker = events.broker = events.Broker(args.queue_size, settings.events_history)
+    published = {}
+    population, subscribers, tasks = [], [], []
+    for _ in range(clients):
+        if rng.random() < args.admins:
+            user = schemas.TokenData(user_id=1, role="admin")
+        else:
+            user = schemas.TokenData(user_id=rng.randrange(args.owners) + 2, role="user")
+        client = Client(slow=rng.random() < args.slow)
+        subscriber = broker.subscribe(user)
+        population.append(client)
+        subscribers.append(subscriber)
+        tasks.append(asyncio.create_task(consume(client, subscriber, published, args.slow_delay)))
+    await asyncio.sleep(0.1)  # every stream sent its "retry:" preamble
+
+    fast_queues = [s.queue for s, c in zip(subscribers, population) if not c.slow]
+    backlog = 0
+    thread = threading.Thread(target=publisher, args=(broker, args, published, rng))
+    started = time.perf_counter()
+    thread.start()
+    while thread.is_alive() or any(not q.empty() for q in fast_queues):
+        backlog = max(backlog, sum(s.queue.qsize() for s in subscribers))
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    thread.join()
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    fast = [c for c in population if not c.slow]
+    latencies = sorted(x for c in fast for x in c.latencies)
+    delivered = sum(c.frames for c in population)
+    return {
+        "clients": clients,
+        "slow": len(population) - len(fast),
+        "published": broker.published,
+        "delivered": delivered,
+        "per_second": delivered / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0.0,
+        "max_ms": latencies[-1] * 1000 if latencies else 0.0,
+        "resyncs": sum(c.resyncs for c in population),
+        "fast_resyncs": sum(c.resyncs for c in fast),
+        "backlog": backlog,
+    }
+
+
+def main(argv) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", default="1000,5000", help="comma separated subscriber counts")
+    parser.add_argument("--events", type=int, default=2000, help="events to publish per run")
+    parser.add_argument("--rate", type=float, default=500.0, help="events per second (0 = as fast as possible)")
+    parser.add_argument("--admins", type=float, default=0.05, help="fraction of clients that see every event")
+    parser.add_argument("--owners", type=int, default=100, help="distinct product owners")
+    parser.add_argument("--slow", type=float, default=0.01, help="fraction of clients that read slowly")
+    parser.add_argument("--slow-delay", type=float, default=0.5, help="seconds a slow client sleeps per read")
+    parser.add_argument("--queue-size", type=int, default=settings.events_queue_size, help="EVENTS_QUEUE_SIZE")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    print(f"{args.events} events at {args.rate or 'max'}/s, {args.owners} owners, {args.admins:.0%} admins, "
+          f"{args.slow:.0%} slow clients, queue {args.queue_size}")
+    print(f"{'clients':>8} {'slow':>5} {'delivered':>10} {'deliv/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'resyncs':>8} {'backlog':>8}")
+    for clients in (int(c) for c in args.clients.split(",")):
+        r = asyncio.run(run(clients, args))
+        print(f"{r['clients']:>8} {r['slow']:>5} {r['delivered']:>10} {r['per_second']:>10.0f} {r['p50_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['max_ms']:>8.2f} {r['resyncs']:>8} {r['backlog']:>8}")
+        if r["fast_resyncs"]:
+            print(f"         {r['fast_resyncs']} resyncs reached fast clients (queue too small for this rate?)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,414 @@
+"""HTTP load test against a real uvicorn worker.
+
+Seeds a database, starts `uvicorn app.main:app` on it and drives it with N
+concurrent virtual users running a weighted mix of scenarios for a fixed
+duration:
+
+    python -m benchmarks.load_bench --clients 100 --seconds 10 --rows 100000
+    python -m benchmarks.load_bench --mix read --json runs/before.json
+    python -m benchmarks.load_bench --mix "list=50,stock=50" --json - --compare runs/before.json
+
+Scenarios (one HTTP request each):
+
+    login       POST /auth/login
+    list        GET /products/paged, random sort; half the time continues the previous cursor
+    search      GET /products/paged?search=<word prefix>
+    stock       PATCH /products/{id}/increase|decrease on one of the user's products
+    stats       GET /stats/ or /stats/daily?days=30
+    categories  GET /products/categories
+    low_stock   GET /products/low_stock
+
+`--mix` takes a preset (read, mixed, write) or "name=weight,...". Every
+virtual user is one seeded account (user 1 is admin). Queries per request
+come from the server's own /metrics (db_statements_total per route), so
+they include everything the route does. By default the database is a fresh
+SQLite file; `--database-url` points the run at an existing (empty)
+database instead, e.g. a local PostgreSQL.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from passlib.hash import bcrypt
+from sqlalchemy import select
+
+from benchmarks.common import ADJECTIVES, NOUNS, make_engine, seed, seed_logs
+from app import models
+
+PASSWORD = "bench-password"
+
+MIXES = {
+    "read": "list=45,search=25,stats=20,categories=10",
+    "mixed": "list=35,search=20,stock=20,stats=15,categories=6,low_stock=2,login=2",
+    "write": "stock=60,list=20,stats=15,login=5",
+}
+
+SORTS = ["created_at", "name", "quantity", "updated_at"]
+
+
+class VirtualUser:
+    def __init__(self, user_id: int, username: str, token: str, product_ids: List[int], rnd: random.Random):
+        self.user_id = user_id
+        self.username = username
+        self.token = token
+        self.product_ids = product_ids
+        self.rnd = rnd
+        # (query, next_cursor) together: several clients can share one user
+        self.cursor: Optional[Tuple[str, str]] = None
+
+
+# ---------- SCENARIOS ----------
+# each returns (response, expected status codes)
+
+async def login(client: httpx.AsyncClient, user: VirtualUser):
+    r = await client.post("/auth/login", data={"username": user.username, "password": PASSWORD})
+    if r.status_code == 200:
+        user.token = r.json()["access_token"]
+    return r, (200,)
+
+
+async def list_products(client: httpx.AsyncClient, user: VirtualUser):
+    if user.cursor and user.rnd.random() < 0.5:
+        base, cursor = user.cursor
+        query = f"{base}&cursor={cursor}"
+    else:
+        sort_by, sort_dir = user.rnd.choice(SORTS), user.rnd.choice(["asc", "desc"])
+        base = query = f"page_size=20&sort_by={sort_by}&sort_dir={sort_dir}"
+    r = await client.get(f"/products/paged?{query}", headers=_auth(user))
+    next_cursor = r.json().get("next_cursor") if r.status_code == 200 else None
+    user.cursor = (base, next_cursor) if next_cursor else None
+    return r, (200,)
+
+
+async def search(client: httpx.AsyncClient, user: VirtualUser):
+    word = user.rnd.choice(ADJECTIVES + NOUNS)
+    term = word[: user.rnd.randint(3, len(word))]
+    return await client.get(f"/products/paged?page_size=20&search={term}", headers=_auth(user)), (200,)
+
+
+async def stock(client: httpx.AsyncClient, user: VirtualUser):
+    if not user.product_ids:
+        return await client.get("/products/categories", headers=_auth(user)), (200,)
+    product_id = user.rnd.choice(user.product_ids)
+    direction = user.rnd.choice(["increase", "decrease"])
+    r = await client.patch(f"/products/{product_id}/{direction}", json={"amount": 1}, headers=_auth(user))
+    # quantity 0'da azaltma 400 doner; bu beklenen bir sonuc
+    return r, (200, 400) if direction == "decrease" else (200,)
+
+
+async def stats(client: httpx.AsyncClient, user: VirtualUser):
+    url = "/stats/" if user.rnd.random() < 0.5 else "/stats/daily?days=30"
+    return await client.get(url, headers=_auth(user)), (200,)
+
+
+async def categories(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get("/products/categories", headers=_auth(user)), (200,)
+
+
+async def low_stock(client: httpx.AsyncClient, user: VirtualUser):
+    return await client.get("/products/low_stock?threshold=5", headers=_auth(user)), (200,)
+
+
+SCENARIOS = {
+    "login": login,
+    "list": list_products,
+    "search": search,
+    "stock": stock,
+    "stats": stats,
+    "categories": categories,
+    "low_stock": low_stock,
+}
+
+
+def _auth(user: VirtualUser) -> dict:
+    return {"Authorization": f"Bearer {user.token}"}
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    spec = MIXES.get(spec, spec)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+# ---------- SERVER ----------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url: str, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(url + "/", timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+_METRIC_LINE = re.compile(r'^(\w+)\{method="(\w*)",route="([^"]*)"(?:,status="(\d+)")?\} ([\d.e+-]+)$')
+
+
+def scrape(base: str) -> Dict[str, Dict[str, float]]:
+    """Per-route totals from the server's /metrics."""
+    totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    for line in httpx.get(base + "/metrics", timeout=10.0).text.splitlines():
+        match = _METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, method, route, _, value = match.groups()
+        if name in ("http_requests_total", "db_statements_total", "db_statement_seconds_total", "db_rows_total"):
+            totals[f"{method} {route}".strip()][name] += float(value)
+    return totals
+
+
+def route_costs(before, after) -> Dict[str, dict]:
+    out = {}
+    for route, values in after.items():
+        delta = {k: v - before.get(route, {}).get(k, 0.0) for k, v in values.items()}
+        requests = delta.get("http_requests_total", 0)
+        if requests <= 0 or route.endswith("/metrics"):
+            continue
+        out[route] = {
+            "requests": int(requests),
+            "queries_per_request": round(delta.get("db_statements_total", 0) / requests, 2),
+            "sql_ms_per_request": round(delta.get("db_statement_seconds_total", 0) * 1000 / requests, 3),
+            "rows_per_request": round(delta.get("db_rows_total", 0) / requests, 1),
+        }
+    return dict(sorted(out.items()))
+
+
+# ---------- DRIVER ----------
+
+async def _virtual_user(base, user, mix, stop_at, measure_from, results):
+    names, weights = list(mix), list(mix.values())
+    async with httpx.AsyncClient(base_url=base, timeout=60.0) as client:
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = user.rnd.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                response, expected = await SCENARIOS[name](client, user)
+            except httpx.HTTPError as exc:
+                if started >= measure_from:
+                    results[name]["errors"][type(exc).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            if started < measure_from:
+                continue
+            entry = results[name]
+            entry["latencies"].append(elapsed)
+            entry["status"][response.status_code] += 1
+            if response.status_code not in expected:
+                entry["errors"][str(response.status_code)] += 1
+
+
+async def drive(base, users, mix, clients, seconds, warmup):
+    results = defaultdict(lambda: {"latencies": [], "status": Counter(), "errors": Counter()})
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + seconds
+    await asyncio.gather(*(
+        _virtual_user(base, users[i % len(users)], mix, stop_at, measure_from, results) for i in range(clients)
+    ))
+    return results
+
+
+def percentiles(latencies: List[float]) -> dict:
+    data = sorted(latencies)
+    if not data:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    pick = lambda p: round(data[min(len(data) - 1, int(len(data) * p))] * 1000, 2)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": round(data[-1] * 1000, 2)}
+
+
+def summarize(results, seconds) -> dict:
+    scenarios, everything, errors = {}, [], 0
+    for name, entry in sorted(results.items()):
+        n_errors = sum(entry["errors"].values())
+        scenarios[name] = {
+            "requests": len(entry["latencies"]),
+            "rps": round(len(entry["latencies"]) / seconds, 1),
+            "errors": n_errors,
+            **percentiles(entry["latencies"]),
+            "status": {str(k): v for k, v in sorted(entry["status"].items())},
+            "error_kinds": dict(entry["errors"].most_common(5)),
+        }
+        everything += entry["latencies"]
+        errors += n_errors
+    total = {"requests": len(everything), "rps": round(len(everything) / seconds, 1), "errors": errors,
+             **percentiles(everything)}
+    return {"total": total, "scenarios": scenarios}
+
+
+# ---------- SETUP / REPORT ----------
+
+def prepare(args) -> str:
+    if args.database_url:
+        url = args.database_url
+    else:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='load_bench_'), 'bench.db')}"
+    engine, _ = make_engine(url)
+    with engine.connect() as conn:
+        empty = conn.execute(select(models.User.id).limit(1)).first() is None
+    if empty:
+        password = bcrypt.using(rounds=args.bcrypt_rounds).hash(PASSWORD)
+        seed(engine, args.rows, users=args.users, password=password)
+        seed_logs(engine, args.logs, users=args.users)
+    else:
+        print(f"{url} already has data; not seeding", file=sys.stderr)
+    engine.dispose()
+    return url
+
+
+def virtual_users(url: str, count: int, seed_value: int) -> List[VirtualUser]:
+    from app.oauth2 import create_token
+
+    engine, Session = make_engine(url)
+    with Session() as db:
+        accounts = db.query(models.User.id, models.User.username, models.User.role).order_by(models.User.id).all()
+        owned = defaultdict(list)
+        for product_id, owner_id in db.query(models.Product.id, models.Product.owner_id).limit(200_000):
+            if len(owned[owner_id]) < 500:
+                owned[owner_id].append(product_id)
+    engine.dispose()
+    users = []
+    for i, (user_id, username, role) in enumerate(accounts[:count]):
+        token = create_token({"user_id": user_id, "role": role})
+        users.append(VirtualUser(user_id, username, token, owned[user_id], random.Random(seed_value + i)))
+    return users
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict):
+    total = report["summary"]["total"]
+    print(f"{'scenario':<12} {'req':>7} {'rps':>8} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for name, s in list(report["summary"]["scenarios"].items()) + [("TOTAL", total)]:
+        if not s["requests"]:
+            continue
+        print(f"{name:<12} {s['requests']:>7} {s['rps']:>8.1f} {s['errors']:>5} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}")
+    print(f"\n{'route':<36} {'req':>7} {'queries/req':>12} {'sql ms/req':>11} {'rows/req':>9}")
+    for route, r in report["routes"].items():
+        print(f"{route:<36} {r['requests']:>7} {r['queries_per_request']:>12} "
+              f"{r['sql_ms_per_request']:>11} {r['rows_per_request']:>9}")
+
+
+def compare(report: dict, path: str):
+    with open(path) as f:
+        old = json.load(f)
+    print(f"\nvs {path} ({old['meta'].get('git') or '?'} at {old['meta']['started_at']})")
+    print(f"{'scenario':<12} {'rps':>16} {'p95 ms':>18} {'p99 ms':>18}")
+    rows = list(report["summary"]["scenarios"].items()) + [("TOTAL", report["summary"]["total"])]
+    for name, new in rows:
+        prev = old["summary"]["total"] if name == "TOTAL" else old["summary"]["scenarios"].get(name)
+        if not prev or not new["requests"] or not prev["requests"]:
+            continue
+        cells = []
+        for key in ("rps", "p95_ms", "p99_ms"):
+            change = (new[key] / prev[key] - 1) * 100 if prev[key] else 0.0
+            cells.append(f"{new[key]:>9.1f} ({change:+5.1f}%)")
+        print(f"{name:<12} " + " ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", default="mixed", help=f"preset ({', '.join(MIXES)}) or name=weight,...")
+    parser.add_argument("--rows", type=int, default=100_000, help="products to seed")
+    parser.add_argument("--users", type=int, default=20, help="users to seed (user 1 is admin)")
+    parser.add_argument("--logs", type=int, default=50_000, help="audit log rows to seed")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="BCRYPT_ROUNDS for seeded passwords and server")
+    parser.add_argument("--database-url", help="use this (empty) database instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the scenario choices")
+    parser.add_argument("--json", help="write the report as JSON to this path ('-' for stdout)")
+    parser.add_argument("--compare", help="earlier --json report to compare against")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    url = prepare(args)
+    users = virtual_users(url, args.users, args.seed)
+
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=url, BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+               METRICS_ENABLED="true", SLOW_REQUEST_MS="0", DB_PROFILE="prod")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    started_at = datetime.utcnow().isoformat(timespec="seconds") + "Z"
+    try:
+        _wait_until_up(base)
+        if args.warmup:
+            asyncio.run(drive(base, users, mix, args.clients, 0, args.warmup))
+        before = scrape(base)
+        results = asyncio.run(drive(base, users, mix, args.clients, args.seconds, 0))
+        after = scrape(base)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        "meta": {
+            "started_at": started_at,
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": url.split("://")[0],
+            "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+            "mix": mix,
+        },
+        "summary": summarize(results, args.seconds),
+        "routes": route_costs(before, after),
+    }
+
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
+        if args.json:
+            os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nwrote {args.json}")
+    if args.compare:
+        compare(report, args.compare)
+    return 1 if report["summary"]["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
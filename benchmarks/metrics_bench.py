@@ -0,0 +1,124 @@
+"""Per-request overhead of the metrics middleware and SQL hooks.
+
+    python -m benchmarks.metrics_bench [requests] [rounds]     (default: 300 7)
+
+Requests are driven straight into the ASGI app (no HTTP client, no network)
+against a seeded SQLite file, so the baseline is as small as possible and
+any overhead shows. "off" removes the engine hooks and disables the
+middleware; "on" is the production default; "on+timing" also adds the
+Server-Timing header. Modes are interleaved over several rounds and the
+median is reported. The product cache is disabled so every detail request
+reaches the database.
+
+A second table times bare `SELECT 1` statements with and without the
+engine hooks, i.e. the per-statement cost.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault(
+    "DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="metrics_bench_"), "bench.db")
+)
+os.environ.setdefault("SLOW_REQUEST_MS", "0")
+
+from sqlalchemy import text
+
+from benchmarks.common import seed
+from app import cache, metrics, oauth2, startup
+from app.config import settings
+from app.database import engine
+from app.main import app
+
+ROUTES = ["/", "/products/17", "/products/paged?page_size=50"]
+MODES = ("off", "on", "on+timing")
+
+
+def configure(mode: str):
+    settings.metrics_enabled = mode != "off"
+    settings.server_timing = mode == "on+timing"
+    if mode == "off":
+        metrics.uninstrument(engine)
+    else:
+        metrics.instrument(engine)
+    # the SQLite row counter is installed per connection
+    engine.dispose()
+
+
+async def request(url: str, headers):
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    status = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    if status[0] != 200:
+        raise RuntimeError(f"{url} -> {status[0]}")
+
+
+async def timed(url: str, n: int, headers) -> float:
+    started = time.perf_counter()
+    for _ in range(n):
+        await request(url, headers)
+    return (time.perf_counter() - started) / n
+
+
+def statement_cost(n: int = 20_000) -> float:
+    with engine.connect() as conn:
+        stmt = text("SELECT 1")
+        for _ in range(200):
+            conn.execute(stmt)
+        started = time.perf_counter()
+        for _ in range(n):
+            conn.execute(stmt).scalar()
+        return (time.perf_counter() - started) / n
+
+
+async def main(n: int, rounds: int):
+    startup.setup_database()
+    seed(engine, 2000)
+    cache.use(cache.NullCache())
+    headers = [(b"authorization", ("Bearer " + oauth2.create_token({"user_id": 1, "role": "admin"})).encode())]
+    samples = {(mode, url): [] for mode in MODES for url in ROUTES}
+    per_statement = {mode: [] for mode in ("off", "on")}
+
+    for url in ROUTES:
+        await timed(url, 50, headers)
+    for _ in range(rounds):
+        for mode in MODES:
+            configure(mode)
+            for url in ROUTES:
+                samples[mode, url].append(await timed(url, n, headers))
+            if mode in per_statement:
+                per_statement[mode].append(statement_cost())
+
+    print(f"{n} requests x {rounds} rounds per route, median per request")
+    for url in ROUTES:
+        off = statistics.median(samples["off", url])
+        line = f"{url:<30} off {off * 1e6:8.1f} us"
+        for mode in MODES[1:]:
+            t = statistics.median(samples[mode, url])
+            line += f"   {mode} {(t - off) * 1e6:+6.1f} us ({(t / off - 1) * 100:+5.1f}%)"
+        print(line)
+    off, on = (statistics.median(per_statement[m]) for m in ("off", "on"))
+    print(f"{'SELECT 1':<30} off {off * 1e6:8.1f} us   on {(on - off) * 1e6:+6.1f} us per statement")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 7,
+    ))
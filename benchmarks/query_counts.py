@@ -0,0 +1,55 @@
+"""Check that product listings issue a constant number of SQL statements.
+
+    python -m benchmarks.query_counts
+
+Requests each listing route at several page sizes / result sizes through the
+app and fails (exit status 1) if the statement count grows with the number
+of rows returned, i.e. if an N+1 owner lookup creeps back in.
+"""
+import logging
+import os
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="query_counts_"), "bench.db")
+
+from benchmarks.common import count_queries, seed  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import oauth2, startup  # noqa: E402
+from app.database import engine  # noqa: E402
+
+# each group returns more and more rows; its statement count must not change
+ROUTES = [
+    ["/products/paged?page_size=5", "/products/paged?page_size=20", "/products/paged?page_size=100"],
+    ["/products/paged?page_size=%d&sort_by=name&sort_dir=asc&search=widget" % n for n in (5, 20, 100)],
+    ["/products/?search=widget&category=tools", "/products/?search=widget", "/products/?category=tools"],
+    ["/products/low_stock?threshold=%d" % n for n in (0, 5, 50)],
+]
+
+
+def main() -> int:
+    logging.disable(logging.CRITICAL)
+    from app.main import app
+
+    startup.setup_database()
+    seed(engine, 5000, users=200)
+    headers = {"Authorization": "Bearer " + oauth2.create_token({"user_id": 1, "role": "admin"})}
+    failed = False
+    with TestClient(app) as client:
+        client.get("/products/paged", headers=headers)  # warm-up (token cache, first connect)
+        for urls in ROUTES:
+            counts = []
+            for url in urls:
+                with count_queries(engine) as queries:
+                    r = client.get(url, headers=headers)
+                rows = len(r.json()["items"] if "paged" in url else r.json())
+                counts.append((rows, queries[0]))
+            constant = len({q for _, q in counts}) == 1
+            failed |= not constant
+            print(f"{'OK ' if constant else 'N+1'} {urls[0]:<75} " + "  ".join(f"{n} rows: {q} stmts" for n, q in counts))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""Check the SQLite query plan of every statement the routers issue.
+
+    python -m benchmarks.query_plans [-v]
+
+Seeds a database, calls each route through the app as an admin and as a
+plain user, captures every SELECT/UPDATE/DELETE it sends and runs
+EXPLAIN QUERY PLAN on it with the same parameters. Exits with status 1 if a
+plan contains a full table scan (`SCAN <table>` without an index) or sorts
+the whole result in a temp B-tree for ORDER BY, unless the case explicitly
+allows it (e.g. listing every user). Index-ordered scans (`SCAN ... USING
+INDEX`) pass for first pages, where they stop at the LIMIT; a cursor page
+must SEARCH (seek) to its pivot instead. `-v` prints every plan.
+"""
+import logging
+import os
+import re
+import sys
+import tempfile
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="query_plans_"), "bench.db")
+
+from sqlalchemy import event  # noqa: E402
+
+from benchmarks.common import seed, seed_logs  # noqa: E402
+from app import cache, oauth2, startup  # noqa: E402
+from app.database import engine  # noqa: E402
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+TEMP_SORT = "USE TEMP B-TREE FOR ORDER BY"
+SORTS = ["id", "name", "quantity", "category", "created_at", "updated_at"]
+
+ADMIN, USER = 1, 2
+# /stats sums the whole (owners x days) counter table by design
+COUNTERS = {"scan:product_counters": "materialized counters, one row per owner and day"}
+# the admin's low-stock count is the size of the (small) watchlist table
+WATCHLIST = {"scan:low_stock_items": "the watchlist only holds low-stock products"}
+# listing validators outside one owner's scope sum the per-owner versions (app/conditional.py)
+VERSIONS = {"scan:catalog_versions": "conditional GET validator, one row per owner"}
+
+
+class Case:
+    def __init__(self, role, method, url, body=None, follow_cursor=False, allow=None):
+        self.role = role
+        self.method = method
+        self.url = url
+        self.body = body
+        self.follow_cursor = follow_cursor
+        # {"scan:<table>" | "sort": reason}
+        self.allow = {**VERSIONS, **(allow or {})}
+
+    @property
+    def label(self):
+        return f"{'admin' if self.role == ADMIN else 'user '} {self.method} {self.url}"
+
+
+def cases():
+    out = []
+    for role in (ADMIN, USER):
+        for sort_by in SORTS:
+            # admin + id: "SCAN products" walks the rowid (primary key) order and stops at the LIMIT
+            allow = {"scan:products": "rowid order"} if role == ADMIN and sort_by == "id" else None
+            for sort_dir in ("asc", "desc"):
+                out.append(Case(role, "GET", f"/products/paged?page_size=20&sort_by={sort_by}&sort_dir={sort_dir}",
+                                follow_cursor=True, allow=allow))
+        out += [
+            Case(role, "GET", "/products/paged?page_size=20&category=tools", follow_cursor=True),
+            Case(role, "GET", "/products/paged?page_size=20&search=widget", follow_cursor=True,
+                 allow={"sort": "matches come from the FTS index, then get sorted"}),
+            Case(role, "GET", "/products/?category=tools"),
+            Case(role, "GET", "/products/?search=widget", allow={"sort": "ordered by FTS relevance"}),
+            Case(role, "GET", "/products/low_stock?threshold=5"),
+            Case(role, "GET", "/products/low_stock"),
+            Case(role, "GET", "/products/low_stock/paged?page_size=20", follow_cursor=True),
+            Case(role, "GET", "/products/low_stock/paged?page_size=20&threshold=5", follow_cursor=True),
+            Case(role, "GET", "/products/low_stock/count", allow=WATCHLIST),
+            Case(role, "GET", "/products/low_stock/count?threshold=5"),
+            Case(role, "GET", "/products/export?format=ndjson&category=tools"),
+            Case(role, "GET", "/products/export?search=widget"),
+            Case(role, "GET", "/products/categories"),
+            Case(role, "GET", "/products/{own}"),
+            Case(role, "PATCH", "/products/{own}/increase", {"amount": 1}),
+            Case(role, "PATCH", "/products/{own}/decrease", {"amount": 1}),
+            Case(role, "PUT", "/products/{own}", {"name": "plan check", "quantity": 3, "category": "tools"}),
+            Case(role, "POST", "/products/", {"name": "plan check", "quantity": 3, "category": "tools"}),
+            Case(role, "DELETE", "/products/{own}"),
+            Case(role, "GET", "/stats/", allow=COUNTERS),
+            Case(role, "GET", "/stats/?threshold=3", allow=COUNTERS),
+            Case(role, "GET", "/stats/daily?days=30", allow=COUNTERS),
+            Case(role, "GET", "/users/me"),
+        ]
+    out += [
+        Case(ADMIN, "GET", "/users/admin", allow={"scan:users": "lists every user"}),
+        Case(ADMIN, "GET", "/products/export", allow={"scan:products": "exports the whole catalog in id order"}),
+        Case(ADMIN, "GET", "/logs/?limit=100"),
+        Case(ADMIN, "GET", "/logs/paged?page_size=50", follow_cursor=True),
+        Case(ADMIN, "GET", f"/logs/paged?page_size=50&user_id={USER}", follow_cursor=True),
+        Case(ADMIN, "GET", "/logs/paged?page_size=50&action=increase_stock", follow_cursor=True),
+        Case(ADMIN, "GET", "/logs/paged?page_size=50&entity=product&entity_id=10"),
+        Case(ADMIN, "GET", "/logs/paged?page_size=50&since=2000-01-01T00:00:00"),
+        Case(ADMIN, "GET", "/logs/export?format=ndjson&user_id=3"),
+    ]
+    return out
+
+
+def explain(statement: str, parameters) -> list:
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        raw.close()
+
+
+def problems(plan: list, allow: dict, continuation: bool = False) -> list:
+    found = []
+    if continuation and plan and plan[0].startswith("SCAN ") and "VIRTUAL TABLE" not in plan[0]:
+        # a cursor page has to seek to the pivot, not walk the index from the start
+        found.append(f"cursor page does not seek: {plan[0]}")
+    for detail in plan:
+        match = FULL_SCAN.match(detail)
+        if match and f"scan:{match.group(1)}" not in allow:
+            found.append(f"full table scan: {detail}")
+        if detail.startswith(TEMP_SORT) and "sort" not in allow:
+            found.append(f"sort without index: {detail}")
+    return found
+
+
+def main(argv) -> int:
+    verbose = "-v" in argv
+    logging.disable(logging.CRITICAL)
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    startup.setup_database()
+    seed(engine, 20_000, users=50)
+    seed_logs(engine, 20_000, users=50)
+    cache.use(cache.NullCache())
+    with engine.connect() as conn:
+        owned = {
+            role: [r[0] for r in conn.exec_driver_sql(
+                "SELECT id FROM products WHERE owner_id = ? ORDER BY id LIMIT 50", (role,))]
+            for role in (ADMIN, USER)
+        }
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    tokens = {role: oauth2.create_token({"user_id": role, "role": "admin" if role == ADMIN else "user"})
+              for role in (ADMIN, USER)}
+    failed, checked, seen = 0, 0, set()
+    with TestClient(app) as client:
+        for case in cases():
+            headers = {"Authorization": f"Bearer {tokens[case.role]}"}
+            url = case.url.replace("{own}", str(owned[case.role].pop()))
+            captured.clear()
+            r = client.request(case.method, url, json=case.body, headers=headers)
+            if case.follow_cursor and r.status_code == 200 and r.json().get("next_cursor"):
+                client.get(f"{url}&cursor={r.json()['next_cursor']}", headers=headers)
+            if r.status_code >= 400:
+                print(f"ERR  {case.label} -> {r.status_code} {r.text[:200]}")
+                failed += 1
+                continue
+            issues = []
+            for statement, parameters in captured:
+                plan = explain(statement, parameters)
+                checked += 1
+                found = problems(plan, case.allow, continuation="cursor_row" in statement)
+                issues += [(statement, plan, f) for f in found]
+                if verbose and (statement, tuple(plan)) not in seen:
+                    seen.add((statement, tuple(plan)))
+                    print(f"     {' '.join(statement.split())[:160]}\n       " + "\n       ".join(plan))
+            print(f"{'OK ' if not issues else 'BAD'}  {case.label}  ({len(captured)} stmts)")
+            for statement, plan, message in issues:
+                print(f"       {message}\n       in: {' '.join(statement.split())[:200]}")
+            failed += bool(issues)
+    event.remove(engine, "before_cursor_execute", capture)
+    print(f"\n{checked} statements checked, {failed} cases failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,90 @@
+"""Throughput scaling from 1 to N worker processes.
+
+    python -m benchmarks.scale_bench [--workers 1,2,4] [--clients 100] [--seconds 10] [--mix read]
+
+Seeds one SQLite database (same data and scenarios as load_bench), then for
+each worker count starts `python -m app.serve --workers N` on it and drives
+it with the same virtual users. Reports requests/s, p50/p99 latency, the
+speedup over the first run and the parallel efficiency (speedup / workers).
+
+Notes for reading the numbers:
+- workers above the number of cores (`os.cpu_count()`, printed) cannot help;
+- the load generator is a single asyncio process and shares the machine, so
+  near the top it becomes the limit; compare p50 to see queueing;
+- write-heavy mixes serialise on SQLite's single writer no matter how many
+  workers there are; `read` shows CPU scaling best.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+
+from benchmarks.load_bench import (
+    MIXES, _free_port, _wait_until_up, drive, parse_mix, prepare, summarize, virtual_users,
+)
+
+
+def run(url: str, users, mix, workers: int, args) -> dict:
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=url, BCRYPT_ROUNDS=str(args.bcrypt_rounds),
+               SLOW_REQUEST_MS="0", DB_PROFILE="prod")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_up(base)
+        if args.warmup:
+            asyncio.run(drive(base, users, mix, args.clients, 0, args.warmup))
+        results = asyncio.run(drive(base, users, mix, args.clients, args.seconds, 0))
+    finally:
+        server.terminate()
+        server.wait()
+    return summarize(results, args.seconds)["total"]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", default=None, help="comma separated worker counts (default 1,2,4.. up to cores)")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent virtual users")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured duration per run")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", default="read", help=f"preset ({', '.join(MIXES)}) or name=weight,...")
+    parser.add_argument("--rows", type=int, default=100_000, help="products to seed")
+    parser.add_argument("--users", type=int, default=20, help="users to seed (user 1 is admin)")
+    parser.add_argument("--logs", type=int, default=10_000, help="audit log rows to seed")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="BCRYPT_ROUNDS for seeded passwords and server")
+    parser.add_argument("--database-url", help="use this (empty) database instead of a temporary SQLite file")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the scenario choices")
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    cores = os.cpu_count() or 1
+    if args.workers:
+        counts = [int(n) for n in args.workers.split(",")]
+    else:
+        counts, n = [], 1
+        while n <= cores:
+            counts.append(n)
+            n *= 2
+        if counts[-1] != cores:
+            counts.append(cores)
+
+    url = prepare(args)
+    users = virtual_users(url, args.users, args.seed)
+    print(f"{cores} cores, mix {args.mix}, {args.clients} clients, {args.seconds:g}s per run")
+    print(f"{'workers':>8} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'speedup':>8} {'efficiency':>11}")
+    baseline = None
+    for workers in counts:
+        total = run(url, users, mix, workers, args)
+        baseline = baseline or total["rps"] or 1.0
+        speedup = total["rps"] / baseline
+        print(f"{workers:>8} {total['rps']:>9.1f} {total['p50_ms'] or 0:>8.1f} {total['p99_ms'] or 0:>8.1f} "
+              f"{total['errors']:>7} {speedup:>7.2f}x {speedup / workers:>10.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""p50/p99 latency of product search: the old `name LIKE '%term%'` vs. the FTS index.
+
+    python -m benchmarks.search_bench [rows ...]     (default: 10000 100000)
+"""
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import make_engine, seed
+from app import models, search
+
+# a mix of common words, word prefixes, rare ids and misses
+TERMS = ["widget", "lamp", "wirel", "steel hammer", "blue charg", "12345", "zzz"]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    q = statistics.quantiles(samples, n=100)
+    return samples[len(samples) // 2], q[98]
+
+
+def run(rows: int, iterations: int = 200):
+    engine, Session = make_engine()
+    seed(engine, rows)
+    search.setup(engine)
+    db = Session()
+    rnd = random.Random(1)
+
+    # the first page of 20 results, as /products/paged would return it
+    def like(term):
+        return db.query(models.Product).filter(models.Product.name.contains(term)).limit(20).all()
+
+    def fts(term):
+        return search.apply(db.query(models.Product), term).limit(20).all()
+
+    def fts_ranked(term):
+        return search.apply(db.query(models.Product), term, ranked=True).limit(20).all()
+
+    for label, fn in (("like      ", like), ("fts       ", fts), ("fts ranked", fts_ranked)):
+        samples = []
+        for _ in range(iterations):
+            term = rnd.choice(TERMS)
+            started = time.perf_counter()
+            fn(term)
+            samples.append((time.perf_counter() - started) * 1000)
+        p50, p99 = percentiles(samples)
+        print(f"{rows:>9}  {label}  p50={p50:8.2f} ms  p99={p99:8.2f} ms")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    for size in [int(a) for a in sys.argv[1:]] or [10_000, 100_000]:
+        run(size)
@@ -0,0 +1,55 @@
+"""Serialisation cost per row: response_model validation vs. the FAST_JSON path.
+
+    python -m benchmarks.serialize_bench [rows ...]     (default: 1000 10000)
+
+"response_model" mimics FastAPI: load ORM objects (owner eager-loaded),
+validate them into List[ProductResponse] and dump JSON. "fast" selects
+column tuples, builds dicts and encodes them with orjson.
+"""
+import sys
+import time
+from typing import List
+
+from pydantic import TypeAdapter
+
+from benchmarks.common import make_engine, seed
+from app import queries, schemas, serializers
+
+ADAPTER = TypeAdapter(List[schemas.ProductResponse])
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows: int):
+    engine, Session = make_engine()
+    seed(engine, rows, users=50)
+    db = Session()
+
+    orm_items = queries.products(db).all()
+    tuples = queries.product_rows(db).all()
+
+    cases = [
+        ("serialise  response_model", lambda: ADAPTER.dump_json(ADAPTER.validate_python(orm_items, from_attributes=True))),
+        ("serialise  fast          ", lambda: serializers.dumps(serializers.product_dicts(tuples))),
+        ("query+ser  response_model", lambda: ADAPTER.dump_json(
+            ADAPTER.validate_python(queries.products(db).all(), from_attributes=True))),
+        ("query+ser  fast          ", lambda: serializers.dumps(serializers.product_dicts(queries.product_rows(db).all()))),
+    ]
+    for label, fn in cases:
+        db.expunge_all()
+        print(f"{rows:>7}  {label}  {best_of(fn) / rows * 1e6:7.2f} us/row")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"orjson: {'yes' if serializers.orjson else 'no (stdlib json)'}")
+    for size in [int(a) for a in sys.argv[1:]] or [1000, 10_000]:
+        run(size)
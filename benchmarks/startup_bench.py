@@ -0,0 +1,178 @@
+"""Import-time profile and cold-start time of the app.
+
+    python -m benchmarks.startup_bench [--runs 5] [--target-ms 1500]
+    python -m benchmarks.startup_bench --json runs/startup.json --compare benchmarks/startup_baseline.json
+
+Every measurement runs in a fresh interpreter:
+
+- import: wall time of `import app.main`, and a `python -X importtime`
+  profile of it, summed per top-level package (self time) so a new heavy
+  dependency or an import-time side effect shows up as its own line;
+- cold start: spawn `uvicorn app.main:app` and time until `GET /` answers
+  200, once against a fresh SQLite file (migrations run at startup) and once
+  against an already migrated one (the usual restart).
+
+Reported values are medians over --runs. The run fails (exit 1) when the
+median cold start on the migrated database is above --target-ms.
+benchmarks/startup_baseline.json is the profile from before startup work
+moved into the lifespan; compare new runs against it.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_bench import _free_port, git_revision
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+IMPORT_WALL = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def _env(url: str) -> dict:
+    return dict(os.environ, DATABASE_URL=url, SLOW_REQUEST_MS="0")
+
+
+def import_wall(url: str) -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_WALL], env=_env(url), capture_output=True, text=True,
+                         check=True)
+    return float(out.stdout.strip()) * 1000
+
+
+def import_profile(url: str) -> Dict[str, float]:
+    """Self time in ms per top-level package for `import app.main`; "total" is its cumulative time."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], env=_env(url),
+                         capture_output=True, text=True, check=True)
+    groups = defaultdict(float)
+    for line in out.stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, name = int(m.group(1)), int(m.group(2)), m.group(4)
+        groups[name.split(".")[0]] += self_us / 1000
+        if name == "app.main":
+            groups["total"] = cumulative_us / 1000
+    return dict(groups)
+
+
+def cold_start(url: str, timeout: float = 60.0) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=_env(url), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return (time.perf_counter() - started) * 1000
+                except httpx.HTTPError:
+                    pass
+                if server.poll() is not None:
+                    raise RuntimeError(f"server exited with status {server.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError("server did not start")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def measure(runs: int) -> dict:
+    workdir = tempfile.mkdtemp(prefix="startup_bench_")
+    migrated = f"sqlite:///{os.path.join(workdir, 'migrated.db')}"
+    cold_start(migrated)  # sema bir kez kurulur; sonraki olcumler "yeniden baslatma"
+
+    walls, profiles, fresh, warm = [], [], [], []
+    for i in range(runs):
+        walls.append(import_wall(migrated))
+        profiles.append(import_profile(migrated))
+        fresh.append(cold_start(f"sqlite:///{os.path.join(workdir, f'fresh{i}.db')}"))
+        warm.append(cold_start(migrated))
+
+    packages = {name for p in profiles for name in p}
+    imports = {name: round(statistics.median(p.get(name, 0.0) for p in profiles), 1) for name in packages}
+    return {
+        "import_ms": round(statistics.median(walls), 1),
+        "cold_start_ms": {"fresh": round(statistics.median(fresh), 1), "migrated": round(statistics.median(warm), 1)},
+        "imports": dict(sorted(imports.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def print_report(report: dict, top: int):
+    r = report["results"]
+    print(f"import app.main          {r['import_ms']:>8.1f} ms  (importtime total {r['imports'].get('total', 0):.1f} ms)")
+    print(f"cold start, fresh db     {r['cold_start_ms']['fresh']:>8.1f} ms")
+    print(f"cold start, migrated db  {r['cold_start_ms']['migrated']:>8.1f} ms  (target {report['meta']['target_ms']:g} ms)")
+    print(f"\n{'package':<24} {'self ms':>8}")
+    for name, ms in [kv for kv in r["imports"].items() if kv[0] != "total"][:top]:
+        print(f"{name:<24} {ms:>8.1f}")
+
+
+def compare(report: dict, path: str, top: int):
+    with open(path) as f:
+        old = json.load(f)
+    new_r, old_r = report["results"], old["results"]
+    print(f"\nvs {path} ({old['meta'].get('git') or '?'} at {old['meta']['started_at']})")
+    rows = [
+        ("import app.main", new_r["import_ms"], old_r["import_ms"]),
+        ("cold start, fresh db", new_r["cold_start_ms"]["fresh"], old_r["cold_start_ms"]["fresh"]),
+        ("cold start, migrated db", new_r["cold_start_ms"]["migrated"], old_r["cold_start_ms"]["migrated"]),
+    ]
+    names = sorted((set(new_r["imports"]) | set(old_r["imports"])) - {"total"},
+                   key=lambda n: -abs(new_r["imports"].get(n, 0.0) - old_r["imports"].get(n, 0.0)))
+    rows += [(f"  {n}", new_r["imports"].get(n, 0.0), old_r["imports"].get(n, 0.0)) for n in names[:top]]
+    print(f"{'':<26} {'ms':>8} {'before':>8} {'change':>8}")
+    for label, new, prev in rows:
+        print(f"{label:<26} {new:>8.1f} {prev:>8.1f} {new - prev:>+8.1f}")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--target-ms", type=float, default=1500.0, help="cold start budget (migrated database)")
+    parser.add_argument("--top", type=int, default=15, help="packages to list")
+    parser.add_argument("--json", help="write the report as JSON to this path ('-' for stdout)")
+    parser.add_argument("--compare", help="earlier --json report to compare against")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cores": os.cpu_count(),
+            "runs": args.runs,
+            "target_ms": args.target_ms,
+        },
+        "results": measure(args.runs),
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report, args.top)
+        if args.json:
+            os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nwrote {args.json}")
+    if args.compare:
+        compare(report, args.compare, args.top)
+    return 1 if report["results"]["cold_start_ms"]["migrated"] > args.target_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
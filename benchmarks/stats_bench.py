@@ -0,0 +1,103 @@
+"""Compare the old per-count stats queries, the single-pass scan and the counters table.
+
+    python -m benchmarks.stats_bench [rows ...]     (default: 10000 100000 1000000)
+"""
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case
+from sqlalchemy.sql import func
+
+from benchmarks.common import count_queries, make_engine, seed, timeit
+from app import counters, models
+from app.stats_engine import day_key, today_start
+
+USER_ID = 2
+THRESHOLD = 10
+DAYS = 30
+
+
+def legacy_stats(db):
+    P = models.Product
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return [
+        db.query(func.count(P.id)).scalar(),
+        db.query(func.count(P.id)).filter(P.owner_id == USER_ID).scalar(),
+        db.query(func.count(P.id)).filter(P.quantity < THRESHOLD).scalar(),
+        db.query(func.count(P.id)).filter(P.owner_id == USER_ID, P.quantity < THRESHOLD).scalar(),
+        db.query(func.count(P.id)).filter(P.created_at >= today).scalar(),
+        db.query(func.count(P.id)).filter(P.owner_id == USER_ID, P.created_at >= today).scalar(),
+    ]
+
+
+def legacy_daily(db):
+    P = models.Product
+    out = []
+    for i in range(DAYS - 1, -1, -1):
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=i)
+        end = start + timedelta(days=1)
+        out.append((
+            db.query(func.count(P.id)).filter(P.created_at >= start, P.created_at < end).scalar(),
+            db.query(func.count(P.id)).filter(P.owner_id == USER_ID, P.created_at >= start, P.created_at < end).scalar(),
+        ))
+    return out
+
+
+def _count_if(*conditions):
+    """COUNT only the rows matching every condition (conditional aggregate)."""
+    return func.count(case((and_(*conditions), 1)))
+
+
+def scan_stats(db):
+    """The single-pass version /stats used before the counters: one scan of `products`."""
+    P = models.Product
+    mine = P.owner_id == USER_ID
+    low = P.quantity < THRESHOLD
+    today = P.created_at >= today_start()
+    return db.query(
+        func.count(P.id), _count_if(mine), _count_if(low), _count_if(mine, low), _count_if(today),
+        _count_if(mine, today),
+    ).one()
+
+
+def scan_daily(db):
+    """The one GROUP BY version /stats/daily used before the counters."""
+    P = models.Product
+    first_day = today_start() - timedelta(days=DAYS - 1)
+    day_col = func.date(P.created_at)
+    rows = (
+        db.query(day_col, func.count(P.id), _count_if(P.owner_id == USER_ID))
+        .filter(P.created_at >= first_day)
+        .group_by(day_col)
+        .all()
+    )
+    counts = {day_key(day): (count_all or 0, count_mine or 0) for day, count_all, count_mine in rows}
+    return [counts.get((first_day + timedelta(days=i)).date().isoformat(), (0, 0)) for i in range(DAYS)]
+
+
+def run(rows: int):
+    engine, Session = make_engine()
+    seed(engine, rows)
+    db = Session()
+    counters.rebuild(db)
+    cases = [
+        ("stats  legacy", lambda: legacy_stats(db)),
+        ("stats  scan", lambda: scan_stats(db)),
+        ("stats  counters", lambda: counters.compute_stats(db, USER_ID, counters.LOW_STOCK_THRESHOLD)),
+        ("daily  legacy", lambda: legacy_daily(db)),
+        ("daily  scan", lambda: scan_daily(db)),
+        ("daily  counters", lambda: counters.compute_daily(db, USER_ID, DAYS)),
+    ]
+    for label, fn in cases:
+        with count_queries(engine) as queries:
+            fn()
+        ms, _ = timeit(fn, repeat=3)
+        print(f"{rows:>9}  {label:<15}  queries={queries[0]:>3}  best={ms:9.2f} ms")
+    db.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
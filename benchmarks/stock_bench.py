@@ -0,0 +1,87 @@
+"""Concurrent decrement stress test: no overselling, and ops/sec.
+
+    python -m benchmarks.stock_bench [threads] [stock]     (default: 16 2000)
+
+`threads` workers decrement one product by 1 until they are refused. The
+old read-modify-write code is replayed for comparison; the atomic version
+must sell exactly `stock` units.
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from fastapi import HTTPException
+
+from benchmarks.common import make_engine
+from app import models, schemas, stock
+
+USER = schemas.TokenData(user_id=1, role="user")
+
+
+def legacy_decrement(db, product_id):
+    product = db.query(models.Product).filter(models.Product.id == product_id).first()
+    if product.quantity < 1:
+        return False
+    product.quantity -= 1
+    db.commit()
+    return True
+
+
+def atomic_decrement(db, product_id):
+    try:
+        stock.adjust(db, product_id, -1, USER)
+    except HTTPException:
+        db.rollback()
+        return False
+    db.commit()
+    return True
+
+
+def run(label, decrement, threads, units):
+    path = os.path.join(tempfile.mkdtemp(prefix="stock_bench_"), "bench.db")
+    engine, Session = make_engine(f"sqlite:///{path}?timeout=30")
+    with Session() as db:
+        db.add(models.User(id=1, username="u", email="u@example.com", password="x"))
+        db.add(models.Product(id=1, name="hot item", quantity=units, category="x", owner_id=1))
+        db.commit()
+
+    sold, errors = [0] * threads, [0] * threads
+
+    def worker(i):
+        db = Session()
+        while True:
+            try:
+                if not decrement(db, 1):
+                    break
+                sold[i] += 1
+            except Exception:
+                db.rollback()
+                errors[i] += 1
+                if errors[i] > 1000:
+                    break
+        db.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        left = db.query(models.Product.quantity).filter(models.Product.id == 1).scalar()
+    total = sum(sold)
+    status = "OK" if total == units and left == 0 else "OVERSOLD/LOST"
+    print(f"{label:<8} sold={total:>6} stock_left={left:>4} errors={sum(errors):>4} "
+          f"{total / elapsed:8.1f} ops/s  {status}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    units = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    run("legacy", legacy_decrement, threads, units)
+    run("atomic", atomic_decrement, threads, units)
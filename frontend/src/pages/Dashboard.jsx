@@ -27,6 +27,46 @@ export default function Dashboard() {
       }
     };
     run();
+
+    // Canlı akış: ürün değişince istatistikleri yeniden çek (art arda gelen olaylar tek istekte toplanır)
+    let timer = null;
+    const refresh = () => {
+      clearTimeout(timer);
+      timer = setTimeout(run, 500);
+    };
+    // EventSource header gönderemez: URL'e access token değil, kısa ömürlü stream token konur.
+    // Token sadece bağlanırken geçerli olmalı; her (yeniden) bağlanmada yenisi alınır.
+    let source = null;
+    let retry = null;
+    let closed = false;
+    const connect = async () => {
+      try {
+        const { data } = await axios.post("http://localhost:8000/events/token", null, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (closed) return;
+        source = new EventSource(`http://localhost:8000/events/?stream_token=${encodeURIComponent(data.stream_token)}`);
+        [
+          "product.created", "product.updated", "product.stock", "product.deleted",
+          "products.created", "products.deleted", "low_stock.entered", "low_stock.cleared", "resync",
+        ].forEach((type) => source.addEventListener(type, refresh));
+        source.onerror = () => {
+          // tarayıcının kendi yeniden bağlanması süresi dolmuş token'la 401 alıp vazgeçer
+          if (source.readyState === EventSource.CLOSED) {
+            retry = setTimeout(() => { refresh(); connect(); }, 3000);
+          }
+        };
+      } catch (e) {
+        if (!closed) retry = setTimeout(connect, 10000);
+      }
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(timer);
+      clearTimeout(retry);
+      if (source) source.close();
+    };
   }, [token]);
 
   if (loading) return <Layout><div>Yükleniyor…</div></Layout>;
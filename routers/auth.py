@@ -2,8 +2,8 @@ from fastapi import APIRouter,Depends,status,HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from app.database import get_db
 from sqlalchemy.orm import Session
-from app import models,utils,oauth2
-from app.schemas import Token
+from app import models,utils,oauth2,ratelimit
+from app.schemas import Token, TokenData
 
 router = APIRouter(
     prefix="/auth",
@@ -11,7 +11,7 @@ router = APIRouter(
 )
 
 @router.post("/login", status_code=status.HTTP_200_OK, response_model=Token)
-async def user_login(
+def user_login(
         user_credentials: OAuth2PasswordRequestForm = Depends(),
         db: Session = Depends(get_db)
 ):
@@ -21,13 +21,39 @@ async def user_login(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid credentials"
         )
-    if not utils.verify(user_credentials.password, user.password):
+    valid, new_hash = utils.verify_and_update(user_credentials.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Invalid credentials"
         )
+    # BCRYPT_ROUNDS degistiyse parolayi yeni maliyetle sakla
+    if new_hash:
+        user.password = new_hash
+        db.commit()
 
     # Create token
     access_token = oauth2.create_token(data={"user_id": user.id,"role": user.role})
 
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/password-pool", status_code=status.HTTP_200_OK)
+def password_pool_stats(current_user: TokenData = Depends(oauth2.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return utils.password_pool.stats()
+
+
+@router.get("/token-cache", status_code=status.HTTP_200_OK)
+def token_cache_stats(current_user: TokenData = Depends(oauth2.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return oauth2.token_cache.stats()
+
+
+@router.get("/rate-limit", status_code=status.HTTP_200_OK)
+def rate_limit_stats(current_user: TokenData = Depends(oauth2.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return ratelimit.stats()
@@ -0,0 +1,33 @@
+# app/routers/events.py
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+
+from app import events, schemas
+from app.oauth2 import create_stream_token, get_current_user, get_stream_user
+from app.config import settings
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+
+@router.get("/stats", status_code=status.HTTP_200_OK)
+async def feed_stats(current_user: schemas.TokenData = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return events.broker.stats()
+
+
+@router.post("/token", status_code=status.HTTP_200_OK, response_model=schemas.StreamToken)
+async def stream_token(current_user: schemas.TokenData = Depends(get_current_user)):
+    """A short-lived token for `GET /events/?stream_token=` (EventSource cannot send headers)."""
+    return {"stream_token": create_stream_token(current_user), "expires_in": settings.events_token_ttl}
+
+
+@router.get("/", status_code=status.HTTP_200_OK)
+async def product_events(request: Request, current_user: schemas.TokenData = Depends(get_stream_user)):
+    """Server-Sent Events stream of product changes (see app/events.py)."""
+    subscriber = events.broker.subscribe(current_user, request.headers.get("last-event-id"))
+    return StreamingResponse(
+        events.stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,21 +1,180 @@
+import csv
+import io
+from datetime import datetime
+from typing import Iterator, List, Optional
+
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app import models, schemas, oauth2
+
+from app.config import settings
+from app.database import SessionLocal, get_db, with_session_slot
+from app import models, schemas, oauth2, pagination, serializers
 
 router = APIRouter(
     prefix="/logs",
     tags=["Logs"]
 )
 
+COLUMNS = serializers.LOG_FIELDS
+CHUNK_SIZE = 1000
+
+
+class LogFilters:
+    """Query parameters shared by every /logs route."""
+
+    def __init__(
+        self,
+        user_id: Optional[int] = None,
+        action: Optional[str] = None,
+        entity: Optional[str] = None,
+        entity_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ):
+        self.user_id = user_id
+        self.action = action
+        self.entity = entity
+        self.entity_id = entity_id
+        self.since = since
+        self.until = until
+
+    def apply(self, query):
+        Log = models.Log
+        if self.user_id is not None:
+            query = query.filter(Log.user_id == self.user_id)
+        if self.action:
+            query = query.filter(Log.action == self.action)
+        if self.entity:
+            query = query.filter(Log.entity == self.entity)
+        if self.entity_id is not None:
+            query = query.filter(Log.entity_id == self.entity_id)
+        if self.since is not None:
+            query = query.filter(Log.timestamp >= self.since)
+        if self.until is not None:
+            query = query.filter(Log.timestamp < self.until)
+        return query.order_by(Log.timestamp.desc(), Log.id.desc())
+
+
+def require_admin(current_user: schemas.TokenData = Depends(oauth2.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return current_user
+
+
+def _stream_rows(filters: LogFilters, limit: Optional[int] = None) -> Iterator[tuple]:
+    """Yield log rows as plain tuples from a server-side cursor, CHUNK_SIZE at a time.
+
+    Uses its own session: the response body is produced after the route returns.
+    The response must hold a session slot for it (`with_session_slot`).
+    """
+    db = SessionLocal()
+    try:
+        query = filters.apply(db.query(*(getattr(models.Log, c) for c in COLUMNS)))
+        if limit:
+            query = query.limit(limit)
+        yield from query.execution_options(stream_results=True, yield_per=CHUNK_SIZE)
+    finally:
+        db.close()
+
+
+def _as_dict(row) -> dict:
+    out = dict(zip(COLUMNS, row))
+    out["timestamp"] = out["timestamp"].isoformat() if out["timestamp"] else None
+    return out
+
+
+def _chunks(rows: Iterator[tuple]) -> Iterator[List[tuple]]:
+    # satir basina bir yield, her parca icin threadpool'a bir gidis demek; CHUNK_SIZE satir bir arada
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _json_array(rows: Iterator[tuple]) -> Iterator[bytes]:
+    yield b"["
+    first = True
+    for chunk in _chunks(rows):
+        body = b",".join(serializers.dumps(_as_dict(row)) for row in chunk)
+        yield body if first else b"," + body
+        first = False
+    yield b"]"
+
+
+def _ndjson(rows: Iterator[tuple]) -> Iterator[bytes]:
+    for chunk in _chunks(rows):
+        yield b"".join(serializers.dumps(_as_dict(row)) + b"\n" for row in chunk)
+
+
+def _csv(rows: Iterator[tuple]) -> Iterator[str]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    for chunk in _chunks(rows):
+        writer.writerows(_as_dict(row).values() for row in chunk)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        # bos export: sadece baslik satiri
+        yield buf.getvalue()
+
+
 @router.get("/", response_model=List[schemas.LogResponse])
 def get_logs(
+    limit: Optional[int] = None,
+    filters: LogFilters = Depends(),
+    current_user: schemas.TokenData = Depends(require_admin),
+):
+    # Ayni JSON listesi, ama satirlar bellekte toplanmadan akitilir
+    return StreamingResponse(with_session_slot(_json_array(_stream_rows(filters, limit))), media_type="application/json")
+
+
+@router.get("/paged", response_model=schemas.PagedLogsResponse)
+def get_logs_paged(
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    filters: LogFilters = Depends(),
     db: Session = Depends(get_db),
-    current_user: schemas.TokenData = Depends(oauth2.get_current_user)
+    current_user: schemas.TokenData = Depends(require_admin),
 ):
-    if current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
-    return db.query(models.Log).order_by(models.Log.timestamp.desc()).all()
+    if page_size < 1 or page_size > 500:
+        page_size = 50
+
+    fast = settings.fast_json
+    query = filters.apply(db.query(*(getattr(models.Log, c) for c in COLUMNS)) if fast else db.query(models.Log))
+    if cursor:
+        pivot = pagination.decode_cursor(cursor, "timestamp", "desc", models.Log.timestamp)
+        query = pagination.after_cursor(query, models.Log.timestamp, "desc", pivot["value"], pivot["id"])
 
+    items = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = pagination.cursor_for(items[-1], "timestamp", "desc")
+    if fast:
+        return serializers.FastJSONResponse({"items": serializers.log_dicts(items), "next_cursor": next_cursor})
+    return {"items": items, "next_cursor": next_cursor}
 
+
+@router.get("/export")
+def export_logs(
+    format: str = "ndjson",
+    filters: LogFilters = Depends(),
+    current_user: schemas.TokenData = Depends(require_admin),
+):
+    rows = _stream_rows(filters)
+    if format == "csv":
+        return StreamingResponse(
+            with_session_slot(_csv(rows)),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="logs.csv"'},
+        )
+    if format != "ndjson":
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be 'ndjson' or 'csv'")
+    return StreamingResponse(with_session_slot(_ndjson(rows)), media_type="application/x-ndjson")
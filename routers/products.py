@@ -1,17 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
-from app import models, schemas
+from app.database import get_db, with_session_slot
+from app import audit, bulk, cache, conditional, counters, events, export, low_stock, models, pagination, queries, schemas, serializers, stock
+from app.config import settings
+from app import search as search_index
 from app.oauth2 import get_current_user
-from app.models import Log
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 # ---------- STATIK / FILTRE ROTALARI ILK GELIR ----------
 
 @router.get("/paged", response_model=schemas.PagedProductsResponse, status_code=status.HTTP_200_OK)
-async def get_products_paged(
+def get_products_paged(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     search: Optional[str] = "",
     category: Optional[str] = None,
@@ -19,6 +24,8 @@ async def get_products_paged(
     page_size: int = 10,
     sort_by: Optional[str] = "created_at",
     sort_dir: Optional[str] = "desc",
+    cursor: Optional[str] = None,
+    with_total: Optional[bool] = None,
     current_user: schemas.TokenData = Depends(get_current_user),
 ):
     if page < 1:
@@ -26,15 +33,25 @@ async def get_products_paged(
     if page_size < 1 or page_size > 100:
         page_size = 10
 
-    query = db.query(models.Product)
+    # liste degismediyse sorguyu hic calistirmadan 304 (bkz. app/conditional.py)
+    validators = conditional.validators(request, db, current_user)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+
+    fast = settings.fast_json
+    query = queries.product_rows(db) if fast else queries.products(db)
     if current_user.role == "user":
         query = query.filter(models.Product.owner_id == current_user.user_id)
     if search:
-        query = query.filter(models.Product.name.contains(search))
+        query = search_index.apply(query, search)
     if category:
         query = query.filter(models.Product.category == category)
 
-    total = query.count()
+    # cursor modunda COUNT varsayilan olarak atlanir (with_total=true ile istenebilir)
+    if with_total is None:
+        with_total = cursor is None
+    total = query.count() if with_total else None
 
     sort_map = {
         "id": models.Product.id,
@@ -44,34 +61,75 @@ async def get_products_paged(
         "created_at": models.Product.created_at,
         "updated_at": models.Product.updated_at,
     }
-    col = sort_map.get(sort_by, models.Product.created_at)
-    query = query.order_by(col.asc() if (sort_dir or "").lower() == "asc" else col.desc())
-
-    items = query.offset((page - 1) * page_size).limit(page_size).all()
-    return {"items": items, "total": total, "page": page, "page_size": page_size}
+    if sort_by not in sort_map:
+        sort_by = "created_at"
+    sort_dir = "asc" if (sort_dir or "").lower() == "asc" else "desc"
+    col = sort_map[sort_by]
+    if sort_dir == "asc":
+        query = query.order_by(col.asc(), models.Product.id.asc())
+    else:
+        query = query.order_by(col.desc(), models.Product.id.desc())
+
+    if cursor:
+        pivot = pagination.decode_cursor(cursor, sort_by, sort_dir, col)
+        query = pagination.after_cursor(query, col, sort_dir, pivot["value"], pivot["id"])
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # bir fazla satir cekip sonraki sayfa olup olmadigini anliyoruz
+    items = query.limit(page_size + 1).all()
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = pagination.cursor_for(items[-1], sort_by, sort_dir)
+    if fast:
+        items = serializers.product_dicts(items)
+        return serializers.FastJSONResponse(
+            {"items": items, "total": total, "page": page, "page_size": page_size, "next_cursor": next_cursor},
+            headers=validators.headers,
+        )
+    return {"items": items, "total": total, "page": page, "page_size": page_size, "next_cursor": next_cursor}
 
 
 @router.get("/categories", response_model=List[str], status_code=status.HTTP_200_OK)
-async def get_categories(db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
-    query = db.query(models.Product.category).filter(models.Product.category.isnot(None))
-    if current_user.role == "user":
-        query = query.filter(models.Product.owner_id == current_user.user_id)
-    rows = query.distinct().all()
-    return sorted([r[0] for r in rows if r[0]])
+def get_categories(request: Request, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    def load():
+        query = db.query(models.Product.category).filter(models.Product.category.isnot(None))
+        if current_user.role == "user":
+            query = query.filter(models.Product.owner_id == current_user.user_id)
+        rows = query.distinct().all()
+        return sorted([r[0] for r in rows if r[0]])
+
+    return cache.respond(request, cache.categories_key(current_user), load)
+
+
+@router.get("/cache", status_code=status.HTTP_200_OK)
+def cache_stats(current_user: schemas.TokenData = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized")
+    return cache.stats()
 
 
 @router.get("/", response_model=List[schemas.ProductResponse], status_code=status.HTTP_200_OK)
-async def get_products(
+def get_products(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     search: Optional[str] = "",
     category: Optional[str] = None,
     current_user: schemas.TokenData = Depends(get_current_user),
 ):
-    query = db.query(models.Product)
+    validators = conditional.validators(request, db, current_user)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+
+    fast = settings.fast_json
+    query = queries.product_rows(db) if fast else queries.products(db)
     if current_user.role == "user":
         query = query.filter(models.Product.owner_id == current_user.user_id)
     if search:
-        query = query.filter(models.Product.name.contains(search))
+        query = search_index.apply(query, search, ranked=True)
     if category:
         query = query.filter(models.Product.category == category)
 
@@ -79,109 +137,218 @@ async def get_products(
     if not products:
         # 404 yerine boş liste dönmek istiyorsan şu iki satırı kaldır
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No products found")
+    if fast:
+        return serializers.FastJSONResponse(serializers.product_dicts(products), headers=validators.headers)
     return products
 
 
+# /products/ gibi kapsam (user: kendi urunleri, search, category) ama bellekte toplamadan akitir; bkz. app/export.py
+@router.get("/export", status_code=status.HTTP_200_OK)
+def export_products(
+    format: str = "csv",
+    search: Optional[str] = "",
+    category: Optional[str] = None,
+    excel: bool = False,
+    current_user: schemas.TokenData = Depends(get_current_user),
+):
+    if format not in export.FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be 'csv' or 'ndjson'")
+    rows = export.stream_rows(current_user, search, category)
+    body = export.csv_body(rows, excel) if format == "csv" else export.ndjson_body(rows)
+    # gzip/brotli: CompressionMiddleware akisi parca parca sikistirir
+    headers = {"Content-Disposition": f'attachment; filename="products.{format}"'}
+    return StreamingResponse(with_session_slot(body), media_type=export.FORMATS[format], headers=headers)
+
+
+# threshold verilmezse her sahibin kendi esigine gore watchlist (bkz. app/low_stock.py);
+# verilirse quantity < threshold (watchlist, stats ve olaylarla ayni karsilastirma). owner_id sadece admin icin filtre.
 @router.get("/low_stock", response_model=List[schemas.ProductResponse], status_code=status.HTTP_200_OK)
-async def get_low_stock_products(
-    threshold: int = 5,
+def get_low_stock_products(
+    request: Request,
+    response: Response,
+    threshold: Optional[int] = None,
+    owner_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(get_current_user),
 ):
-    query = db.query(models.Product).filter(models.Product.quantity <= threshold)
-    if current_user.role == "user":
-        query = query.filter(models.Product.owner_id == current_user.user_id)
+    validators = conditional.validators(request, db, current_user, owner_id=owner_id)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+    fast = settings.fast_json
+    query = low_stock.products(db, current_user, threshold, owner_id, fast=fast)
+    if fast:
+        return serializers.FastJSONResponse(serializers.product_dicts(query.all()), headers=validators.headers)
     return query.all()
 
+
+@router.get("/low_stock/paged", response_model=schemas.PagedLowStockResponse, status_code=status.HTTP_200_OK)
+def get_low_stock_paged(
+    request: Request,
+    response: Response,
+    threshold: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+):
+    if page_size < 1 or page_size > 100:
+        page_size = 20
+    validators = conditional.validators(request, db, current_user, owner_id=owner_id)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+    fast = settings.fast_json
+    query = low_stock.products(db, current_user, threshold, owner_id, fast=fast)
+    items, next_cursor = low_stock.page(query, threshold, page_size, cursor)
+    body = {
+        "items": serializers.product_dicts(items) if fast else items,
+        "threshold": low_stock.reported_threshold(db, current_user, threshold, owner_id),
+        "next_cursor": next_cursor,
+    }
+    return serializers.FastJSONResponse(body, headers=validators.headers) if fast else body
+
+
+@router.get("/low_stock/count", response_model=schemas.LowStockCount, status_code=status.HTTP_200_OK)
+def count_low_stock(
+    request: Request,
+    response: Response,
+    threshold: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+):
+    validators = conditional.validators(request, db, current_user, owner_id=owner_id)
+    if validators.fresh:
+        return validators.not_modified()
+    response.headers.update(validators.headers)
+    return {
+        "count": low_stock.count(db, current_user, threshold, owner_id),
+        "threshold": low_stock.reported_threshold(db, current_user, threshold, owner_id),
+    }
+
+
+async def _run_bulk(request: Request, handler, chunk_size: Optional[int], db: Session, current_user) -> dict:
+    if chunk_size is None or chunk_size < 1 or chunk_size > 10000:
+        chunk_size = settings.bulk_chunk_size
+    result = {"ids": [], "errors": []}
+    chunk = []
+    async for row in bulk.read_rows(request):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            await run_in_threadpool(handler, db, chunk, current_user, result)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(handler, db, chunk, current_user, result)
+    result["errors"].sort(key=lambda e: e["index"])
+    return {"succeeded": len(result["ids"]), "failed": len(result["errors"]), **result}
+
+
+@router.post("/bulk", response_model=schemas.BulkResult, status_code=status.HTTP_200_OK)
+async def bulk_create_products(
+    request: Request,
+    chunk_size: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+):
+    """Create many products from a JSON array, NDJSON (application/x-ndjson) or CSV (text/csv) body."""
+    return await _run_bulk(request, bulk.create_products, chunk_size, db, current_user)
+
+
+@router.patch("/stock/bulk", response_model=schemas.BulkResult, status_code=status.HTTP_200_OK)
+async def bulk_adjust_stock(
+    request: Request,
+    chunk_size: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+):
+    """Apply many {"id", "delta"} stock changes; same body formats as POST /products/bulk."""
+    return await _run_bulk(request, bulk.adjust_stock, chunk_size, db, current_user)
+
 # ---------- ID'LI ROTALAR EN SON ----------
 
 @router.get("/{product_id}", response_model=schemas.ProductResponse, status_code=status.HTTP_200_OK)
-async def get_product_by_id(product_id: int, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    return product
+def get_product_by_id(product_id: int, request: Request, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    def load():
+        product = queries.products(db).filter(models.Product.id == product_id).first()
+        if product is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+        return cache.product_detail(product)
+
+    return cache.respond(request, cache.product_key(product_id), load)
 
 
 @router.post("/", response_model=schemas.ProductResponse, status_code=status.HTTP_201_CREATED)
-async def create_product(product: schemas.ProductRequest, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+def create_product(product: schemas.ProductRequest, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
     new_product = models.Product(**product.model_dump(exclude_unset=True), owner_id=current_user.user_id)
     db.add(new_product)
+    db.flush()
+    counters.product_added(db, new_product)
+    low_stock.product_saved(db, new_product)
+    cache.categories_changed(db, new_product.owner_id)
+    events.product_event(db, "created", new_product)
+    audit.record(db, current_user.user_id, "create_product", "product", new_product.id)
     db.commit()
     db.refresh(new_product)
-
-    db.add(Log(user_id=current_user.user_id, action="create_product", entity="product", entity_id=new_product.id))
-    db.commit()
     return new_product
 
 
 @router.put("/{product_id}", response_model=schemas.UpdatedProductRequest, status_code=status.HTTP_200_OK)
-async def update_product(product_id: int, product: schemas.ProductRequest, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+def update_product(product_id: int, product: schemas.ProductRequest, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
     updated_product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if updated_product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     if updated_product.owner_id != current_user.user_id and current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this product")
 
+    old_quantity = updated_product.quantity
     for k, v in product.model_dump(exclude_unset=True).items():
         setattr(updated_product, k, v)
+    counters.quantity_changed(db, updated_product, old_quantity)
+    low_stock.product_saved(db, updated_product, old_quantity)
+    cache.product_changed(db, updated_product.id)
+    cache.categories_changed(db, updated_product.owner_id)
+    events.product_event(db, "updated", updated_product, old_quantity)
+    audit.record(db, current_user.user_id, "update_product", "product", updated_product.id)
 
     db.commit()
     db.refresh(updated_product)
-
-    db.add(Log(user_id=current_user.user_id, action="update_product", entity="product", entity_id=updated_product.id))
-    db.commit()
     return updated_product
 
 
 @router.patch("/{product_id}/increase", response_model=schemas.ProductResponse, status_code=status.HTTP_200_OK)
-async def increase_stock(product_id: int, request: schemas.IncreaseDecreaseStock, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    if product.owner_id != current_user.user_id and current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this product")
-
-    product.quantity += request.amount
-    db.commit()
-    db.refresh(product)
-
-    db.add(Log(user_id=current_user.user_id, action="increase_stock", entity="product", entity_id=product.id))
+def increase_stock(product_id: int, request: schemas.IncreaseDecreaseStock, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    product = stock.adjust(db, product_id, request.amount, current_user)
+    audit.record(db, current_user.user_id, "increase_stock", "product", product.id)
     db.commit()
     return product
 
 
 @router.patch("/{product_id}/decrease", response_model=schemas.ProductResponse, status_code=status.HTTP_200_OK)
-async def decrease_stock(product_id: int, request: schemas.IncreaseDecreaseStock, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
-    product = db.query(models.Product).filter(models.Product.id == product_id).first()
-    if product is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
-    if product.owner_id != current_user.user_id and current_user.role != "admin":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update this product")
-    if product.quantity < request.amount:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient stock to decrease")
-
-    product.quantity -= request.amount
-    db.commit()
-    db.refresh(product)
-
-    db.add(Log(user_id=current_user.user_id, action="decrease_stock", entity="product", entity_id=product.id))
+def decrease_stock(product_id: int, request: schemas.IncreaseDecreaseStock, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    product = stock.adjust(db, product_id, -request.amount, current_user)
+    audit.record(db, current_user.user_id, "decrease_stock", "product", product.id)
     db.commit()
     return product
 
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_product(product_id: int, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+def delete_product(product_id: int, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if product is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
     if product.owner_id != current_user.user_id and current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this product")
 
+    counters.product_removed(db, product)
+    low_stock.product_removed(db, product.id)
+    cache.product_changed(db, product.id)
+    cache.categories_changed(db, product.owner_id)
+    events.product_event(db, "deleted", product)
+    audit.record(db, current_user.user_id, "delete_product", "product", product.id)
     db.delete(product)
     db.commit()
-    db.add(Log(user_id=current_user.user_id, action="delete_product", entity="product", entity_id=product.id))
-    db.commit()
 
 
 
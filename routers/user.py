@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from app.database import get_db
 from sqlalchemy.orm import  Session
-from app import models,schemas,utils,oauth2
+from app import cache,conditional,counters,events,low_stock,models,schemas,utils,oauth2
 from typing import List, Optional
 
 
@@ -12,7 +12,7 @@ router = APIRouter(
 
 
 @router.get("/me", response_model=schemas.UserResponse, status_code=status.HTTP_200_OK)
-async def get_current_user_info(db=Depends(get_db),
+def get_current_user_info(db=Depends(get_db),
                                 current_user: schemas.TokenData = Depends(oauth2.get_current_user)):
     user = db.query(models.User).filter(models.User.id == current_user.user_id).first()
     if not user:
@@ -22,8 +22,25 @@ async def get_current_user_info(db=Depends(get_db),
         )
     return user
 
+@router.get("/me/low_stock_threshold", response_model=schemas.LowStockThresholdResponse, status_code=status.HTTP_200_OK)
+def get_low_stock_threshold(db: Session = Depends(get_db),
+                            current_user: schemas.TokenData = Depends(oauth2.get_current_user)):
+    custom = db.query(models.User.low_stock_threshold).filter(models.User.id == current_user.user_id).scalar()
+    return {"threshold": low_stock.threshold_for(db, current_user.user_id), "custom": custom is not None}
+
+
+@router.put("/me/low_stock_threshold", response_model=schemas.LowStockThresholdResponse, status_code=status.HTTP_200_OK)
+def set_low_stock_threshold(body: schemas.LowStockThreshold, db: Session = Depends(get_db),
+                            current_user: schemas.TokenData = Depends(oauth2.get_current_user)):
+    low_stock.set_threshold(db, current_user.user_id, body.threshold)
+    # esik /products/low_stock listelerini degistirir
+    conditional.changed(db, current_user.user_id)
+    db.commit()
+    threshold = low_stock.DEFAULT_THRESHOLD if body.threshold is None else body.threshold
+    return {"threshold": threshold, "custom": body.threshold is not None}
+
 @router.get("/admin", response_model=List[schemas.AdminResponse], status_code=status.HTTP_200_OK)
-async def get_all_users(db=Depends(get_db),
+def get_all_users(db=Depends(get_db),
                         current_user: schemas.TokenData = Depends(oauth2.get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
@@ -35,7 +52,7 @@ async def get_all_users(db=Depends(get_db),
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED, response_model=schemas.UserResponse)
-async def user_create(user: schemas.UserRequest,db = Depends(get_db)):
+def user_create(user: schemas.UserRequest,db = Depends(get_db)):
 
     user.password = utils.hash(user.password)
     try:
@@ -62,7 +79,7 @@ async def user_create(user: schemas.UserRequest,db = Depends(get_db)):
         )
 
 @router.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(
+def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
     current_user: schemas.TokenData = Depends(oauth2.get_current_user)
@@ -72,14 +89,19 @@ async def delete_user(
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    counters.owner_removed(db, user.id)
+    low_stock.owner_removed(db, user.id)
+    cache.owner_changed(db, user.id)
+    events.owner_removed(db, user.id)
     db.delete(user)
     db.commit()
+    oauth2.revoke_user(user_id)
     return
 
 
 
 @router.put("/{user_id}", response_model=schemas.AdminResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_update: schemas.AdminUpdateUser,
     db: Session = Depends(get_db),
@@ -95,8 +117,18 @@ async def update_user(
     # Parola güncelleme yoksa, eski hash kalır; rolün değişimi/permisyonu kontrol et
     if "password" in update_data:
         update_data["password"] = utils.hash(update_data["password"])
+    if "low_stock_threshold" in update_data:
+        low_stock.set_threshold(db, user.id, update_data.pop("low_stock_threshold"))
     for key, val in update_data.items():
         setattr(user, key, val)
+    # urun detaylari sahibini (username/email/role) gomulu tasir
+    if update_data.keys() & {"username", "email", "role"}:
+        cache.owner_changed(db, user.id)
+    # listeler de sahibini gomulu tasir, esik de low_stock listelerini degistirir
+    conditional.changed(db, user.id)
     db.commit()
     db.refresh(user)
+    # rol ya da parola degistiyse eski token'lar artik gecersiz
+    if "role" in update_data or "password" in update_data:
+        oauth2.revoke_user(user_id)
     return user